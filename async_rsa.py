@@ -0,0 +1,217 @@
+import asyncio
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from cryptography.hazmat.primitives import serialization
+
+from rsa_utils import (
+    sign_digest, verify_digest, verify_signature, calculate_data_hash, new_hash, key_algorithm,
+    DEFAULT_HASH_ALGORITHM
+)
+
+# Kích thước mỗi lần đọc file khi băm bất đồng bộ
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# Số tác vụ ký/xác thực/băm được chạy đồng thời tối đa
+DEFAULT_MAX_CONCURRENCY = 64
+# Số khóa dạng DER giữ lại để gửi sang tiến trình worker
+DER_CACHE_SIZE = 32
+
+@functools.lru_cache(maxsize=16)
+def _load_private_der(der):
+    return serialization.load_der_private_key(der, password=None)
+
+@functools.lru_cache(maxsize=16)
+def _load_public_der(der):
+    return serialization.load_der_public_key(der)
+
+def _process_sign_digest(private_der, digest, hash_algorithm):
+    """Ký trong tiến trình worker (khóa được truyền dạng DER và nạp lại một lần)"""
+    return sign_digest(_load_private_der(private_der), digest, hash_algorithm)
+
+def _process_verify_digest(public_der, digest, signature, allow_legacy, hash_algorithm):
+    """Xác thực trong tiến trình worker"""
+    return _thread_verify_digest(_load_public_der(public_der), digest, signature, allow_legacy, hash_algorithm)
+
+def _thread_verify_digest(public_key, digest, signature, allow_legacy, hash_algorithm):
+    if verify_digest(public_key, digest, signature, hash_algorithm):
+        return True
+    return allow_legacy and verify_signature(public_key, digest, signature)
+
+def _read_and_update(f, hash_obj, buffer):
+    """Đọc một chunk vào bộ đệm và đưa vào hàm băm; trả về số byte đã đọc"""
+    n = f.readinto(buffer)
+    if n:
+        hash_obj.update(memoryview(buffer)[:n])
+    return n
+
+class AsyncRSA:
+    """
+    API bất đồng bộ (asyncio) cho việc băm, ký và xác thực
+
+    Phần tính toán RSA chạy trên pool luồng hoặc pool tiến trình nên vòng lặp
+    sự kiện không bị chặn. File được đọc từng chunk trên pool luồng riêng cho
+    I/O, giữa các chunk tác vụ có thể bị hủy (asyncio.CancelledError).
+
+    Tham số:
+        executor: "thread" hoặc "process" cho phần tính toán RSA
+        max_workers: Số worker của pool tính toán
+        max_concurrency: Số thao tác chạy đồng thời tối đa, các thao tác còn
+                         lại chờ trên semaphore
+        chunk_size: Kích thước mỗi lần đọc file
+    """
+
+    def __init__(self, executor="thread", max_workers=None, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        if executor not in ("thread", "process"):
+            raise ValueError("executor phải là 'thread' hoặc 'process'")
+        self.use_processes = executor == "process"
+        if self.use_processes:
+            self._cpu_executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._cpu_executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._io_executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        self._semaphore = None
+        # Khóa dạng DER để gửi sang tiến trình worker (LRU theo id của đối tượng
+        # khóa; đối tượng khóa của cryptography không hỗ trợ weakref)
+        self._der_cache = OrderedDict()
+
+    def _limit(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _der(self, key, private):
+        cached = self._der_cache.get(id(key))
+        if cached is not None and cached[0] is key:
+            self._der_cache.move_to_end(id(key))
+            return cached[1]
+        if private:
+            der = key.private_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            )
+        else:
+            der = key.public_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo
+            )
+        # Giữ tham chiếu tới khóa khi còn trong cache để id không bị dùng lại cho
+        # đối tượng khác; mục bị loại thì id có thể được dùng lại nhưng phép so
+        # sánh "is" ở trên vẫn đảm bảo không trả nhầm DER của khóa khác
+        self._der_cache[id(key)] = (key, der)
+        while len(self._der_cache) > DER_CACHE_SIZE:
+            self._der_cache.popitem(last=False)
+        return der
+
+    async def _run_cpu(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._cpu_executor, func, *args)
+
+    async def _hash_file(self, file_path, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+        opening = self._io_executor.submit(open, file_path, 'rb', buffering=0)
+        try:
+            f = await asyncio.wrap_future(opening)
+        except asyncio.CancelledError:
+            # File có thể vẫn được mở xong trên luồng I/O sau khi tác vụ bị hủy
+            opening.add_done_callback(lambda future: future.exception() is None and future.result().close())
+            raise
+        reading = None
+        try:
+            hash_obj = new_hash(hash_algorithm)
+            buffer = bytearray(self.chunk_size)
+            while True:
+                reading = self._io_executor.submit(_read_and_update, f, hash_obj, buffer)
+                if not await asyncio.wrap_future(reading):
+                    break
+            return hash_obj.digest()
+        finally:
+            if reading is not None and not reading.done():
+                # Bị hủy khi luồng I/O còn đang đọc: chỉ đóng file sau khi lần đọc đó xong
+                reading.add_done_callback(lambda _: f.close())
+                await asyncio.wait([asyncio.wrap_future(reading)])
+            else:
+                f.close()
+
+    async def hash_file(self, file_path, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+        """Tính hash của file mà không chặn vòng lặp sự kiện"""
+        async with self._limit():
+            return await self._hash_file(file_path, hash_algorithm)
+
+    async def hash_data(self, data, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+        """Tính hash của dữ liệu trên pool I/O"""
+        loop = asyncio.get_running_loop()
+        async with self._limit():
+            return await loop.run_in_executor(self._io_executor, calculate_data_hash, data, hash_algorithm)
+
+    async def _sign_digest(self, private_key, digest, hash_algorithm):
+        if self.use_processes:
+            return await self._run_cpu(_process_sign_digest, self._der(private_key, True), digest, hash_algorithm)
+        return await self._run_cpu(sign_digest, private_key, digest, hash_algorithm)
+
+    async def _verify_digest(self, public_key, digest, signature, allow_legacy, hash_algorithm):
+        if self.use_processes:
+            return await self._run_cpu(_process_verify_digest, self._der(public_key, False),
+                                       digest, signature, allow_legacy, hash_algorithm)
+        return await self._run_cpu(_thread_verify_digest, public_key, digest, signature, allow_legacy,
+                                   hash_algorithm)
+
+    async def sign_digest(self, private_key, digest, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+        """Ký giá trị hash đã tính sẵn"""
+        async with self._limit():
+            return await self._sign_digest(private_key, digest, hash_algorithm)
+
+    async def sign_data(self, private_key, data, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+        """Tạo chữ ký số cho dữ liệu (giống rsa_utils.sign_data)"""
+        digest = await self.hash_data(data, hash_algorithm)
+        async with self._limit():
+            return await self._sign_digest(private_key, digest, hash_algorithm)
+
+    async def verify_signature(self, public_key, data, signature, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+        """Xác thực chữ ký số cho dữ liệu (giống rsa_utils.verify_signature)"""
+        digest = await self.hash_data(data, hash_algorithm)
+        async with self._limit():
+            return await self._verify_digest(public_key, digest, signature, False, hash_algorithm)
+
+    async def sign_file(self, private_key, file_path, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+        """Tạo chữ ký số cho file (giống rsa_utils.sign_file)"""
+        async with self._limit():
+            digest = await self._hash_file(file_path, hash_algorithm)
+            return await self._sign_digest(private_key, digest, hash_algorithm)
+
+    async def verify_file_signature(self, public_key, file_path, signature, allow_legacy=True,
+                                    signature_info=None):
+        """
+        Xác thực chữ ký số cho file (giống rsa_utils.verify_file_signature)
+
+        Thuật toán hash và chế độ hash được lấy từ signature_info; chữ ký theo
+        cây Merkle được xác thực bằng tree_hash.verify_tree_signature trên pool I/O.
+        """
+        algorithm = key_algorithm(public_key)
+        if signature_info and signature_info.get("signature_algorithm", "rsa-pss") != algorithm:
+            return False
+        hash_algorithm = (signature_info or {}).get("hash_algorithm", DEFAULT_HASH_ALGORITHM)
+        async with self._limit():
+            if signature_info and signature_info.get("hash_mode") == "tree":
+                from tree_hash import verify_tree_signature
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._io_executor, verify_tree_signature,
+                                                  public_key, file_path, signature, signature_info)
+            digest = await self._hash_file(file_path, hash_algorithm)
+            # Chữ ký kiểu cũ chỉ có với RSA và SHA-256 (giống rsa_utils.verify_file_signature)
+            legacy = allow_legacy and algorithm == "rsa-pss" and hash_algorithm == DEFAULT_HASH_ALGORITHM
+            return await self._verify_digest(public_key, digest, signature, legacy, hash_algorithm)
+
+    def close(self):
+        """Dừng các pool worker"""
+        self._cpu_executor.shutdown(wait=False, cancel_futures=True)
+        self._io_executor.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,287 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from rsa_utils import (
+    calculate_file_hash, sign_digest, public_key_fingerprint, key_algorithm,
+    HASH_ALGORITHMS, DEFAULT_HASH_ALGORITHM
+)
+from tree_hash import sign_file_tree, merkle_root
+from key_cache import get_private_key
+from digest_cache import DigestCache
+from sig_bundle import save_bundle, BUNDLE_EXTENSION
+from signature_store import SignatureStore, DEFAULT_BATCH_SIZE
+from file_utils import save_signature, save_signature_info, ensure_directory_exists
+
+# Khóa riêng tư và cache hash của mỗi tiến trình worker (nạp một lần trong initializer)
+_worker_private_key = None
+_worker_digest_cache = None
+
+# Số lỗi tối đa được giữ lại trong báo cáo để không làm tăng bộ nhớ
+MAX_REPORTED_ERRORS = 100
+
+def _init_worker(private_key_path, password, digest_cache_path=None):
+    """Nạp khóa riêng tư (và mở cache hash nếu có) một lần cho mỗi worker"""
+    global _worker_private_key, _worker_digest_cache
+    _worker_private_key = get_private_key(private_key_path, password)
+    # Không dùng lại cache của lần ký trước trong cùng tiến trình (chế độ luồng)
+    _worker_digest_cache = DigestCache(digest_cache_path) if digest_cache_path else None
+
+def _sign_one(file_path, tree_leaf_size=None, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+    """
+    Ký một file trong worker
+
+    Trả về:
+        tuple: (đường dẫn, chữ ký, kích thước, thông tin bổ sung cho file .info)
+    """
+    size = os.path.getsize(file_path)
+    if tree_leaf_size:
+        # Các file đã được ký song song nên mỗi worker băm cây bằng một luồng
+        signature, extra = sign_file_tree(_worker_private_key, file_path, tree_leaf_size, workers=1)
+    else:
+        digest = calculate_file_hash(file_path, cache=_worker_digest_cache, hash_algorithm=hash_algorithm)
+        signature = sign_digest(_worker_private_key, digest, hash_algorithm)
+        extra = {"digest": digest.hex(), "hash_algorithm": hash_algorithm}
+    return file_path, signature, size, extra
+
+def _bundle_from_result(file_path, signature, size, extra, key_fingerprint, creator):
+    """Tạo gói chữ ký .rsig từ kết quả ký của worker"""
+    bundle = {
+        "signature": signature,
+        "file_size": size,
+        "key_fingerprint": key_fingerprint,
+        "signature_algorithm": extra.get("signature_algorithm", "rsa-pss"),
+        "hash_algorithm": extra.get("hash_algorithm", DEFAULT_HASH_ALGORITHM),
+        "original_file": os.path.basename(file_path),
+        "creator": creator
+    }
+    if extra.get("hash_mode") == "tree":
+        bundle["hash_mode"] = "tree"
+        bundle["leaf_size"] = extra["leaf_size"]
+        bundle["leaf_hashes"] = [bytes.fromhex(leaf_hash) for leaf_hash in extra["leaf_hashes"]]
+        bundle["digest"] = merkle_root(bundle["leaf_hashes"])
+    else:
+        bundle["digest"] = bytes.fromhex(extra["digest"])
+    return bundle
+
+def iter_files(root_dir, exclude_dirs=(), exclude_paths=()):
+    """
+    Duyệt cây thư mục và trả về lần lượt các file cần ký
+
+    Dùng os.scandir theo kiểu generator nên không phải giữ toàn bộ danh sách
+    file trong bộ nhớ. Bỏ qua các file chữ ký (.sig, .sig.info, .rsig), các
+    thư mục trong exclude_dirs và các file trong exclude_paths.
+    """
+    excluded = {os.path.abspath(d) for d in exclude_dirs}
+    excluded_files = {os.path.abspath(path) for path in exclude_paths}
+    stack = [root_dir]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if os.path.abspath(entry.path) not in excluded:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    if entry.name.endswith(('.sig', '.sig.info', BUNDLE_EXTENSION)):
+                        continue
+                    if excluded_files and os.path.abspath(entry.path) in excluded_files:
+                        continue
+                    yield entry.path
+
+def database_files(db_path):
+    """Các file của một cơ sở dữ liệu SQLite (kể cả file WAL và nhật ký)"""
+    return [db_path + suffix for suffix in ("", "-wal", "-shm", "-journal")]
+
+def signature_output_path(file_path, root_dir, output_dir=None, extension=".sig"):
+    """Xác định đường dẫn file chữ ký cho một file (cạnh file gốc hoặc trong output_dir)"""
+    if output_dir is None:
+        return file_path + extension
+    relative_path = os.path.relpath(file_path, root_dir)
+    return os.path.join(output_dir, relative_path + extension)
+
+def sign_directory(private_key_path, root_dir, output_dir=None, password=None,
+                   workers=None, max_pending=None, use_processes=True, creator="",
+                   on_result=None, tree_leaf_size=None, digest_cache_path=None, bundle=False,
+                   store_path=None, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+    """
+    Ký toàn bộ file trong một cây thư mục bằng pool tiến trình (hoặc luồng)
+
+    Tham số:
+        private_key_path: Đường dẫn file khóa riêng tư (PEM)
+        root_dir: Thư mục gốc cần ký
+        output_dir: Thư mục lưu chữ ký (None = lưu cạnh file gốc)
+        password: Mật khẩu khóa riêng tư (nếu có)
+        workers: Số worker (mặc định bằng số lõi CPU)
+        max_pending: Số tác vụ tối đa đang chờ trong hàng đợi
+        use_processes: True dùng ProcessPoolExecutor, False dùng ThreadPoolExecutor
+        creator: Tên người tạo ghi vào file thông tin chữ ký
+        on_result: Hàm gọi lại (file_path, signature_path, error) sau mỗi file
+        tree_leaf_size: Nếu đặt, ký theo chế độ hash dạng cây với kích thước lá này
+        digest_cache_path: File cache hash (SQLite) để không băm lại file không đổi
+        bundle: Ghi một gói chữ ký nhị phân .rsig thay cho cặp .sig + .sig.info
+        store_path: Kho chữ ký (SQLite) để ghi lại các chữ ký vừa tạo
+        hash_algorithm: Thuật toán hash (một trong HASH_ALGORITHMS); chế độ
+                        hash dạng cây chỉ dùng SHA-256
+
+    Trả về:
+        dict: Thống kê gồm số file, số byte, thời gian và thông lượng
+    """
+    if hash_algorithm not in HASH_ALGORITHMS:
+        raise ValueError(f"Thuật toán hash không được hỗ trợ: {hash_algorithm}")
+    if tree_leaf_size and hash_algorithm != DEFAULT_HASH_ALGORITHM:
+        raise ValueError("Chế độ hash dạng cây chỉ hỗ trợ SHA-256")
+    workers = workers or os.cpu_count() or 1
+    # Hàng đợi có giới hạn: chỉ giữ một số tác vụ nhất định trong bộ nhớ
+    max_pending = max_pending or workers * 4
+    exclude_dirs = [output_dir] if output_dir else []
+    # Kho chữ ký và cache hash có thể nằm trong cây đang ký; chúng thay đổi
+    # trong lúc ký nên không được ký
+    exclude_paths = [path for db_path in (store_path, digest_cache_path) if db_path
+                     for path in database_files(db_path)]
+
+    if use_processes:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(private_key_path, password, digest_cache_path)
+        )
+    else:
+        # Các luồng dùng chung một khóa đã nạp
+        _init_worker(private_key_path, password, digest_cache_path)
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+    signing_public_key = get_private_key(private_key_path, password).public_key()
+    key_fingerprint = public_key_fingerprint(signing_public_key)
+    signature_algorithm = key_algorithm(signing_public_key)
+    store = SignatureStore(store_path) if store_path else None
+    store_batch = []
+
+    summary = {
+        "files": 0,
+        "failed": 0,
+        "bytes": 0,
+        "elapsed": 0.0,
+        "files_per_sec": 0.0,
+        "mb_per_sec": 0.0,
+        "errors": []
+    }
+
+    def handle_done(done):
+        for future in done:
+            file_path = pending.pop(future)
+            try:
+                _, signature, size, extra = future.result()
+                extra["key_fingerprint"] = key_fingerprint.hex()
+                extra["signature_algorithm"] = signature_algorithm
+                extension = BUNDLE_EXTENSION if bundle else ".sig"
+                signature_path = signature_output_path(file_path, root_dir, output_dir, extension)
+                ensure_directory_exists(os.path.dirname(signature_path) or ".")
+                if bundle:
+                    save_bundle(_bundle_from_result(file_path, signature, size, extra, key_fingerprint, creator),
+                                signature_path)
+                else:
+                    save_signature(signature, signature_path)
+                    save_signature_info(file_path, signature_path, signature_path + ".info", creator, extra)
+                if store is not None:
+                    store_batch.append(_bundle_from_result(file_path, signature, size, extra, key_fingerprint, creator))
+                    store_batch[-1]["signature_path"] = os.path.abspath(signature_path)
+                    if len(store_batch) >= DEFAULT_BATCH_SIZE:
+                        store.add_many(store_batch)
+                        store_batch.clear()
+                summary["files"] += 1
+                summary["bytes"] += size
+                if on_result:
+                    on_result(file_path, signature_path, None)
+            except Exception as e:
+                summary["failed"] += 1
+                if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                    summary["errors"].append((file_path, str(e)))
+                if on_result:
+                    on_result(file_path, None, e)
+
+    start_time = time.perf_counter()
+    pending = {}
+    try:
+        with executor:
+            for file_path in iter_files(root_dir, exclude_dirs, exclude_paths):
+                # Chờ khi hàng đợi đầy để giới hạn bộ nhớ
+                if len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    handle_done(done)
+                pending[executor.submit(_sign_one, file_path, tree_leaf_size, hash_algorithm)] = file_path
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                handle_done(done)
+
+        if store_batch:
+            store.add_many(store_batch)
+    finally:
+        if store is not None:
+            store.close()
+        if not use_processes and _worker_digest_cache is not None:
+            # Chế độ luồng: cache hash được mở trong tiến trình này
+            _worker_digest_cache.close()
+
+    elapsed = time.perf_counter() - start_time
+    summary["elapsed"] = elapsed
+    if elapsed > 0:
+        summary["files_per_sec"] = summary["files"] / elapsed
+        summary["mb_per_sec"] = summary["bytes"] / (1024 * 1024) / elapsed
+    return summary
+
+def print_summary(summary):
+    """In thống kê của quá trình ký hàng loạt"""
+    print("\n=== KẾT QUẢ KÝ HÀNG LOẠT ===")
+    print(f"Số file đã ký: {summary['files']}")
+    print(f"Số file lỗi: {summary['failed']}")
+    print(f"Tổng dung lượng: {summary['bytes'] / (1024 * 1024):.2f} MB")
+    print(f"Thời gian: {summary['elapsed']:.2f} s")
+    print(f"Thông lượng: {summary['files_per_sec']:.2f} file/s, {summary['mb_per_sec']:.2f} MB/s")
+    for file_path, error in summary["errors"]:
+        print(f"Lỗi: {file_path}: {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Ký hàng loạt toàn bộ file trong một thư mục")
+    parser.add_argument("root_dir", help="Thư mục cần ký")
+    parser.add_argument("--key", required=True, help="File khóa riêng tư (PEM)")
+    parser.add_argument("--password", default=None, help="Mật khẩu khóa riêng tư")
+    parser.add_argument("--output-dir", default=None, help="Thư mục lưu chữ ký (mặc định: cạnh file gốc)")
+    parser.add_argument("--workers", type=int, default=None, help="Số worker")
+    parser.add_argument("--max-pending", type=int, default=None, help="Kích thước hàng đợi tối đa")
+    parser.add_argument("--threads", action="store_true", help="Dùng luồng thay vì tiến trình")
+    parser.add_argument("--creator", default="", help="Tên người tạo chữ ký")
+    parser.add_argument("--tree-leaf-size", type=int, default=None,
+                        help="Ký theo chế độ hash dạng cây với kích thước lá (byte)")
+    parser.add_argument("--digest-cache", default=None, help="File cache hash (SQLite)")
+    parser.add_argument("--bundle", action="store_true", help="Ghi gói chữ ký .rsig thay cho cặp .sig + .sig.info")
+    parser.add_argument("--store", default=None, help="Ghi chữ ký vào kho chữ ký (SQLite)")
+    parser.add_argument("--hash", choices=HASH_ALGORITHMS, default=DEFAULT_HASH_ALGORITHM, help="Thuật toán hash")
+    args = parser.parse_args()
+    if args.tree_leaf_size and args.hash != DEFAULT_HASH_ALGORITHM:
+        parser.error("--tree-leaf-size chỉ dùng với --hash sha256")
+
+    summary = sign_directory(
+        args.key, args.root_dir,
+        output_dir=args.output_dir,
+        password=args.password,
+        workers=args.workers,
+        max_pending=args.max_pending,
+        use_processes=not args.threads,
+        creator=args.creator,
+        tree_leaf_size=args.tree_leaf_size,
+        digest_cache_path=args.digest_cache,
+        bundle=args.bundle,
+        store_path=args.store,
+        hash_algorithm=args.hash
+    )
+    print_summary(summary)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from rsa_utils import (
+    verify_file_signature, calculate_file_hash, verify_digest, verify_signature, public_key_fingerprint,
+    key_algorithm, verify_cache_context, DEFAULT_HASH_ALGORITHM
+)
+from key_cache import get_public_key
+from file_utils import load_signature, load_signature_info
+from digest_cache import DigestCache
+from verify_cache import VerifyCache, DEFAULT_TTL
+from sig_bundle import load_bundle, verify_file_bundle, BUNDLE_EXTENSION
+from signature_store import SignatureStore
+from batch_signer import iter_files, database_files
+
+def pairs_from_manifest(manifest_path):
+    """
+    Đọc danh sách cặp (file, chữ ký) từ file manifest
+
+    Mỗi dòng có dạng "đường_dẫn_file<TAB>đường_dẫn_chữ_ký". Nếu dòng không có
+    cột chữ ký thì dùng "đường_dẫn_file.sig". Đường dẫn tương đối được tính
+    theo thư mục chứa manifest. Dòng trống và dòng bắt đầu bằng "#" bị bỏ qua.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line.strip() or line.startswith('#'):
+                continue
+            parts = line.split('\t')
+            file_path = parts[0]
+            signature_path = parts[1] if len(parts) > 1 and parts[1] else file_path + ".sig"
+            yield (os.path.join(base_dir, file_path), os.path.join(base_dir, signature_path))
+
+def pairs_from_directory(signature_dir, data_root=None):
+    """
+    Tìm các cặp (file, chữ ký) trong một thư mục
+
+    Mỗi file .sig (hoặc gói .rsig) ứng với file gốc cùng tên bỏ đuôi. Nếu chữ ký nằm trong
+    thư mục riêng (như --output-dir của batch_signer) thì data_root là thư mục
+    gốc chứa dữ liệu, cấu trúc thư mục con được giữ nguyên.
+    """
+    for directory, _, filenames in os.walk(signature_dir):
+        for name in filenames:
+            extension = os.path.splitext(name)[1]
+            if extension not in ('.sig', BUNDLE_EXTENSION):
+                continue
+            signature_path = os.path.join(directory, name)
+            if data_root is None:
+                file_path = signature_path[:-len(extension)]
+            else:
+                relative_path = os.path.relpath(signature_path, signature_dir)
+                file_path = os.path.join(data_root, relative_path[:-len(extension)])
+            yield (file_path, signature_path)
+
+def pairs_from_files(root_dir, exclude_paths=()):
+    """
+    Tạo các cặp (file, None) cho mọi file trong thư mục (trừ exclude_paths)
+
+    Chữ ký của từng file sẽ được tìm trong kho chữ ký theo giá trị hash.
+    """
+    for file_path in iter_files(root_dir, exclude_paths=exclude_paths):
+        yield (file_path, None)
+
+def _verify_from_store(public_key, file_path, store, digest_cache=None, verify_cache=None):
+    """
+    Tìm chữ ký của file trong kho theo hash và xác thực
+
+    File được băm bằng từng thuật toán hash có trong kho.
+
+    Trả về:
+        tuple: (hợp lệ, đường dẫn chữ ký tìm được)
+    """
+    fingerprint = public_key_fingerprint(public_key)
+    # Chữ ký kiểu cũ chỉ có với RSA và SHA-256 (giống rsa_utils.verify_file_signature)
+    is_rsa = key_algorithm(public_key) == "rsa-pss"
+    records = []
+    for hash_algorithm in store.hash_algorithms():
+        digest = calculate_file_hash(file_path, cache=digest_cache, hash_algorithm=hash_algorithm)
+        records.extend((record, digest) for record in store.find_by_digest(digest, fingerprint)
+                       if record["hash_algorithm"] == hash_algorithm)
+    if not records:
+        raise LookupError("Không tìm thấy chữ ký trong kho")
+    for record, digest in records:
+        signature = record["signature"]
+        hash_algorithm = record["hash_algorithm"]
+        legacy = is_rsa and hash_algorithm == DEFAULT_HASH_ALGORITHM
+        verify = lambda: (verify_digest(public_key, digest, signature, hash_algorithm)
+                          or (legacy and verify_signature(public_key, digest, signature)))
+        if verify_cache is not None:
+            valid = verify_cache.get_or_verify(fingerprint, digest, signature, verify,
+                                               verify_cache_context(hash_algorithm, legacy))
+        else:
+            valid = verify()
+        if valid:
+            return True, record["signature_path"]
+    return False, records[0][0]["signature_path"]
+
+def _verify_one(public_key, file_path, signature_path, digest_cache=None, store=None, verify_cache=None):
+    """Xác thực một cặp (file, chữ ký), trả về dict kết quả"""
+    start_time = time.perf_counter()
+    result = {
+        "file": file_path,
+        "signature": signature_path,
+        "valid": False,
+        "error": None,
+        "size": 0,
+        "elapsed": 0.0
+    }
+    try:
+        result["size"] = os.path.getsize(file_path)
+        if signature_path is None:
+            result["valid"], result["signature"] = _verify_from_store(public_key, file_path, store, digest_cache,
+                                                                           verify_cache)
+        elif signature_path.endswith(BUNDLE_EXTENSION):
+            bundle = load_bundle(signature_path)
+            result["valid"] = verify_file_bundle(public_key, file_path, bundle, digest_cache, verify_cache)
+        else:
+            signature = load_signature(signature_path)
+            info_path = signature_path + ".info"
+            signature_info = load_signature_info(info_path) if os.path.exists(info_path) else None
+            result["valid"] = verify_file_signature(public_key, file_path, signature,
+                                                    signature_info=signature_info, digest_cache=digest_cache,
+                                                    verify_cache=verify_cache)
+    except Exception as e:
+        result["error"] = str(e)
+    result["elapsed"] = time.perf_counter() - start_time
+    return result
+
+def iter_verify(public_key, pairs, workers=None, max_pending=None, fail_fast=False, digest_cache=None,
+                store=None, verify_cache=None):
+    """
+    Xác thực song song nhiều cặp (file, chữ ký) và trả về kết quả ngay khi xong
+
+    Dùng ThreadPoolExecutor vì hashlib và cryptography nhả GIL trong lúc băm
+    và tính toán RSA. Số tác vụ đang chờ được giới hạn bởi max_pending.
+
+    Tham số:
+        public_key: Khóa RSA công khai
+        pairs: Iterable các cặp (đường dẫn file, đường dẫn chữ ký)
+        workers: Số luồng (mặc định bằng số lõi CPU)
+        max_pending: Số tác vụ tối đa đang chờ
+        fail_fast: Dừng ngay khi gặp chữ ký không hợp lệ hoặc lỗi
+        digest_cache: digest_cache.DigestCache để bỏ qua việc băm lại file không đổi
+        store: signature_store.SignatureStore để tìm chữ ký cho các cặp (file, None)
+        verify_cache: verify_cache.VerifyCache để dùng lại kết quả xác thực đã có
+
+    Trả về:
+        generator: Các dict kết quả theo thứ tự hoàn thành
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    pending = set()
+    failed = False
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for file_path, signature_path in pairs:
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        result = future.result()
+                        failed = failed or not result["valid"]
+                        yield result
+                    if fail_fast and failed:
+                        return
+                pending.add(executor.submit(_verify_one, public_key, file_path, signature_path,
+                                             digest_cache, store, verify_cache))
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    failed = failed or not result["valid"]
+                    yield result
+                if fail_fast and failed:
+                    return
+        finally:
+            # Hủy các tác vụ chưa chạy khi dừng sớm
+            for future in pending:
+                future.cancel()
+
+def verify_pairs(public_key, pairs, workers=None, max_pending=None, fail_fast=False, on_result=None,
+                 digest_cache=None, store=None, verify_cache=None):
+    """
+    Xác thực hàng loạt và tổng hợp báo cáo đạt/không đạt
+
+    Tham số:
+        on_result: Hàm gọi lại với từng dict kết quả ngay khi có
+
+    Trả về:
+        dict: Báo cáo gồm tổng số, số hợp lệ, số không hợp lệ, số lỗi,
+              danh sách các mục không đạt và cờ aborted khi dừng sớm
+    """
+    report = {
+        "total": 0,
+        "passed": 0,
+        "failed": 0,
+        "errors": 0,
+        "bytes": 0,
+        "elapsed": 0.0,
+        "aborted": False,
+        "failures": []
+    }
+    start_time = time.perf_counter()
+    for result in iter_verify(public_key, pairs, workers, max_pending, fail_fast, digest_cache,
+                              store, verify_cache):
+        report["total"] += 1
+        report["bytes"] += result["size"]
+        if result["valid"]:
+            report["passed"] += 1
+        else:
+            if result["error"]:
+                report["errors"] += 1
+            else:
+                report["failed"] += 1
+            report["failures"].append(result)
+            if fail_fast:
+                report["aborted"] = True
+        if on_result:
+            on_result(result)
+    report["elapsed"] = time.perf_counter() - start_time
+    return report
+
+def print_report(report):
+    """In báo cáo xác thực hàng loạt"""
+    print("\n=== KẾT QUẢ XÁC THỰC HÀNG LOẠT ===")
+    print(f"Tổng số: {report['total']}")
+    print(f"Hợp lệ: {report['passed']}")
+    print(f"Không hợp lệ: {report['failed']}")
+    print(f"Lỗi: {report['errors']}")
+    print(f"Thời gian: {report['elapsed']:.2f} s")
+    if report["aborted"]:
+        print("Đã dừng sớm do gặp lỗi (fail-fast)")
+    for result in report["failures"]:
+        reason = result["error"] or "chữ ký không hợp lệ"
+        print(f"✗ {result['file']}: {reason}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Xác thực hàng loạt các cặp file và chữ ký")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="File manifest chứa các cặp file<TAB>chữ ký")
+    source.add_argument("--directory", help="Thư mục chứa các file .sig")
+    source.add_argument("--files", help="Thư mục dữ liệu; chữ ký được tìm trong kho theo hash (cần --store)")
+    parser.add_argument("--data-root", default=None, help="Thư mục dữ liệu khi chữ ký nằm ở thư mục riêng")
+    parser.add_argument("--key", required=True, help="File khóa công khai (PEM)")
+    parser.add_argument("--workers", type=int, default=None, help="Số luồng")
+    parser.add_argument("--fail-fast", action="store_true", help="Dừng ngay khi gặp lỗi đầu tiên")
+    parser.add_argument("--quiet", action="store_true", help="Không in từng kết quả")
+    parser.add_argument("--digest-cache", default=None, help="File cache hash (SQLite)")
+    parser.add_argument("--store", default=None, help="Kho chữ ký (SQLite) dùng với --files")
+    parser.add_argument("--verify-cache", default=None, help="File cache kết quả xác thực (SQLite)")
+    parser.add_argument("--verify-cache-ttl", type=float, default=DEFAULT_TTL,
+                        help="Thời gian sống của kết quả trong cache xác thực (giây)")
+    parser.add_argument("--revoke", action="append", default=[], metavar="KEY",
+                        help="Xóa kết quả của khóa công khai (PEM) khỏi cache xác thực trước khi chạy")
+    parser.add_argument("--paranoid", type=float, default=0.0,
+                        help="Tỉ lệ (0..1) file trúng cache vẫn được băm lại để phát hiện dữ liệu hỏng")
+    args = parser.parse_args()
+
+    public_key = get_public_key(args.key)
+    store = None
+    if args.manifest:
+        pairs = pairs_from_manifest(args.manifest)
+    elif args.files:
+        if not args.store:
+            parser.error("--files cần --store")
+        store = SignatureStore(args.store)
+        # Không xác thực chính các file cơ sở dữ liệu nếu chúng nằm trong thư mục
+        databases = (args.store, args.digest_cache, args.verify_cache)
+        pairs = pairs_from_files(args.files, [path for db_path in databases if db_path
+                                              for path in database_files(db_path)])
+    else:
+        if not os.path.isdir(args.directory):
+            parser.error(f"Không tìm thấy thư mục: {args.directory}")
+        pairs = pairs_from_directory(args.directory, args.data_root)
+
+    def print_result(result):
+        if not args.quiet:
+            mark = "✓" if result["valid"] else "✗"
+            print(f"{mark} {result['file']}")
+
+    digest_cache = DigestCache(args.digest_cache, args.paranoid) if args.digest_cache else None
+    verify_cache = VerifyCache(args.verify_cache, ttl=args.verify_cache_ttl) if args.verify_cache else None
+    if verify_cache:
+        verify_cache.prune_expired()
+        for key_path in args.revoke:
+            verify_cache.invalidate_key(public_key_fingerprint(get_public_key(key_path)))
+    elif args.revoke:
+        parser.error("--revoke cần --verify-cache")
+    try:
+        report = verify_pairs(public_key, pairs, workers=args.workers,
+                              fail_fast=args.fail_fast, on_result=print_result,
+                              digest_cache=digest_cache, store=store, verify_cache=verify_cache)
+    finally:
+        # Đóng cả kết nối SQLite mà các luồng worker đã mở
+        for resource in (store, digest_cache, verify_cache):
+            if resource is not None:
+                resource.close()
+    print_report(report)
+    if digest_cache:
+        stats = digest_cache.stats()
+        print(f"Cache hash: {stats['hits']} trúng, {stats['misses']} trượt, "
+              f"{stats['rechecked']} kiểm tra lại, {stats['corruptions']} file hỏng")
+        for path in digest_cache.corrupted_paths:
+            print(f"Dữ liệu hỏng: {path}")
+    if verify_cache:
+        stats = verify_cache.stats()
+        print(f"Cache xác thực: {stats['hits']} trúng ({stats['disk_hits']} từ đĩa), {stats['misses']} trượt, "
+              f"tỉ lệ trúng {stats['hit_rate'] * 100:.1f}%")
+    if report["total"] == 0:
+        # Không có gì được xác thực thì không thể coi là thành công
+        print("Không tìm thấy chữ ký nào để xác thực")
+        exit(1)
+    exit(0 if report["failed"] == 0 and report["errors"] == 0 else 1)
+
+if __name__ == "__main__":
+    main()
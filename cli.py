@@ -0,0 +1,244 @@
+import os
+import sys
+import argparse
+
+# Giao diện dòng lệnh không cần Tk. Chỉ argparse được nạp khi khởi động; các
+# module nặng (cryptography, file_utils...) được import trong từng lệnh để
+# mỗi lệnh chỉ nạp những gì nó cần (xem import_benchmark.py).
+
+# Các giá trị này trùng với rsa_utils; khai báo lại để dựng parser mà không
+# phải nạp cryptography (lệnh --help, lỗi tham số)
+SIGNATURE_ALGORITHMS = ("rsa-pss", "ed25519", "ecdsa-p256")
+HASH_ALGORITHMS = ("sha256", "sha512", "blake2b", "sha3_256", "sha3_512")
+# raw: nhị phân như file .sig của giao diện; base64: một dòng văn bản
+SIGNATURE_FORMATS = ("raw", "base64")
+
+def cmd_keygen(args):
+    """Tạo cặp khóa và lưu vào thư mục khóa (cùng cách đặt tên như giao diện)"""
+    from rsa_utils import generate_key_pair, save_private_key, save_public_key
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    # Khóa RSA đặt tên theo kích thước, các khóa khác theo thuật toán
+    key_name = str(args.key_size) if args.algorithm == "rsa-pss" else args.algorithm
+    private_key_path = os.path.join(args.output_dir, f"private_key_{key_name}.pem")
+    public_key_path = os.path.join(args.output_dir, f"public_key_{key_name}.pem")
+
+    private_key, public_key = generate_key_pair(args.key_size, use_pool=False, algorithm=args.algorithm)
+    save_private_key(private_key, private_key_path, args.password)
+    save_public_key(public_key, public_key_path)
+    print(private_key_path)
+    print(public_key_path)
+    return 0
+
+# Tên file "-" nghĩa là đọc dữ liệu từ stdin / ghi chữ ký ra stdout
+STDIO = "-"
+
+def _write_signature(signature, path, signature_format):
+    """Ghi chữ ký ra file hoặc stdout, dạng nhị phân hoặc base64"""
+    if signature_format == "base64":
+        import base64
+        signature = base64.b64encode(signature) + b"\n"
+    if path == STDIO:
+        sys.stdout.buffer.write(signature)
+        sys.stdout.buffer.flush()
+    else:
+        from file_utils import save_signature
+        save_signature(signature, path)
+
+def _read_signature(path, signature_format):
+    """Đọc chữ ký từ file (nhị phân hoặc base64)"""
+    from file_utils import load_signature
+
+    signature = load_signature(path)
+    if signature_format == "base64":
+        import base64
+        signature = base64.b64decode(signature.strip(), validate=True)
+    return signature
+
+def _load_private_key(path, password):
+    """Đọc khóa riêng tư; lỗi mật khẩu (TypeError của cryptography) thành ValueError"""
+    from rsa_utils import load_private_key
+
+    try:
+        return load_private_key(path, password)
+    except TypeError:
+        if password:
+            raise ValueError(f"Khóa riêng tư {path} không được mã hóa, hãy bỏ --password")
+        raise ValueError(f"Khóa riêng tư {path} được mã hóa, cần --password")
+
+def cmd_sign(args):
+    """
+    Ký file, ghi .sig và .sig.info cạnh file (hoặc vào --output)
+
+    Với FILE là "-", dữ liệu từ stdin được băm theo từng phần (không giữ toàn
+    bộ trong bộ nhớ) và chữ ký được ghi ra stdout, trừ khi có --output.
+    """
+    from rsa_utils import calculate_file_hash, sign_digest, Signer
+
+    private_key = _load_private_key(args.key, args.password)
+    if args.file == STDIO:
+        signer = Signer(private_key, args.hash)
+        signer.update_from(sys.stdin.buffer)
+        digest = signer.digest()
+        signature = signer.finalize()
+    else:
+        digest = calculate_file_hash(args.file, hash_algorithm=args.hash)
+        signature = sign_digest(private_key, digest, args.hash)
+
+    signature_path = args.output or (STDIO if args.file == STDIO else args.file + ".sig")
+    _write_signature(signature, signature_path, args.format)
+    if signature_path == STDIO:
+        return 0
+    if args.file != STDIO:
+        from rsa_utils import public_key_fingerprint, key_algorithm
+        from file_utils import save_signature_info
+
+        save_signature_info(args.file, signature_path, signature_path + ".info", args.creator, {
+            "digest": digest.hex(),
+            "key_fingerprint": public_key_fingerprint(private_key.public_key()).hex(),
+            "signature_algorithm": key_algorithm(private_key),
+            "hash_algorithm": args.hash,
+            "signature_format": args.format
+        })
+    print(signature_path)
+    return 0
+
+def cmd_verify(args):
+    """
+    Xác thực file với chữ ký; mã thoát 0 nếu hợp lệ, 1 nếu không
+
+    Thuật toán hash lấy từ file .info cạnh chữ ký nếu có, nếu không thì từ
+    --hash. Với FILE là "-", dữ liệu từ stdin được băm theo từng phần.
+    """
+    from rsa_utils import load_public_key, verify_file_signature, key_algorithm, Verifier, DEFAULT_HASH_ALGORITHM
+    from file_utils import load_signature_info
+
+    if args.file == STDIO and not args.signature:
+        raise ValueError("Cần --signature khi đọc dữ liệu từ stdin")
+    signature_path = args.signature or args.file + ".sig"
+    info_path = signature_path + ".info"
+    signature_info = load_signature_info(info_path) if os.path.exists(info_path) else None
+    public_key = load_public_key(args.key)
+    if signature_info is None and args.hash:
+        signature_info = {"signature_algorithm": key_algorithm(public_key), "hash_algorithm": args.hash}
+    signature_format = args.format or (signature_info or {}).get("signature_format", "raw")
+    signature = _read_signature(signature_path, signature_format)
+
+    if args.file == STDIO:
+        if signature_info and signature_info.get("signature_algorithm", "rsa-pss") != key_algorithm(public_key):
+            valid = False
+        else:
+            hash_algorithm = (signature_info or {}).get("hash_algorithm", DEFAULT_HASH_ALGORITHM)
+            verifier = Verifier(public_key, hash_algorithm=hash_algorithm)
+            verifier.update_from(sys.stdin.buffer)
+            valid = verifier.finalize(signature)
+    else:
+        valid = verify_file_signature(public_key, args.file, signature, signature_info=signature_info)
+    if not args.quiet:
+        print("Chữ ký hợp lệ" if valid else "Chữ ký không hợp lệ")
+    return 0 if valid else 1
+
+def cmd_serve(args):
+    """
+    Xử lý nhiều yêu cầu ký/xác thực trong một tiến trình, khóa chỉ nạp một lần
+
+    Mỗi dòng stdin là một yêu cầu JSON cùng định dạng với signing_service.py
+    (trường "key" bị bỏ qua); mỗi phản hồi là một dòng JSON trên stdout, theo
+    đúng thứ tự yêu cầu.
+    """
+    import json
+    import base64
+    from rsa_utils import load_public_key, calculate_data_hash, sign_digest, verify_digest
+    from signing_service import decode_request, parse_request
+
+    if not args.key and not args.public_key:
+        raise ValueError("Cần --key hoặc --public-key")
+    private_key = _load_private_key(args.key, args.password) if args.key else None
+    public_key = load_public_key(args.public_key) if args.public_key else private_key.public_key()
+
+    stats = {"requests": 0, "errors": 0}
+    for line in sys.stdin.buffer:
+        if not line.strip():
+            continue
+        response = {"id": None}
+        try:
+            request = decode_request(line)
+            response["id"] = request.get("id")
+            if request.get("op") == "stats":
+                response.update(ok=True, stats=dict(stats))
+            else:
+                op, _, digest, data, signature, hash_algorithm = parse_request(request)
+                if digest is None:
+                    digest = calculate_data_hash(data, hash_algorithm)
+                if op == "sign":
+                    if private_key is None:
+                        raise ValueError("Chưa nạp khóa riêng tư (--key)")
+                    signature = sign_digest(private_key, digest, hash_algorithm)
+                    response.update(ok=True, signature=base64.b64encode(signature).decode('ascii'))
+                else:
+                    response.update(ok=True, valid=verify_digest(public_key, digest, signature, hash_algorithm))
+        except Exception as e:
+            stats["errors"] += 1
+            response.update(ok=False, error=str(e))
+        stats["requests"] += 1
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Tạo khóa, ký và xác thực chữ ký số không cần giao diện")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    keygen = subparsers.add_parser("keygen", help="Tạo cặp khóa")
+    keygen.add_argument("--algorithm", choices=SIGNATURE_ALGORITHMS, default="rsa-pss", help="Thuật toán chữ ký")
+    keygen.add_argument("--key-size", type=int, default=2048, help="Độ dài khóa RSA (bit)")
+    keygen.add_argument("--output-dir", default="keys", help="Thư mục lưu khóa")
+    keygen.add_argument("--password", default=None, help="Mật khẩu mã hóa khóa riêng tư")
+    keygen.set_defaults(func=cmd_keygen)
+
+    sign = subparsers.add_parser("sign", help="Ký file (hoặc stdin với FILE là -)")
+    sign.add_argument("file", help="File cần ký, - để đọc từ stdin")
+    sign.add_argument("--key", required=True, help="File khóa riêng tư (PEM)")
+    sign.add_argument("--password", default=None, help="Mật khẩu khóa riêng tư")
+    sign.add_argument("--hash", choices=HASH_ALGORITHMS, default="sha256", help="Thuật toán hash")
+    sign.add_argument("--creator", default="", help="Tên người tạo chữ ký")
+    sign.add_argument("--format", choices=SIGNATURE_FORMATS, default="raw", help="Định dạng chữ ký ghi ra")
+    sign.add_argument("-o", "--output", default=None,
+                      help="File chữ ký đầu ra, - cho stdout (mặc định: <file>.sig, hoặc stdout khi đọc stdin)")
+    sign.set_defaults(func=cmd_sign)
+
+    verify = subparsers.add_parser("verify", help="Xác thực chữ ký của file (hoặc stdin với FILE là -)")
+    verify.add_argument("file", help="File cần xác thực, - để đọc từ stdin")
+    verify.add_argument("--key", required=True, help="File khóa công khai (PEM)")
+    verify.add_argument("--signature", default=None, help="File chữ ký (mặc định: <file>.sig)")
+    verify.add_argument("--hash", choices=HASH_ALGORITHMS, default=None,
+                        help="Thuật toán hash khi không có file .info (mặc định: sha256)")
+    verify.add_argument("--format", choices=SIGNATURE_FORMATS, default=None,
+                        help="Định dạng file chữ ký (mặc định: theo file .info, hoặc raw)")
+    verify.add_argument("--quiet", action="store_true", help="Chỉ trả về mã thoát")
+    verify.set_defaults(func=cmd_verify)
+
+    serve = subparsers.add_parser("serve", help="Nhận yêu cầu JSON từng dòng từ stdin, trả lời ra stdout")
+    serve.add_argument("--key", default=None, help="File khóa riêng tư (PEM) cho yêu cầu sign")
+    serve.add_argument("--password", default=None, help="Mật khẩu khóa riêng tư")
+    serve.add_argument("--public-key", default=None,
+                       help="File khóa công khai cho yêu cầu verify (mặc định: lấy từ --key)")
+    serve.set_defaults(func=cmd_serve)
+    return parser
+
+def main(argv=None):
+    """
+    Chạy một lệnh
+
+    Trả về:
+        int: Mã thoát (0 thành công / chữ ký hợp lệ, 1 chữ ký không hợp lệ, 2 lỗi)
+    """
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"Lỗi: {e}", file=sys.stderr)
+        return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import os
+import time
+import random
+import sqlite3
+import threading
+
+# File vừa sửa trong khoảng thời gian này chưa được lưu vào cache, vì một lần
+# ghi nữa trong cùng "nhịp" mtime có thể không làm thay đổi mtime
+RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+# Số đường dẫn bị phát hiện hỏng tối đa được giữ lại trong thống kê
+MAX_REPORTED_CORRUPTIONS = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS digests (
+    path TEXT NOT NULL,
+    algorithm TEXT NOT NULL,
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest BLOB NOT NULL,
+    PRIMARY KEY (path, algorithm)
+)
+"""
+
+class DigestCache:
+    """
+    Bộ nhớ đệm giá trị hash của file lưu trên đĩa (SQLite)
+
+    Một mục chỉ được dùng lại khi đường dẫn, thiết bị, inode, kích thước,
+    mtime_ns và thuật toán hash đều khớp với trạng thái hiện tại của file.
+    Cơ sở dữ liệu dùng chế độ WAL và mỗi luồng/tiến trình có kết nối riêng,
+    nên nhiều tiến trình có thể đọc ghi cùng lúc.
+
+    Tham số:
+        db_path: Đường dẫn file cơ sở dữ liệu
+        paranoid_fraction: Tỉ lệ (0..1) các lần trúng cache vẫn băm lại file để
+                           phát hiện dữ liệu bị hỏng âm thầm (mtime không đổi)
+    """
+
+    def __init__(self, db_path, paranoid_fraction=0.0):
+        if not 0.0 <= paranoid_fraction <= 1.0:
+            raise ValueError("paranoid_fraction phải nằm trong khoảng 0..1")
+        self.db_path = db_path
+        self.paranoid_fraction = paranoid_fraction
+        self._local = threading.local()
+        # Các kết nối đã mở (pid, luồng, kết nối) để close() đóng được cả kết nối của luồng worker
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "rechecked": 0, "corruptions": 0}
+        self.corrupted_paths = []
+        # Tạo bảng ngay để lỗi đường dẫn được báo sớm
+        self._connection()
+
+    def _connection(self):
+        """Kết nối SQLite riêng cho luồng (và tiến trình) hiện tại"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(_SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+            self._track_connection(connection)
+        return connection
+
+    def _track_connection(self, connection):
+        """Ghi nhận kết nối mới; đóng kết nối của các luồng đã kết thúc"""
+        pid = os.getpid()
+        with self._connections_lock:
+            # Bỏ cả kết nối kế thừa qua fork: chúng thuộc về tiến trình cha
+            current = [entry for entry in self._connections if entry[0] == pid]
+            self._connections = [entry for entry in current if entry[1].is_alive()]
+            self._connections.append((pid, threading.current_thread(), connection))
+        for _, thread, finished in current:
+            if not thread.is_alive():
+                finished.close()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def lookup(self, path, stat, algorithm):
+        """Trả về hash đã lưu nếu trạng thái file khớp, ngược lại None"""
+        row = self._connection().execute(
+            "SELECT device, inode, size, mtime_ns, digest FROM digests WHERE path = ? AND algorithm = ?",
+            (path, algorithm)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[:4] != (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns):
+            return None
+        return row[4]
+
+    def store(self, path, stat, algorithm, digest):
+        """Lưu hash của file cùng trạng thái file tại thời điểm băm"""
+        if time.time_ns() - stat.st_mtime_ns < RACY_WINDOW_NS:
+            return
+        self._connection().execute(
+            "INSERT OR REPLACE INTO digests (path, algorithm, device, inode, size, mtime_ns, digest) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, algorithm, stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns, digest)
+        )
+
+    def get_or_compute(self, file_path, compute, algorithm="sha256"):
+        """
+        Lấy hash của file từ cache, hoặc tính bằng compute() rồi lưu lại
+
+        Tham số:
+            file_path: Đường dẫn file
+            compute: Hàm không tham số trả về hash của file
+            algorithm: Tên thuật toán hash (một phần của khóa cache)
+
+        Trả về:
+            bytes: Giá trị hash
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        cached = self.lookup(path, stat, algorithm)
+
+        if cached is not None:
+            if self.paranoid_fraction and random.random() < self.paranoid_fraction:
+                self._count("rechecked")
+                digest = compute()
+                if digest != cached:
+                    # Nội dung đổi nhưng trạng thái file không đổi: dữ liệu bị hỏng
+                    self._count("corruptions")
+                    with self._stats_lock:
+                        if len(self.corrupted_paths) < MAX_REPORTED_CORRUPTIONS:
+                            self.corrupted_paths.append(path)
+                    self.store(path, stat, algorithm, digest)
+                    return digest
+            self._count("hits")
+            return cached
+
+        self._count("misses")
+        digest = compute()
+        # Chỉ lưu nếu file không bị thay đổi trong lúc băm
+        after = os.stat(path)
+        if (after.st_size, after.st_mtime_ns, after.st_ino) == (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            self.store(path, stat, algorithm, digest)
+        return digest
+
+    def invalidate(self, file_path=None):
+        """Xóa mục của một file (hoặc toàn bộ cache nếu file_path là None)"""
+        connection = self._connection()
+        if file_path is None:
+            connection.execute("DELETE FROM digests")
+        else:
+            connection.execute("DELETE FROM digests WHERE path = ?", (os.path.abspath(file_path),))
+
+    def stats(self):
+        """Thống kê số lần trúng/trượt, số lần kiểm tra lại và số file bị hỏng"""
+        with self._stats_lock:
+            result = dict(self._stats)
+        lookups = result["hits"] + result["misses"]
+        result["hit_rate"] = result["hits"] / lookups if lookups else 0.0
+        return result
+
+    def close(self):
+        """Đóng mọi kết nối mà các luồng của tiến trình này đã mở"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            # Luồng dùng lại đối tượng sau khi đóng sẽ mở kết nối mới
+            self._local = threading.local()
+        pid = os.getpid()
+        for owner_pid, _, connection in connections:
+            # Kết nối kế thừa qua fork thuộc về tiến trình cha, không đóng ở đây
+            if owner_pid == pid:
+                connection.close()
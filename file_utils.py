@@ -3,18 +3,29 @@ import base64
 import json
 from datetime import datetime
 
+import instrumentation
+
 def save_signature(signature, output_path):
     """Lưu chữ ký vào file"""
-    with open(output_path, 'wb') as f:
-        f.write(signature)
+    with instrumentation.phase("signature_write", len(signature)):
+        with open(output_path, 'wb') as f:
+            f.write(signature)
 
 def load_signature(signature_path):
     """Đọc chữ ký từ file"""
-    with open(signature_path, 'rb') as f:
-        return f.read()
+    with instrumentation.phase("signature_read") as p:
+        with open(signature_path, 'rb') as f:
+            signature = f.read()
+        p.add_bytes(len(signature))
+    return signature
 
-def save_signature_info(file_path, signature_path, output_path, creator=""):
-    """Lưu thông tin chữ ký vào file JSON"""
+def save_signature_info(file_path, signature_path, output_path, creator="", extra=None):
+    """
+    Lưu thông tin chữ ký vào file JSON
+    
+    Tham số:
+        extra: Các trường bổ sung (ví dụ chế độ hash và hash các lá của cây Merkle)
+    """
     # Lấy tên file gốc
     original_filename = os.path.basename(file_path)
     
@@ -23,17 +34,22 @@ def save_signature_info(file_path, signature_path, output_path, creator=""):
         "original_file": original_filename,
         "signature_file": os.path.basename(signature_path),
         "creation_time": datetime.now().isoformat(),
-        "creator": creator
+        "creator": creator,
+        "hash_mode": "flat"
     }
+    if extra:
+        signature_info.update(extra)
     
     # Lưu thông tin chữ ký vào file JSON
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(signature_info, f, ensure_ascii=False, indent=4)
+    with instrumentation.phase("info_write"):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(signature_info, f, ensure_ascii=False, indent=4)
 
 def load_signature_info(info_path):
     """Đọc thông tin chữ ký từ file JSON"""
-    with open(info_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    with instrumentation.phase("info_read"):
+        with open(info_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
 
 def save_text_to_file(text, file_path):
     """Lưu văn bản vào file"""
@@ -46,13 +62,114 @@ def read_text_from_file(file_path):
         return f.read()
 
 def ensure_directory_exists(directory):
-    """Đảm bảo thư mục tồn tại"""
-    if not os.path.exists(directory):
-        os.makedirs(directory)
+    """Đảm bảo thư mục tồn tại (an toàn khi nhiều luồng cùng tạo)"""
+    os.makedirs(directory, exist_ok=True)
 
 def create_default_directories():
     """Tạo các thư mục mặc định cho ứng dụng"""
     directories = ['keys', 'signatures', 'temp']
     for directory in directories:
         ensure_directory_exists(directory)
-    return directories 
\ No newline at end of file
+    return directories
+
+# File văn bản lớn hơn ngưỡng này được xem theo trang và ký trực tiếp từ đĩa
+LARGE_TEXT_THRESHOLD = 1024 * 1024
+# Số ký tự mỗi lần đọc khi ký văn bản lớn
+TEXT_STREAM_CHUNK_CHARS = 256 * 1024
+# Kích thước (byte) mỗi trang khi xem văn bản lớn
+TEXT_PAGE_SIZE = 64 * 1024
+
+def iter_normalized_text(file_path, chunk_chars=TEXT_STREAM_CHUNK_CHARS, progress=None):
+    """
+    Đọc văn bản theo từng phần, chuẩn hóa giống hệt đường đi qua ô nhập liệu
+    
+    Ô nhập liệu nhận văn bản từ read_text_from_file (UTF-8, universal newlines)
+    và khi ký thì lấy ra với .strip(). Hàm này cho ra cùng chuỗi đó theo từng
+    phần: bỏ khoảng trắng đầu, giữ lại khoảng trắng cuối mỗi phần cho tới khi
+    gặp ký tự khác khoảng trắng (khoảng trắng ở cuối file bị bỏ).
+    
+    Tham số:
+        file_path: Đường dẫn file văn bản
+        chunk_chars: Số ký tự mỗi lần đọc
+        progress: Hàm progress(số_byte_đã_đọc, tổng_số_byte), có thể ném
+                  ngoại lệ để dừng
+    
+    Trả về:
+        generator: Các chuỗi str, nối lại bằng read_text_from_file(...).strip()
+    """
+    total = os.path.getsize(file_path)
+    started = False
+    pending = ""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        while chunk := f.read(chunk_chars):
+            if progress is not None:
+                progress(f.buffer.raw.tell(), total)
+            if not started:
+                chunk = chunk.lstrip()
+                if not chunk:
+                    continue
+                started = True
+            chunk = pending + chunk
+            content = chunk.rstrip()
+            pending = chunk[len(content):]
+            if content:
+                yield content
+
+class TextPager:
+    """
+    Xem file văn bản lớn theo trang, chỉ đọc trang đang xem
+    
+    Mỗi trang khoảng page_size byte và kết thúc ở cuối dòng (hoặc ở ranh giới
+    ký tự UTF-8 nếu dòng quá dài). Vị trí bắt đầu các trang được tính dần khi
+    lật trang nên mở file không tốn thời gian.
+    """
+    
+    def __init__(self, file_path, page_size=TEXT_PAGE_SIZE):
+        self.file_path = file_path
+        self.page_size = page_size
+        self.file_size = os.path.getsize(file_path)
+        self._offsets = [0]
+    
+    def _page_end(self, f, start):
+        f.seek(start)
+        data = f.read(self.page_size)
+        if start + len(data) >= self.file_size:
+            return self.file_size
+        newline = data.rfind(b"\n")
+        if newline >= 0:
+            return start + newline + 1
+        # Dòng dài hơn một trang: cắt ở ranh giới ký tự UTF-8
+        end = len(data)
+        while end > 0 and (data[end - 1] & 0xC0) == 0x80:
+            end -= 1
+        if end > 0 and data[end - 1] >= 0xC0:
+            end -= 1
+        return start + (end or len(data))
+    
+    def _ensure_page(self, index):
+        with open(self.file_path, 'rb') as f:
+            while len(self._offsets) <= index + 1 and self._offsets[-1] < self.file_size:
+                self._offsets.append(self._page_end(f, self._offsets[-1]))
+        return index + 1 < len(self._offsets)
+    
+    def has_page(self, index):
+        """Trang index có tồn tại không"""
+        return index >= 0 and (self._ensure_page(index) or (index == 0 and self.file_size == 0))
+    
+    def known_pages(self):
+        """Số trang đã biết (tăng dần khi lật trang)"""
+        return len(self._offsets) - 1
+    
+    def estimated_pages(self):
+        """Ước lượng tổng số trang theo kích thước file"""
+        return max(1, -(-self.file_size // self.page_size))
+    
+    def read_page(self, index):
+        """Nội dung trang index (chuẩn hóa xuống dòng như khi mở file văn bản)"""
+        if not self._ensure_page(index):
+            return ""
+        start, end = self._offsets[index], self._offsets[index + 1]
+        with open(self.file_path, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+        return data.decode('utf-8', errors='replace').replace("\r\n", "\n").replace("\r", "\n")
@@ -1,22 +1,79 @@
 import os
-import sys
+import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-from PIL import Image, ImageTk
-import io
+from PIL import ImageTk
 
 from rsa_utils import (
     generate_key_pair, save_private_key, save_public_key,
-    load_private_key, load_public_key,
-    sign_data, sign_file,
-    verify_signature, verify_file_signature
+    sign_digest,
+    verify_signature, verify_file_signature,
+    calculate_file_hash, calculate_data_hash, public_key_fingerprint,
+    OperationCancelled, Signer, Verifier, key_algorithm, new_hash,
+    HASH_ALGORITHMS, DEFAULT_HASH_ALGORITHM
 )
 from file_utils import (
     save_signature, load_signature,
     save_signature_info, load_signature_info,
     save_text_to_file, read_text_from_file,
-    ensure_directory_exists, create_default_directories
+    create_default_directories,
+    iter_normalized_text, TextPager, LARGE_TEXT_THRESHOLD
 )
+from key_cache import get_private_key, get_public_key
+from signature_store import SignatureStore, DEFAULT_STORE_PATH
+from preview_cache import PreviewCache, IMAGE_EXTENSIONS
+
+# Chu kỳ (ms) luồng giao diện kiểm tra tiến độ và kết quả của tác vụ nền
+TASK_POLL_INTERVAL_MS = 50
+
+class BackgroundTask:
+    """
+    Tác vụ chạy trên luồng nền để giao diện không bị treo
+
+    Hàm work(task) chạy trên luồng riêng và không được chạm vào widget Tk;
+    dùng task.report làm hàm báo tiến độ (ném OperationCancelled khi đã bấm
+    hủy) và task.check_cancelled() giữa các bước. Luồng giao diện đọc tiến độ
+    và kết quả qua root.after (xem RSASignatureApp.run_task).
+    """
+    
+    def __init__(self, description, work, on_success, on_error):
+        self.description = description
+        self.work = work
+        self.on_success = on_success
+        self.on_error = on_error
+        self.cancel_event = threading.Event()
+        self.progress = None
+        # ("ok", kết quả), ("cancelled", None) hoặc ("error", ngoại lệ)
+        self.outcome = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+    
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise OperationCancelled()
+    
+    def report(self, done, total):
+        """Hàm báo tiến độ truyền cho calculate_file_hash/sign_file"""
+        self.check_cancelled()
+        self.progress = (done, total)
+    
+    def _run(self):
+        try:
+            # Không kiểm tra hủy sau khi work xong: lúc đó file có thể đã được
+            # ghi (ví dụ file khóa), báo "đã hủy" sẽ sai với thực tế. Hàm work
+            # tự gọi check_cancelled trước bước ghi không thể hoàn tác.
+            result = self.work(self)
+            self.outcome = ("ok", result)
+        except OperationCancelled:
+            self.outcome = ("cancelled", None)
+        except Exception as e:
+            self.outcome = ("error", e)
+
+# Thuật toán chữ ký hiển thị trên giao diện -> tên trong rsa_utils.SIGNATURE_ALGORITHMS
+ALGORITHM_CHOICES = {
+    "RSA-PSS": "rsa-pss",
+    "Ed25519": "ed25519",
+    "ECDSA P-256": "ecdsa-p256"
+}
 
 class RSASignatureApp:
     def __init__(self, root):
@@ -31,16 +88,48 @@ class RSASignatureApp:
         self.current_file_path = None
         self.signature = None
         self.signature_path = None
+        self.signature_digest = None
+        self.signature_hash_algorithm = DEFAULT_HASH_ALGORITHM
+        self.current_task = None
         
         # Tạo các thư mục mặc định
         self.directories = create_default_directories()
         
-        # Tạo giao diện
+        # Cache ảnh thu nhỏ (bộ nhớ + temp/thumbnails), giải mã trên luồng nền
+        self.preview_cache = PreviewCache()
+        
+        # Kho chữ ký dùng chung cho cả phiên (mỗi luồng có kết nối SQLite riêng)
+        self.signature_store = SignatureStore(DEFAULT_STORE_PATH)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
+        # Tạo giao diện (thanh trạng thái tạo trước để luôn còn chỗ ở đáy cửa sổ)
+        self.create_status_bar()
         self.create_tabs()
         self.create_key_generation_tab()
         self.create_signature_tab()
         self.create_verification_tab()
     
+    def on_closing(self):
+        """Đóng kho chữ ký và cache ảnh trước khi đóng cửa sổ"""
+        self.cancel_task()
+        self.preview_cache.close()
+        self.signature_store.close()
+        self.root.destroy()
+    
+    def create_status_bar(self):
+        """Tạo thanh trạng thái: tiến độ của tác vụ nền và nút hủy"""
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(side=tk.BOTTOM, fill="x", padx=10, pady=5)
+        
+        self.progress_bar = ttk.Progressbar(status_frame, mode="determinate", maximum=100)
+        self.progress_bar.pack(side=tk.LEFT, fill="x", expand=1, padx=5)
+        
+        self.task_status = ttk.Label(status_frame, text="", width=45)
+        self.task_status.pack(side=tk.LEFT, padx=5)
+        
+        self.cancel_button = ttk.Button(status_frame, text="Hủy", command=self.cancel_task, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+    
     def create_tabs(self):
         """Tạo hệ thống tab cho giao diện"""
         self.tab_control = ttk.Notebook(self.root)
@@ -64,11 +153,21 @@ class RSASignatureApp:
         info_frame = ttk.Frame(frame)
         info_frame.pack(fill="x", padx=10, pady=10)
         
-        ttk.Label(info_frame, text="Kích thước khóa:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        ttk.Label(info_frame, text="Thuật toán:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.algorithm_var = tk.StringVar(value="RSA-PSS")
+        algorithm_combo = ttk.Combobox(info_frame, textvariable=self.algorithm_var, width=14, state="readonly")
+        algorithm_combo['values'] = tuple(ALGORITHM_CHOICES)
+        algorithm_combo.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+        
+        ttk.Label(info_frame, text="Kích thước khóa:").grid(row=0, column=2, padx=5, pady=5, sticky="w")
         self.key_size_var = tk.StringVar(value="2048")
         key_size_combo = ttk.Combobox(info_frame, textvariable=self.key_size_var, width=10)
         key_size_combo['values'] = ("1024", "2048", "3072", "4096")
-        key_size_combo.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+        key_size_combo.grid(row=0, column=3, padx=5, pady=5, sticky="w")
+        
+        # Kích thước khóa chỉ áp dụng cho RSA
+        algorithm_combo.bind("<<ComboboxSelected>>", lambda event: key_size_combo.config(
+            state="normal" if self.algorithm_var.get() == "RSA-PSS" else "disabled"))
         
         # Khóa riêng tư
         private_key_frame = ttk.LabelFrame(frame, text="Khóa riêng tư (Private Key)")
@@ -119,6 +218,8 @@ class RSASignatureApp:
         ttk.Button(text_buttons, text="Tải từ file", command=self.load_text_from_file).pack(side=tk.LEFT, padx=5)
         ttk.Button(text_buttons, text="Lưu vào file", command=self.save_text_to_file).pack(side=tk.LEFT, padx=5)
         
+        self.sign_large_text = self.create_pager_controls(text_tab, self.text_input, text_buttons)
+        
         # Tab file
         file_tab = ttk.Frame(data_tab)
         data_tab.add(file_tab, text="File (hình ảnh/văn bản)")
@@ -140,6 +241,12 @@ class RSASignatureApp:
         signature_frame = ttk.LabelFrame(frame, text="Tạo chữ ký")
         signature_frame.pack(fill="x", padx=10, pady=5)
         
+        ttk.Label(signature_frame, text="Hàm băm:").pack(side=tk.LEFT, padx=5, pady=5)
+        self.hash_algorithm_var = tk.StringVar(value=DEFAULT_HASH_ALGORITHM)
+        hash_combo = ttk.Combobox(signature_frame, textvariable=self.hash_algorithm_var, width=10, state="readonly")
+        hash_combo['values'] = HASH_ALGORITHMS
+        hash_combo.pack(side=tk.LEFT, padx=5, pady=5)
+        
         ttk.Button(signature_frame, text="Ký dữ liệu", command=self.sign_data_action).pack(side=tk.LEFT, padx=5, pady=5)
         ttk.Button(signature_frame, text="Lưu chữ ký", command=self.save_signature_action).pack(side=tk.LEFT, padx=5, pady=5)
         
@@ -172,6 +279,8 @@ class RSASignatureApp:
         
         ttk.Button(verify_text_buttons, text="Tải từ file", command=self.load_verify_text_from_file).pack(side=tk.LEFT, padx=5)
         
+        self.verify_large_text = self.create_pager_controls(verify_text_tab, self.verify_text_input, verify_text_buttons)
+        
         # Tab file
         verify_file_tab = ttk.Frame(verify_data_tab)
         verify_data_tab.add(verify_file_tab, text="File (hình ảnh/văn bản)")
@@ -196,6 +305,7 @@ class RSASignatureApp:
         self.verify_signature_path_var = tk.StringVar()
         ttk.Entry(signature_frame, textvariable=self.verify_signature_path_var, width=50).pack(side=tk.LEFT, fill="x", expand=1, padx=5, pady=5)
         ttk.Button(signature_frame, text="Chọn file chữ ký", command=self.select_signature_file).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(signature_frame, text="Tìm chữ ký", command=self.find_signature_action).pack(side=tk.LEFT, padx=5, pady=5)
         
         # Nút xác thực
         verify_button_frame = ttk.Frame(frame)
@@ -207,26 +317,184 @@ class RSASignatureApp:
         self.verify_result = ttk.Label(frame, text="")
         self.verify_result.pack(fill="x", padx=10, pady=5)
     
+    # Chế độ văn bản lớn: xem theo trang, ký/xác thực trực tiếp từ file
+    def create_pager_controls(self, parent, text_widget, buttons_frame):
+        """
+        Tạo thanh lật trang cho ô văn bản (ẩn cho tới khi mở văn bản lớn)
+        
+        Trả về:
+            dict: Trạng thái chế độ văn bản lớn của ô văn bản (pager là None
+                  khi đang ở chế độ nhập liệu bình thường)
+        """
+        state = {"text_widget": text_widget, "buttons_frame": buttons_frame, "pager": None, "page": 0}
+        frame = ttk.Frame(parent)
+        ttk.Button(frame, text="< Trang trước",
+                   command=lambda: self.show_text_page(state, state["page"] - 1)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(frame, text="Trang sau >",
+                   command=lambda: self.show_text_page(state, state["page"] + 1)).pack(side=tk.LEFT, padx=5)
+        state["label"] = ttk.Label(frame, text="")
+        state["label"].pack(side=tk.LEFT, padx=5)
+        ttk.Button(frame, text="Đóng văn bản lớn",
+                   command=lambda: self.close_large_text(state)).pack(side=tk.RIGHT, padx=5)
+        state["frame"] = frame
+        return state
+    
+    def open_large_text(self, state, file_path):
+        """Mở file văn bản lớn ở chế độ chỉ đọc theo trang"""
+        state["pager"] = TextPager(file_path)
+        state["frame"].pack(fill="x", padx=5, pady=5, before=state["buttons_frame"])
+        self.show_text_page(state, 0)
+    
+    def show_text_page(self, state, index):
+        """Hiển thị một trang của văn bản lớn (chỉ đọc trang đó từ đĩa)"""
+        pager = state["pager"]
+        if pager is None or not pager.has_page(index):
+            return
+        state["page"] = index
+        text_widget = state["text_widget"]
+        text_widget.config(state=tk.NORMAL)
+        text_widget.delete(1.0, tk.END)
+        text_widget.insert(tk.END, pager.read_page(index))
+        text_widget.config(state=tk.DISABLED)
+        state["label"].config(
+            text=f"Trang {index + 1}/~{max(pager.estimated_pages(), pager.known_pages())} - "
+                 f"{os.path.basename(pager.file_path)} ({pager.file_size / (1024 * 1024):.1f} MB, chỉ đọc)"
+        )
+    
+    def close_large_text(self, state):
+        """Thoát chế độ văn bản lớn, trở lại ô nhập liệu bình thường"""
+        if state["pager"] is None:
+            return
+        state["pager"] = None
+        state["frame"].pack_forget()
+        state["text_widget"].config(state=tk.NORMAL)
+        state["text_widget"].delete(1.0, tk.END)
+    
+    def load_text_into(self, state, file_path):
+        """
+        Tải file văn bản vào ô văn bản, dùng chế độ văn bản lớn nếu file vượt ngưỡng
+        
+        Trả về:
+            str: Nội dung văn bản, hoặc None nếu mở ở chế độ văn bản lớn
+        """
+        self.close_large_text(state)
+        if os.path.getsize(file_path) > LARGE_TEXT_THRESHOLD:
+            self.open_large_text(state, file_path)
+            return None
+        text = read_text_from_file(file_path)
+        state["text_widget"].delete(1.0, tk.END)
+        state["text_widget"].insert(tk.END, text)
+        return text
+    
+    # Chạy tác vụ nền
+    def run_task(self, description, work, on_success, on_error, determinate=True):
+        """
+        Chạy work trên luồng nền, giao diện vẫn phản hồi trong lúc chờ
+        
+        Tham số:
+            description: Mô tả hiển thị trên thanh trạng thái
+            work: Hàm work(task) chạy trên luồng nền (xem BackgroundTask)
+            on_success: Hàm nhận kết quả, chạy trên luồng giao diện
+            on_error: Hàm nhận ngoại lệ, chạy trên luồng giao diện
+            determinate: True nếu work báo tiến độ theo số byte, False thì
+                         thanh tiến độ chỉ chạy qua lại
+        
+        Trả về:
+            bool: False nếu đang có tác vụ khác chạy
+        """
+        if self.current_task is not None:
+            messagebox.showwarning("Cảnh báo", "Đang có tác vụ khác chạy, hãy chờ hoặc hủy tác vụ đó")
+            return False
+        
+        task = BackgroundTask(description, work, on_success, on_error)
+        self.current_task = task
+        
+        self.progress_bar.stop()
+        self.progress_bar.config(mode="determinate" if determinate else "indeterminate", value=0)
+        if not determinate:
+            self.progress_bar.start(10)
+        self.task_status.config(text=f"{description}...", foreground="")
+        self.cancel_button.config(state=tk.NORMAL)
+        
+        task.thread.start()
+        self.root.after(TASK_POLL_INTERVAL_MS, self._poll_task)
+        return True
+    
+    def _poll_task(self):
+        """Cập nhật tiến độ và xử lý kết quả khi tác vụ nền kết thúc (luồng giao diện)"""
+        task = self.current_task
+        if task is None:
+            return
+        
+        if task.progress is not None:
+            done, total = task.progress
+            percent = done * 100 / total if total else 100
+            self.progress_bar.config(value=percent)
+            self.task_status.config(
+                text=f"{task.description}: {done / (1024 * 1024):.1f}/{total / (1024 * 1024):.1f} MB ({percent:.0f}%)"
+            )
+        
+        if task.thread.is_alive():
+            self.root.after(TASK_POLL_INTERVAL_MS, self._poll_task)
+            return
+        
+        self.current_task = None
+        self.progress_bar.stop()
+        self.progress_bar.config(mode="determinate", value=0)
+        self.cancel_button.config(state=tk.DISABLED)
+        
+        status, value = task.outcome
+        if status == "ok":
+            self.task_status.config(text=f"{task.description}: xong")
+            task.on_success(value)
+        elif status == "cancelled":
+            self.task_status.config(text=f"{task.description}: đã hủy")
+        else:
+            self.task_status.config(text=f"{task.description}: lỗi")
+            task.on_error(value)
+    
+    def cancel_task(self):
+        """Yêu cầu hủy tác vụ nền đang chạy"""
+        if self.current_task is not None:
+            self.current_task.cancel_event.set()
+            self.task_status.config(text=f"{self.current_task.description}: đang hủy...")
+            self.cancel_button.config(state=tk.DISABLED)
+    
     # Các phương thức xử lý sự kiện
     def generate_keys(self):
-        """Tạo cặp khóa mới"""
+        """Tạo cặp khóa mới (trên luồng nền)"""
+        algorithm = ALGORITHM_CHOICES[self.algorithm_var.get()]
         try:
             key_size = int(self.key_size_var.get())
-            self.private_key, self.public_key = generate_key_pair(key_size)
-            
-            # Lưu khóa vào file
-            private_key_path = os.path.join("keys", f"private_key_{key_size}.pem")
-            public_key_path = os.path.join("keys", f"public_key_{key_size}.pem")
-            
-            save_private_key(self.private_key, private_key_path)
-            save_public_key(self.public_key, public_key_path)
-            
+        except ValueError:
+            messagebox.showerror("Lỗi", "Kích thước khóa không hợp lệ")
+            return
+        
+        # Khóa RSA đặt tên theo kích thước, các khóa khác theo thuật toán
+        key_name = str(key_size) if algorithm == "rsa-pss" else algorithm
+        description = f"{key_size} bit" if algorithm == "rsa-pss" else self.algorithm_var.get()
+        private_key_path = os.path.join("keys", f"private_key_{key_name}.pem")
+        public_key_path = os.path.join("keys", f"public_key_{key_name}.pem")
+        
+        def work(task):
+            # Không thể dừng giữa chừng việc tạo khóa; nếu đã bấm hủy thì bỏ
+            # kết quả và không ghi đè file khóa
+            private_key, public_key = generate_key_pair(key_size, algorithm=algorithm)
+            task.check_cancelled()
+            save_private_key(private_key, private_key_path)
+            save_public_key(public_key, public_key_path)
+            return private_key, public_key
+        
+        def on_success(keys):
+            self.private_key, self.public_key = keys
             self.private_key_path.set(private_key_path)
             self.public_key_path.set(public_key_path)
-            
-            messagebox.showinfo("Thành công", f"Đã tạo cặp khóa {key_size} bit thành công và lưu vào thư mục 'keys'")
-        except Exception as e:
+            messagebox.showinfo("Thành công", f"Đã tạo cặp khóa {description} thành công và lưu vào thư mục 'keys'")
+        
+        def on_error(e):
             messagebox.showerror("Lỗi", f"Không thể tạo khóa: {str(e)}")
+        
+        self.run_task(f"Tạo khóa {description}", work, on_success, on_error, determinate=False)
     
     def load_private_key_dialog(self):
         """Mở hộp thoại chọn file khóa riêng tư"""
@@ -259,12 +527,16 @@ class RSASignatureApp:
                 return
 
             if private_key_path:
-                self.private_key = load_private_key(private_key_path)
+                self.private_key = get_private_key(private_key_path)
             
             if public_key_path:
-                self.public_key = load_public_key(public_key_path)
+                self.public_key = get_public_key(public_key_path)
             
-            messagebox.showinfo("Thành công", "Đã tải khóa thành công")
+            # Thuật toán được nhận biết từ loại khóa
+            algorithm = key_algorithm(self.public_key)
+            display_name = next(name for name, value in ALGORITHM_CHOICES.items() if value == algorithm)
+            self.algorithm_var.set(display_name)
+            messagebox.showinfo("Thành công", f"Đã tải khóa {display_name} thành công")
         except Exception as e:
             messagebox.showerror("Lỗi", f"Không thể tải khóa: {str(e)}")
     
@@ -276,16 +548,22 @@ class RSASignatureApp:
         )
         if file_path:
             try:
-                text = read_text_from_file(file_path)
-                self.text_input.delete(1.0, tk.END)
-                self.text_input.insert(tk.END, text)
-                self.current_text = text
-                messagebox.showinfo("Thành công", "Đã tải văn bản từ file thành công")
+                text = self.load_text_into(self.sign_large_text, file_path)
+                self.current_text = text or ""
+                if text is None:
+                    messagebox.showinfo("Thành công", "File văn bản lớn được mở ở chế độ xem theo trang (chỉ đọc), "
+                                                      "khi ký sẽ đọc trực tiếp từ file")
+                else:
+                    messagebox.showinfo("Thành công", "Đã tải văn bản từ file thành công")
             except Exception as e:
                 messagebox.showerror("Lỗi", f"Không thể tải văn bản: {str(e)}")
     
     def save_text_to_file(self):
         """Lưu văn bản vào file"""
+        if self.sign_large_text["pager"] is not None:
+            messagebox.showwarning("Cảnh báo", "Văn bản lớn đã nằm trong file "
+                                               f"'{os.path.basename(self.sign_large_text['pager'].file_path)}'")
+            return
         text = self.text_input.get(1.0, tk.END).strip()
         if not text:
             messagebox.showwarning("Cảnh báo", "Không có văn bản để lưu")
@@ -326,30 +604,28 @@ class RSASignatureApp:
             return
         
         _, file_ext = os.path.splitext(file_path)
-        if file_ext.lower() in ['.jpg', '.jpeg', '.png', '.bmp', '.gif']:
+        if file_ext.lower() in IMAGE_EXTENSIONS:
+            # Điều chỉnh kích thước hình ảnh
+            max_width = frame_widget.winfo_width() - 20 if frame_widget.winfo_width() > 100 else 300
+            max_height = 200
+            size = (max_width, max_height)
+            
+            # Chỉ hiển thị kết quả của lần chọn file mới nhất trong khung này
+            token = object()
+            frame_widget.preview_token = token
+            
             try:
-                # Hiển thị hình ảnh
-                image = Image.open(file_path)
-                # Điều chỉnh kích thước hình ảnh
-                max_width = frame_widget.winfo_width() - 20 if frame_widget.winfo_width() > 100 else 300
-                max_height = 200
-                image.thumbnail((max_width, max_height))
-                
-                photo = ImageTk.PhotoImage(image)
-                
-                # Xóa nội dung cũ
-                for widget in frame_widget.winfo_children():
-                    widget.destroy()
-                
-                # Hiển thị hình ảnh mới
-                img_label = ttk.Label(frame_widget, image=photo)
-                img_label.image = photo  # Giữ tham chiếu
-                img_label.pack(padx=5, pady=5)
+                image = self.preview_cache.peek(file_path, size)
+                if image is not None:
+                    self.display_image_preview(frame_widget, image, file_path)
+                    return
                 
-                info_label = ttk.Label(frame_widget, text=f"Hình ảnh: {os.path.basename(file_path)}")
-                info_label.pack(padx=5, pady=5)
+                # Giải mã trên luồng nền, luồng giao diện chỉ chờ kết quả
+                self.show_preview_message(frame_widget, "Đang tải xem trước...")
+                future = self.preview_cache.load_async(file_path, size)
+                self.root.after(TASK_POLL_INTERVAL_MS, self._poll_preview, future, token, file_path, frame_widget)
             except Exception as e:
-                label_widget.config(text=f"Không thể hiển thị hình ảnh: {str(e)}")
+                self.show_preview_message(frame_widget, f"Không thể hiển thị hình ảnh: {str(e)}")
         else:
             try:
                 # Hiển thị văn bản
@@ -370,42 +646,111 @@ class RSASignatureApp:
             except Exception as e:
                 label_widget.config(text=f"Không thể hiển thị văn bản: {str(e)}")
     
+    def _poll_preview(self, future, token, file_path, frame_widget):
+        """Hiển thị ảnh thu nhỏ khi luồng nền giải mã xong"""
+        if getattr(frame_widget, "preview_token", None) is not token:
+            return  # Đã chọn file khác
+        if not future.done():
+            self.root.after(TASK_POLL_INTERVAL_MS, self._poll_preview, future, token, file_path, frame_widget)
+            return
+        try:
+            self.display_image_preview(frame_widget, future.result(), file_path)
+        except Exception as e:
+            self.show_preview_message(frame_widget, f"Không thể hiển thị hình ảnh: {str(e)}")
+    
+    def display_image_preview(self, frame_widget, image, file_path):
+        """Hiển thị ảnh thu nhỏ đã giải mã trong khung xem trước"""
+        photo = ImageTk.PhotoImage(image)
+        
+        # Xóa nội dung cũ
+        for widget in frame_widget.winfo_children():
+            widget.destroy()
+        
+        # Hiển thị hình ảnh mới
+        img_label = ttk.Label(frame_widget, image=photo)
+        img_label.image = photo  # Giữ tham chiếu
+        img_label.pack(padx=5, pady=5)
+        
+        info_label = ttk.Label(frame_widget, text=f"Hình ảnh: {os.path.basename(file_path)}")
+        info_label.pack(padx=5, pady=5)
+    
+    def show_preview_message(self, frame_widget, text):
+        """Thay nội dung khung xem trước bằng một dòng thông báo"""
+        for widget in frame_widget.winfo_children():
+            widget.destroy()
+        ttk.Label(frame_widget, text=text).pack(expand=1, fill="both", padx=5, pady=5)
+    
     def sign_data_action(self):
-        """Ký dữ liệu"""
+        """Ký dữ liệu (băm và ký trên luồng nền)"""
         if not self.private_key:
             messagebox.showerror("Lỗi", "Cần tải khóa riêng tư trước khi ký")
             return
         
-        try:
-            current_tab = self.tab_control.index(self.tab_control.select())
-            if current_tab != 1:  # Không phải tab signature
-                self.tab_control.select(1)
+        current_tab = self.tab_control.index(self.tab_control.select())
+        if current_tab != 1:  # Không phải tab signature
+            self.tab_control.select(1)
+        
+        # Xác định loại dữ liệu (văn bản hoặc file)
+        data_tab = self.signature_tab.winfo_children()[0].winfo_children()[0].winfo_children()[0]
+        current_data_tab = data_tab.index(data_tab.select())
+        private_key = self.private_key
+        hash_algorithm = self.hash_algorithm_var.get()
+        
+        if current_data_tab == 0 and self.sign_large_text["pager"] is not None:  # Văn bản lớn
+            text_path = self.sign_large_text["pager"].file_path
             
-            # Xác định loại dữ liệu (văn bản hoặc file)
-            data_tab = self.signature_tab.winfo_children()[0].winfo_children()[0].winfo_children()[0]
-            current_data_tab = data_tab.index(data_tab.select())
+            # Đọc từng phần từ file, chuẩn hóa giống ô nhập liệu nên chữ ký giống hệt
+            def work(task):
+                signer = Signer(private_key, hash_algorithm)
+                empty = True
+                for chunk in iter_normalized_text(text_path, progress=task.report):
+                    signer.update(chunk)
+                    empty = False
+                if empty:
+                    raise ValueError("Không có văn bản để ký")
+                return signer.digest(), signer.finalize(), hash_algorithm
             
-            if current_data_tab == 0:  # Tab văn bản
-                text = self.text_input.get(1.0, tk.END).strip()
-                if not text:
-                    messagebox.showwarning("Cảnh báo", "Không có văn bản để ký")
-                    return
-                
-                self.signature = sign_data(self.private_key, text)
-                self.signature_status.config(text="Đã ký văn bản thành công", foreground="green")
-            else:  # Tab file
-                file_path = self.file_path_var.get()
-                if not file_path or not os.path.exists(file_path):
-                    messagebox.showwarning("Cảnh báo", "Cần chọn file để ký")
-                    return
-                
-                self.signature = sign_file(self.private_key, file_path)
-                self.signature_status.config(text=f"Đã ký file '{os.path.basename(file_path)}' thành công", foreground="green")
+            success_text = f"Đã ký văn bản '{os.path.basename(text_path)}' thành công"
+            description = f"Ký văn bản {os.path.basename(text_path)}"
+            determinate = True
+        elif current_data_tab == 0:  # Tab văn bản
+            text = self.text_input.get(1.0, tk.END).strip()
+            if not text:
+                messagebox.showwarning("Cảnh báo", "Không có văn bản để ký")
+                return
             
+            # Ký giá trị hash của văn bản (giống sign_data) để lưu hash vào kho chữ ký
+            def work(task):
+                digest = calculate_data_hash(text, hash_algorithm)
+                return digest, sign_digest(private_key, digest, hash_algorithm), hash_algorithm
+            
+            success_text = "Đã ký văn bản thành công"
+            description = "Ký văn bản"
+            determinate = False
+        else:  # Tab file
+            file_path = self.file_path_var.get()
+            if not file_path or not os.path.exists(file_path):
+                messagebox.showwarning("Cảnh báo", "Cần chọn file để ký")
+                return
+            
+            def work(task):
+                digest = calculate_file_hash(file_path, progress=task.report, hash_algorithm=hash_algorithm)
+                return digest, sign_digest(private_key, digest, hash_algorithm), hash_algorithm
+            
+            success_text = f"Đã ký file '{os.path.basename(file_path)}' thành công"
+            description = f"Ký file {os.path.basename(file_path)}"
+            determinate = True
+        
+        def on_success(result):
+            self.signature_digest, self.signature, self.signature_hash_algorithm = result
+            self.signature_status.config(text=success_text, foreground="green")
             messagebox.showinfo("Thành công", "Đã tạo chữ ký thành công")
-        except Exception as e:
+        
+        def on_error(e):
             self.signature_status.config(text=f"Lỗi khi ký: {str(e)}", foreground="red")
             messagebox.showerror("Lỗi", f"Không thể ký dữ liệu: {str(e)}")
+        
+        self.run_task(description, work, on_success, on_error, determinate)
     
     def save_signature_action(self):
         """Lưu chữ ký vào file"""
@@ -427,7 +772,25 @@ class RSASignatureApp:
                 # Tạo file thông tin chữ ký
                 info_path = file_path + ".info"
                 data_source = self.current_file_path if self.current_file_path else "text_input.txt"
-                save_signature_info(data_source, file_path, info_path)
+                key_fingerprint = public_key_fingerprint(self.private_key.public_key())
+                extra = {
+                    "digest": self.signature_digest.hex(),
+                    "key_fingerprint": key_fingerprint.hex(),
+                    "signature_algorithm": key_algorithm(self.private_key),
+                    "hash_algorithm": self.signature_hash_algorithm
+                }
+                save_signature_info(data_source, file_path, info_path, extra=extra)
+                
+                # Ghi vào kho chữ ký để tab xác thực có thể tự tìm chữ ký theo hash
+                self.signature_store.add({
+                    "digest": self.signature_digest,
+                    "hash_algorithm": self.signature_hash_algorithm,
+                    "signature_algorithm": key_algorithm(self.private_key),
+                    "original_file": os.path.basename(data_source),
+                    "key_fingerprint": key_fingerprint,
+                    "signature_path": os.path.abspath(file_path),
+                    "signature": self.signature
+                })
                 
                 messagebox.showinfo("Thành công", f"Đã lưu chữ ký vào file '{os.path.basename(file_path)}'")
             except Exception as e:
@@ -441,10 +804,11 @@ class RSASignatureApp:
         )
         if file_path:
             try:
-                text = read_text_from_file(file_path)
-                self.verify_text_input.delete(1.0, tk.END)
-                self.verify_text_input.insert(tk.END, text)
-                messagebox.showinfo("Thành công", "Đã tải văn bản từ file thành công")
+                if self.load_text_into(self.verify_large_text, file_path) is None:
+                    messagebox.showinfo("Thành công", "File văn bản lớn được mở ở chế độ xem theo trang (chỉ đọc), "
+                                                      "khi xác thực sẽ đọc trực tiếp từ file")
+                else:
+                    messagebox.showinfo("Thành công", "Đã tải văn bản từ file thành công")
             except Exception as e:
                 messagebox.showerror("Lỗi", f"Không thể tải văn bản: {str(e)}")
     
@@ -472,6 +836,78 @@ class RSASignatureApp:
         if file_path:
             self.verify_signature_path_var.set(file_path)
     
+    def find_signature_action(self):
+        """Tìm chữ ký của dữ liệu cần xác thực trong kho chữ ký theo giá trị hash"""
+        verify_data_tab = self.verification_tab.winfo_children()[0].winfo_children()[0].winfo_children()[0]
+        current_data_tab = verify_data_tab.index(verify_data_tab.select())
+        
+        if current_data_tab == 0 and self.verify_large_text["pager"] is not None:  # Văn bản lớn
+            text_path = self.verify_large_text["pager"].file_path
+            
+            def compute_digest(task, hash_algorithm):
+                hash_obj = new_hash(hash_algorithm)
+                for chunk in iter_normalized_text(text_path, progress=task.report):
+                    hash_obj.update(chunk.encode('utf-8'))
+                return hash_obj.digest()
+        elif current_data_tab == 0:  # Tab văn bản
+            text = self.verify_text_input.get(1.0, tk.END).strip()
+            if not text:
+                messagebox.showwarning("Cảnh báo", "Không có văn bản để tìm chữ ký")
+                return
+            compute_digest = lambda task, hash_algorithm: calculate_data_hash(text, hash_algorithm)
+        else:  # Tab file
+            file_path = self.verify_file_path_var.get()
+            if not file_path or not os.path.exists(file_path):
+                messagebox.showwarning("Cảnh báo", "Cần chọn file để tìm chữ ký")
+                return
+            compute_digest = lambda task, hash_algorithm: calculate_file_hash(file_path, progress=task.report,
+                                                                              hash_algorithm=hash_algorithm)
+        
+        key_fingerprint = public_key_fingerprint(self.public_key) if self.public_key else None
+        
+        def work(task):
+            # Băm dữ liệu bằng từng thuật toán hash có trong kho
+            store = self.signature_store
+            records = []
+            for hash_algorithm in store.hash_algorithms():
+                digest = compute_digest(task, hash_algorithm)
+                records = store.find_by_digest(digest, key_fingerprint)
+                if records:
+                    break
+            if not records:
+                return None
+            
+            record = records[0]
+            signature_path = record["signature_path"]
+            if not signature_path or not os.path.exists(signature_path):
+                # File chữ ký gốc không còn: xuất chữ ký từ kho ra thư mục tạm
+                signature_path = os.path.join("temp", f"{digest.hex()[:16]}.sig")
+                save_signature(record["signature"], signature_path)
+                # Kèm file .info để bước xác thực dùng đúng thuật toán hash và thuật toán ký
+                extra = {
+                    "digest": record["digest"].hex(),
+                    "hash_algorithm": record["hash_algorithm"],
+                    "signature_algorithm": record["signature_algorithm"]
+                }
+                if record["key_fingerprint"]:
+                    extra["key_fingerprint"] = record["key_fingerprint"].hex()
+                save_signature_info(record["original_file"], signature_path, signature_path + ".info",
+                                    record["creator"], extra)
+            return signature_path
+        
+        def on_success(signature_path):
+            if signature_path is None:
+                messagebox.showinfo("Tìm chữ ký", "Không tìm thấy chữ ký cho dữ liệu này trong kho")
+                return
+            self.verify_signature_path_var.set(signature_path)
+            messagebox.showinfo("Tìm chữ ký", f"Đã tìm thấy chữ ký: {os.path.basename(signature_path)}")
+        
+        def on_error(e):
+            messagebox.showerror("Lỗi", f"Không thể tìm chữ ký: {str(e)}")
+        
+        determinate = current_data_tab != 0 or self.verify_large_text["pager"] is not None
+        self.run_task("Tìm chữ ký", work, on_success, on_error, determinate)
+    
     def verify_signature_action(self):
         """Xác thực chữ ký"""
         if not self.public_key:
@@ -483,34 +919,62 @@ class RSASignatureApp:
             messagebox.showwarning("Cảnh báo", "Cần chọn file chữ ký để xác thực")
             return
         
-        try:
-            signature = load_signature(signature_path)
+        # Xác định loại dữ liệu (văn bản hoặc file)
+        verify_data_tab = self.verification_tab.winfo_children()[0].winfo_children()[0].winfo_children()[0]
+        current_data_tab = verify_data_tab.index(verify_data_tab.select())
+        public_key = self.public_key
+        
+        def load_info():
+            # Đọc thông tin chữ ký (nếu có) để biết chế độ hash và thuật toán hash đã dùng khi ký
+            info_path = signature_path + ".info"
+            return load_signature_info(info_path) if os.path.exists(info_path) else None
+        
+        def info_hash_algorithm():
+            return (load_info() or {}).get("hash_algorithm", DEFAULT_HASH_ALGORITHM)
+        
+        if current_data_tab == 0 and self.verify_large_text["pager"] is not None:  # Văn bản lớn
+            text_path = self.verify_large_text["pager"].file_path
             
-            # Xác định loại dữ liệu (văn bản hoặc file)
-            verify_data_tab = self.verification_tab.winfo_children()[0].winfo_children()[0].winfo_children()[0]
-            current_data_tab = verify_data_tab.index(verify_data_tab.select())
+            def work(task):
+                verifier = Verifier(public_key, hash_algorithm=info_hash_algorithm())
+                verifier.update_from(iter_normalized_text(text_path, progress=task.report))
+                return verifier.finalize(load_signature(signature_path))
             
-            if current_data_tab == 0:  # Tab văn bản
-                text = self.verify_text_input.get(1.0, tk.END).strip()
-                if not text:
-                    messagebox.showwarning("Cảnh báo", "Không có văn bản để xác thực")
-                    return
-                
-                is_valid = verify_signature(self.public_key, text, signature)
-            else:  # Tab file
-                file_path = self.verify_file_path_var.get()
-                if not file_path or not os.path.exists(file_path):
-                    messagebox.showwarning("Cảnh báo", "Cần chọn file để xác thực")
-                    return
-                
-                is_valid = verify_file_signature(self.public_key, file_path, signature)
+            description = f"Xác thực văn bản {os.path.basename(text_path)}"
+        elif current_data_tab == 0:  # Tab văn bản
+            text = self.verify_text_input.get(1.0, tk.END).strip()
+            if not text:
+                messagebox.showwarning("Cảnh báo", "Không có văn bản để xác thực")
+                return
+            
+            def work(task):
+                return verify_signature(public_key, text, load_signature(signature_path), info_hash_algorithm())
             
+            description = "Xác thực văn bản"
+        else:  # Tab file
+            file_path = self.verify_file_path_var.get()
+            if not file_path or not os.path.exists(file_path):
+                messagebox.showwarning("Cảnh báo", "Cần chọn file để xác thực")
+                return
+            
+            def work(task):
+                signature = load_signature(signature_path)
+                return verify_file_signature(public_key, file_path, signature, signature_info=load_info(),
+                                             progress=task.report)
+            
+            description = f"Xác thực file {os.path.basename(file_path)}"
+        
+        def on_success(is_valid):
             if is_valid:
                 self.verify_result.config(text="Chữ ký hợp lệ ✓ - Dữ liệu không bị thay đổi", foreground="green")
                 messagebox.showinfo("Kết quả xác thực", "Chữ ký hợp lệ - Dữ liệu không bị thay đổi")
             else:
                 self.verify_result.config(text="Chữ ký không hợp lệ ✗ - Dữ liệu có thể đã bị thay đổi", foreground="red")
                 messagebox.showwarning("Kết quả xác thực", "Chữ ký không hợp lệ - Dữ liệu có thể đã bị thay đổi")
-        except Exception as e:
+        
+        def on_error(e):
             self.verify_result.config(text=f"Lỗi khi xác thực: {str(e)}", foreground="red")
-            messagebox.showerror("Lỗi", f"Không thể xác thực chữ ký: {str(e)}") 
\ No newline at end of file
+            messagebox.showerror("Lỗi", f"Không thể xác thực chữ ký: {str(e)}")
+        
+        determinate = current_data_tab != 0 or self.verify_large_text["pager"] is not None
+        self.run_task(description, work, on_success, on_error, determinate) 
\ No newline at end of file
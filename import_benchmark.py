@@ -0,0 +1,146 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+from performance_test import (
+    summarize_samples, format_stats, collect_system_metrics, save_results,
+    positive_int, non_negative_int, DEFAULT_WARMUP, DEFAULT_REPEAT
+)
+
+# Các điểm khởi động cần đo: tên -> mã Python chạy trong một trình thông dịch mới
+TARGETS = {
+    "python": "pass",
+    "cli": "import cli",
+    "cli_help": "import cli, contextlib, io\nwith contextlib.redirect_stdout(io.StringIO()):\n"
+                "    try: cli.main(['--help'])\n    except SystemExit: pass",
+    "sign_path": "import cli, rsa_utils, file_utils",
+    "rsa_utils": "import rsa_utils",
+    "batch_signer": "import batch_signer",
+    "performance_test": "import performance_test",
+    "gui": "import gui"
+}
+
+# Số module chậm nhất được in cho mỗi điểm khởi động
+DEFAULT_TOP = 10
+
+def _run(code, source_dir, extra_args=(), cold=False):
+    """
+    Chạy mã trong trình thông dịch mới, trả về (thời gian giây, stderr)
+
+    Với cold=True, file .pyc được ghi vào một thư mục tạm mới
+    (PYTHONPYCACHEPREFIX) nên mọi module, kể cả thư viện chuẩn, phải biên
+    dịch lại như lần chạy đầu tiên sau khi cài đặt.
+    """
+    env = dict(os.environ, PYTHONPATH=source_dir)
+    with tempfile.TemporaryDirectory(prefix="pycache-") as pycache_dir:
+        if cold:
+            env["PYTHONPYCACHEPREFIX"] = pycache_dir
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, *extra_args, "-c", code], cwd=source_dir, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else "lỗi không rõ")
+    return elapsed, completed.stderr
+
+def parse_importtime(output):
+    """
+    Phân tích kết quả của python -X importtime
+
+    Trả về:
+        list: Các tuple (tên module, self µs, cumulative µs) theo thứ tự nạp
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+def measure_target(code, source_dir, warmup=DEFAULT_WARMUP, repeat=DEFAULT_REPEAT, cold=False):
+    """
+    Đo thời gian khởi động (ms) của một đoạn mã, mỗi lần trong một tiến trình mới
+
+    Mặc định đo khởi động "ấm": các lần khởi động đầu tạo file .pyc và đưa
+    thư viện vào page cache, giống lệnh chạy lặp lại trong script. Với
+    cold=True, mỗi lần chạy (kể cả lần -X importtime) có bộ đệm .pyc rỗng
+    riêng nên thời gian gồm cả việc biên dịch module; page cache của hệ điều
+    hành thì không xóa được nếu không có quyền root, nên các file nguồn vẫn
+    được đọc từ bộ nhớ sau lần khởi động làm nóng.
+
+    Trả về:
+        tuple: (thống kê thời gian, danh sách module từ -X importtime)
+    """
+    for _ in range(warmup):
+        _run(code, source_dir, cold=cold)
+    samples = [_run(code, source_dir, cold=cold)[0] * 1000 for _ in range(repeat)]
+    _, importtime = _run(code, source_dir, ("-X", "importtime"), cold=cold)
+    return summarize_samples(samples), parse_importtime(importtime)
+
+def run_import_benchmark(targets=None, source_dir=".", warmup=DEFAULT_WARMUP, repeat=DEFAULT_REPEAT,
+                         top=DEFAULT_TOP, cold=False):
+    """
+    Đo thời gian khởi động của các điểm trong TARGETS
+
+    Tham số:
+        targets: Tên các điểm khởi động (mặc định: tất cả)
+        source_dir: Thư mục mã nguồn cần đo (ví dụ một git worktree của phiên bản cũ)
+        top: Số module chậm nhất in ra cho mỗi điểm
+        cold: Đo khởi động lạnh (biên dịch lại .pyc mỗi lần), xem measure_target
+
+    Trả về:
+        dict: Kết quả cùng định dạng với performance_test (dùng được với lệnh
+              compare); khởi động lạnh nằm trong nhóm "import_cold" để không bị
+              so với kết quả khởi động ấm
+    """
+    source_dir = os.path.abspath(source_dir)
+    results = {}
+    modules_report = {}
+    for name in targets or TARGETS:
+        try:
+            stats, modules = measure_target(TARGETS[name], source_dir, warmup, repeat, cold)
+        except RuntimeError as e:
+            print(f"{name:<18} bỏ qua: {e}")
+            continue
+        stats["modules"] = len(modules)
+        results[name] = stats
+        print(f"{name:<18} {format_stats(stats)}  ({len(modules)} module)")
+        # Module tự tốn nhiều thời gian nhất (không tính module con)
+        slowest = sorted(modules, key=lambda module: -module[1])[:top]
+        modules_report[name] = [{"module": m, "self_us": s, "cumulative_us": c} for m, s, c in slowest]
+        for module, self_us, cumulative_us in slowest:
+            print(f"    {module:<48} {self_us / 1000:>7.2f} ms  (gồm module con {cumulative_us / 1000:.2f} ms)")
+    return {
+        "created": datetime.now().isoformat(),
+        "system": collect_system_metrics(),
+        "config": {"warmup": warmup, "repeat": repeat, "source_dir": source_dir,
+                   "mode": "cold" if cold else "warm"},
+        "results": {"import_cold" if cold else "import": results},
+        "modules": modules_report
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo thời gian khởi động (import) của các điểm chạy chương trình")
+    parser.add_argument("--only", nargs="+", choices=list(TARGETS), help="Chỉ đo các điểm này")
+    parser.add_argument("--source-dir", default=".", help="Thư mục mã nguồn cần đo")
+    parser.add_argument("--warmup", type=non_negative_int, default=DEFAULT_WARMUP, help="Số lần khởi động bỏ qua")
+    parser.add_argument("--repeat", type=positive_int, default=DEFAULT_REPEAT, help="Số lần đo (ít nhất 1)")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Số module chậm nhất in ra")
+    parser.add_argument("--cold", action="store_true",
+                        help="Đo khởi động lạnh: mỗi lần chạy biên dịch lại .pyc trong thư mục tạm mới")
+    parser.add_argument("--output", default=None, help="Lưu kết quả ra file JSON")
+    args = parser.parse_args()
+
+    print("=== THỜI GIAN KHỞI ĐỘNG " + ("LẠNH" if args.cold else "ẤM") + " ===")
+    report = run_import_benchmark(args.only, args.source_dir, args.warmup, args.repeat, args.top, args.cold)
+    if args.output:
+        save_results(report, args.output)
+        print(f"\nĐã lưu kết quả vào {args.output}")
+
+if __name__ == "__main__":
+    main()
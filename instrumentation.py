@@ -0,0 +1,289 @@
+import os
+import time
+import json
+import atexit
+import threading
+import functools
+
+# Đo đạc các giai đoạn trên đường xử lý chính (đọc khóa, đọc file, băm, RSA,
+# ghi chữ ký). Mặc định tắt: khi tắt, mỗi điểm đo chỉ tốn một lần kiểm tra
+# biến toàn cục. Bật bằng enable() hoặc biến môi trường RSA_INSTRUMENT=1.
+#
+# Khi bật qua biến môi trường, kết quả được ghi ra lúc thoát chương trình nếu
+# có đặt RSA_INSTRUMENT_PROMETHEUS và/hoặc RSA_INSTRUMENT_TRACE (đường dẫn file,
+# có thể chứa "{pid}"). Chỉ tiến trình chính được bật qua biến môi trường; các
+# tiến trình worker của pool (kế thừa biến môi trường) không đo và không ghi đè
+# file kết quả khi thoát.
+
+# Các mốc (giây) của histogram thời gian mỗi giai đoạn
+HISTOGRAM_BUCKETS = (0.00001, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+# Số sự kiện trace tối đa được giữ trong bộ nhớ
+MAX_TRACE_EVENTS = 100000
+
+_enabled = False
+_lock = threading.Lock()
+_phases = {}
+_trace_events = []
+_dropped_events = 0
+_origin = time.perf_counter()
+
+def enable():
+    """Bật đo đạc"""
+    global _enabled
+    _enabled = True
+
+def disable():
+    """Tắt đo đạc (dữ liệu đã thu vẫn được giữ)"""
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    """Đo đạc có đang bật không"""
+    return _enabled
+
+def reset():
+    """Xóa toàn bộ dữ liệu đã thu"""
+    global _dropped_events
+    with _lock:
+        _phases.clear()
+        _trace_events.clear()
+        _dropped_events = 0
+
+def record(name, seconds, nbytes=0, start=None):
+    """
+    Ghi nhận một lần thực hiện giai đoạn
+
+    Tham số:
+        name: Tên giai đoạn
+        seconds: Thời gian thực hiện (giây)
+        nbytes: Số byte đã xử lý
+        start: Thời điểm bắt đầu (perf_counter); None thì không ghi sự kiện trace
+    """
+    global _dropped_events
+    with _lock:
+        stats = _phases.get(name)
+        if stats is None:
+            stats = _phases[name] = {
+                "count": 0,
+                "seconds": 0.0,
+                "bytes": 0,
+                "max": 0.0,
+                "buckets": [0] * len(HISTOGRAM_BUCKETS)
+            }
+        stats["count"] += 1
+        stats["seconds"] += seconds
+        stats["bytes"] += nbytes
+        stats["max"] = max(stats["max"], seconds)
+        for i, bound in enumerate(HISTOGRAM_BUCKETS):
+            if seconds <= bound:
+                stats["buckets"][i] += 1
+                break
+
+        if start is not None:
+            if len(_trace_events) < MAX_TRACE_EVENTS:
+                event = {
+                    "name": name,
+                    "cat": "rsa",
+                    "ph": "X",
+                    "ts": (start - _origin) * 1e6,
+                    "dur": seconds * 1e6,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident()
+                }
+                if nbytes:
+                    event["args"] = {"bytes": nbytes}
+                _trace_events.append(event)
+            else:
+                _dropped_events += 1
+
+class _Phase:
+    """Đo thời gian một khối lệnh; dùng add_bytes() để cộng số byte đã xử lý"""
+
+    __slots__ = ("name", "nbytes", "start")
+
+    def __init__(self, name, nbytes):
+        self.name = name
+        self.nbytes = nbytes
+
+    def add_bytes(self, nbytes):
+        self.nbytes += nbytes
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        record(self.name, time.perf_counter() - self.start, self.nbytes, self.start)
+        return False
+
+class _NullPhase:
+    """Giai đoạn rỗng dùng khi đo đạc tắt"""
+
+    __slots__ = ()
+
+    def add_bytes(self, nbytes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_PHASE = _NullPhase()
+
+def phase(name, nbytes=0):
+    """
+    Context manager đo một giai đoạn
+
+    Ví dụ:
+        with instrumentation.phase("file_hash") as p:
+            ...
+            p.add_bytes(n)
+    """
+    if not _enabled:
+        return _NULL_PHASE
+    return _Phase(name, nbytes)
+
+def instrumented(name):
+    """Decorator đo thời gian của cả hàm như một giai đoạn"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start, 0, start)
+        return wrapper
+    return decorator
+
+class TimedReader:
+    """
+    Bọc đối tượng file để đo riêng thời gian đọc (I/O) so với thời gian băm
+
+    Mỗi lần đọc chỉ được cộng vào thống kê, không tạo sự kiện trace riêng.
+    """
+
+    def __init__(self, f, name="file_read"):
+        self._f = f
+        self._name = name
+
+    def read(self, size=-1):
+        start = time.perf_counter()
+        data = self._f.read(size)
+        record(self._name, time.perf_counter() - start, len(data))
+        return data
+
+    def readinto(self, buffer):
+        start = time.perf_counter()
+        n = self._f.readinto(buffer)
+        record(self._name, time.perf_counter() - start, n or 0)
+        return n
+
+    def fileno(self):
+        return self._f.fileno()
+
+def snapshot():
+    """
+    Bản sao dữ liệu đã thu
+
+    Trả về:
+        dict: Tên giai đoạn -> count, seconds, bytes, max, buckets
+    """
+    with _lock:
+        return {name: dict(stats, buckets=list(stats["buckets"])) for name, stats in _phases.items()}
+
+def _format_bound(bound):
+    return f"{bound:g}"
+
+def prometheus_text(prefix="rsa"):
+    """
+    Xuất dữ liệu theo định dạng văn bản của Prometheus
+
+    Trả về:
+        str: Histogram thời gian, bộ đếm byte và số lần thực hiện của từng giai đoạn
+    """
+    phases = snapshot()
+    lines = [
+        f"# HELP {prefix}_phase_seconds Thời gian thực hiện mỗi giai đoạn",
+        f"# TYPE {prefix}_phase_seconds histogram"
+    ]
+    for name in sorted(phases):
+        stats = phases[name]
+        cumulative = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS, stats["buckets"]):
+            cumulative += count
+            lines.append(f'{prefix}_phase_seconds_bucket{{phase="{name}",le="{_format_bound(bound)}"}} {cumulative}')
+        lines.append(f'{prefix}_phase_seconds_bucket{{phase="{name}",le="+Inf"}} {stats["count"]}')
+        lines.append(f'{prefix}_phase_seconds_sum{{phase="{name}"}} {stats["seconds"]:.9f}')
+        lines.append(f'{prefix}_phase_seconds_count{{phase="{name}"}} {stats["count"]}')
+    lines.append(f"# HELP {prefix}_phase_bytes_total Số byte đã xử lý trong mỗi giai đoạn")
+    lines.append(f"# TYPE {prefix}_phase_bytes_total counter")
+    for name in sorted(phases):
+        lines.append(f'{prefix}_phase_bytes_total{{phase="{name}"}} {phases[name]["bytes"]}')
+    return "\n".join(lines) + "\n"
+
+def chrome_trace():
+    """
+    Xuất các sự kiện theo định dạng trace-event JSON của Chrome
+
+    Mở bằng chrome://tracing hoặc https://ui.perfetto.dev để xem dạng flamegraph.
+    """
+    with _lock:
+        events = list(_trace_events)
+        dropped = _dropped_events
+    return {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"dropped_events": dropped}
+    }
+
+def save_prometheus(path):
+    """Ghi dữ liệu dạng Prometheus ra file"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(prometheus_text())
+
+def save_chrome_trace(path):
+    """Ghi trace dạng JSON của Chrome ra file"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(chrome_trace(), f)
+
+def print_summary():
+    """In bảng tổng hợp thời gian theo giai đoạn"""
+    phases = snapshot()
+    print("\n=== PHÂN TÍCH THEO GIAI ĐOẠN ===")
+    for name, stats in sorted(phases.items(), key=lambda item: -item[1]["seconds"]):
+        average_ms = stats["seconds"] / stats["count"] * 1000
+        line = (f"{name:<20} {stats['count']:>8} lần  {stats['seconds'] * 1000:>10.2f} ms  "
+                f"trung bình {average_ms:.3f} ms  max {stats['max'] * 1000:.3f} ms")
+        if stats["bytes"]:
+            line += f"  {stats['bytes'] / (1024 * 1024) / stats['seconds']:.1f} MB/s" if stats["seconds"] else ""
+        print(line)
+
+def _write_on_exit():
+    pid = os.getpid()
+    prometheus_path = os.environ.get("RSA_INSTRUMENT_PROMETHEUS")
+    trace_path = os.environ.get("RSA_INSTRUMENT_TRACE")
+    if prometheus_path:
+        save_prometheus(prometheus_path.format(pid=pid))
+    if trace_path:
+        save_chrome_trace(trace_path.format(pid=pid))
+
+def _is_main_process():
+    # Chỉ import multiprocessing khi đo đạc được bật qua biến môi trường. Worker
+    # kiểu spawn import lại module chính trước khi có parent_process(), nhưng
+    # tên tiến trình đã được đặt từ trước đó.
+    from multiprocessing import current_process, parent_process
+    return parent_process() is None and current_process().name == "MainProcess"
+
+if os.environ.get("RSA_INSTRUMENT") == "1" and _is_main_process():
+    enable()
+    atexit.register(_write_on_exit)
+    # Worker kiểu fork kế thừa trạng thái đã bật: tắt đo đạc trong tiến trình con
+    # (Windows không có fork nên không có os.register_at_fork)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=disable)
@@ -0,0 +1,110 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+from rsa_utils import load_private_key, load_public_key
+
+# Số khóa tối đa được giữ trong bộ nhớ đệm
+DEFAULT_MAX_ENTRIES = 32
+
+_lock = threading.Lock()
+_cache = OrderedDict()
+_max_entries = DEFAULT_MAX_ENTRIES
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+def _cache_key(kind, path, password=None):
+    """
+    Tạo khóa tra cứu từ loại khóa, đường dẫn, mtime, kích thước file và mật khẩu
+
+    Khi file khóa bị ghi đè (mtime hoặc kích thước thay đổi) khóa tra cứu cũng
+    đổi theo, nên bản cũ trong bộ nhớ đệm không bao giờ được dùng lại. Mật khẩu
+    chỉ được lưu dưới dạng hash để mật khẩu sai không dùng được khóa đã giải mã.
+    """
+    stat = os.stat(path)
+    password_hash = hashlib.sha256(password.encode()).hexdigest() if password else None
+    return (kind, os.path.abspath(path), stat.st_mtime_ns, stat.st_size, password_hash)
+
+def _get(kind, path, password, loader):
+    key = _cache_key(kind, path, password)
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return _cache[key]
+        _stats["misses"] += 1
+
+    # Đọc và giải mã PEM ngoài khóa lock vì có thể tốn thời gian (KDF)
+    loaded_key = loader()
+
+    with _lock:
+        # Bỏ các phiên bản cũ của cùng file khóa
+        for stale in [k for k in _cache if k[:2] == key[:2] and k != key]:
+            del _cache[stale]
+        _cache[key] = loaded_key
+        _cache.move_to_end(key)
+        while len(_cache) > _max_entries:
+            _cache.popitem(last=False)
+            _stats["evictions"] += 1
+    return loaded_key
+
+def get_private_key(path, password=None):
+    """Đọc khóa riêng tư từ file, dùng lại bản đã phân tích nếu file không đổi"""
+    return _get("private", path, password, lambda: load_private_key(path, password))
+
+def get_public_key(path):
+    """Đọc khóa công khai từ file, dùng lại bản đã phân tích nếu file không đổi"""
+    return _get("public", path, None, lambda: load_public_key(path))
+
+def evict(path=None):
+    """
+    Xóa khóa khỏi bộ nhớ đệm
+
+    Tham số:
+        path: Đường dẫn file khóa cần xóa (None = xóa toàn bộ)
+
+    Trả về:
+        int: Số mục đã xóa
+    """
+    with _lock:
+        if path is None:
+            removed = len(_cache)
+            _cache.clear()
+        else:
+            abs_path = os.path.abspath(path)
+            stale = [k for k in _cache if k[1] == abs_path]
+            for k in stale:
+                del _cache[k]
+            removed = len(stale)
+        _stats["evictions"] += removed
+        return removed
+
+def set_max_entries(max_entries):
+    """Đặt số khóa tối đa trong bộ nhớ đệm"""
+    global _max_entries
+    if max_entries < 1:
+        raise ValueError("Số mục tối đa phải lớn hơn 0")
+    with _lock:
+        _max_entries = max_entries
+        while len(_cache) > _max_entries:
+            _cache.popitem(last=False)
+            _stats["evictions"] += 1
+
+def cache_stats():
+    """Thống kê bộ nhớ đệm khóa: số lần trúng/trượt, số mục bị loại và tỉ lệ trúng"""
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "evictions": _stats["evictions"],
+            "size": len(_cache),
+            "max_entries": _max_entries,
+            "hit_rate": _stats["hits"] / lookups if lookups else 0.0
+        }
+
+def reset_stats():
+    """Đặt lại các bộ đếm thống kê"""
+    with _lock:
+        for name in _stats:
+            _stats[name] = 0
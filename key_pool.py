@@ -0,0 +1,174 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives import serialization
+
+import rsa_utils
+
+def _generate_private_key_der(key_size):
+    """
+    Tạo khóa RSA trong tiến trình worker
+
+    Đối tượng khóa của cryptography không pickle được nên khóa được trả về
+    dưới dạng DER (PKCS8, không mã hóa) cùng thời gian tạo khóa.
+    """
+    start_time = time.perf_counter()
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=key_size)
+    der = private_key.private_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+    return der, time.perf_counter() - start_time
+
+class KeyPool:
+    """
+    Kho cặp khóa RSA được tạo sẵn ở các tiến trình nền
+
+    Với mỗi kích thước khóa, pool luôn cố gắng giữ đủ high_water cặp khóa.
+    Mỗi lần lấy khóa ra, pool tự động gửi yêu cầu tạo thêm để bù lại.
+
+    Tham số:
+        key_sizes: Các kích thước khóa cần tạo sẵn
+        high_water: Số cặp khóa tối đa giữ sẵn cho mỗi kích thước
+        workers: Số tiến trình tạo khóa (mặc định bằng số lõi CPU)
+    """
+
+    def __init__(self, key_sizes=(2048,), high_water=4, workers=None):
+        if high_water < 1:
+            raise ValueError("high_water phải lớn hơn 0")
+        self.high_water = high_water
+        self._executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._start_time = time.perf_counter()
+        self._pools = {size: deque() for size in key_sizes}
+        self._stats = {
+            size: {"in_flight": 0, "generated": 0, "served": 0, "misses": 0, "failed": 0,
+                   "last_error": None, "generation_time": 0.0}
+            for size in key_sizes
+        }
+        for size in key_sizes:
+            self._refill(size)
+
+    def _refill(self, key_size):
+        """Gửi thêm yêu cầu tạo khóa để đạt mức high_water"""
+        with self._lock:
+            if self._closed:
+                return
+            stats = self._stats[key_size]
+            needed = self.high_water - len(self._pools[key_size]) - stats["in_flight"]
+            if needed <= 0:
+                return
+            # Giữ chỗ trước, gửi yêu cầu sau khi nhả khóa: future đã xong thì
+            # add_done_callback gọi _on_generated ngay trên luồng này
+            stats["in_flight"] += needed
+        futures = []
+        for submitted in range(needed):
+            try:
+                futures.append(self._executor.submit(_generate_private_key_der, key_size))
+            except Exception as e:
+                # Pool hỏng hoặc đã đóng: trả lại các chỗ chưa gửi được
+                self._record_failure(key_size, e, needed - submitted)
+                break
+        for future in futures:
+            future.add_done_callback(lambda f, size=key_size: self._on_generated(size, f))
+
+    def _record_failure(self, key_size, error, count=1):
+        with self._lock:
+            stats = self._stats[key_size]
+            stats["in_flight"] -= count
+            stats["failed"] += count
+            stats["last_error"] = f"{type(error).__name__}: {error}"
+
+    def _on_generated(self, key_size, future):
+        """Nhận khóa vừa tạo từ worker và đưa vào pool"""
+        if future.cancelled():
+            with self._lock:
+                self._stats[key_size]["in_flight"] -= 1
+            return
+        error = future.exception()
+        if error is not None:
+            self._record_failure(key_size, error)
+            return
+        with self._lock:
+            self._stats[key_size]["in_flight"] -= 1
+        der, generation_time = future.result()
+        private_key = serialization.load_der_private_key(der, password=None)
+        with self._lock:
+            self._pools[key_size].append((private_key, private_key.public_key()))
+            stats = self._stats[key_size]
+            stats["generated"] += 1
+            stats["generation_time"] += generation_time
+
+    def take(self, key_size):
+        """
+        Lấy ngay một cặp khóa đã tạo sẵn
+
+        Trả về:
+            tuple: (private_key, public_key), hoặc None nếu pool đang rỗng
+                   hay không quản lý kích thước khóa này
+        """
+        if key_size not in self._pools:
+            return None
+        with self._lock:
+            pool = self._pools[key_size]
+            if pool:
+                pair = pool.popleft()
+                self._stats[key_size]["served"] += 1
+            else:
+                pair = None
+                self._stats[key_size]["misses"] += 1
+        self._refill(key_size)
+        return pair
+
+    def metrics(self):
+        """
+        Thông số của pool theo từng kích thước khóa
+
+        Trả về:
+            dict: {key_size: {depth, in_flight, high_water, generated, served,
+                   misses, failed, last_error, refill_rate (khóa/giây),
+                   avg_generation_ms}}
+        """
+        elapsed = time.perf_counter() - self._start_time
+        with self._lock:
+            result = {}
+            for size, stats in self._stats.items():
+                generated = stats["generated"]
+                result[size] = {
+                    "depth": len(self._pools[size]),
+                    "in_flight": stats["in_flight"],
+                    "high_water": self.high_water,
+                    "generated": generated,
+                    "served": stats["served"],
+                    "misses": stats["misses"],
+                    "failed": stats["failed"],
+                    "last_error": stats["last_error"],
+                    "refill_rate": generated / elapsed if elapsed > 0 else 0.0,
+                    "avg_generation_ms": stats["generation_time"] / generated * 1000 if generated else 0.0
+                }
+            return result
+
+    def install(self):
+        """Dùng pool này cho rsa_utils.generate_key_pair"""
+        rsa_utils.set_key_pool(self)
+        return self
+
+    def close(self):
+        """Dừng các tiến trình tạo khóa và gỡ pool khỏi rsa_utils"""
+        with self._lock:
+            self._closed = True
+        if rsa_utils.get_key_pool() is self:
+            rsa_utils.set_key_pool(None)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
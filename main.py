@@ -1,16 +1,21 @@
 import os
-import tkinter as tk
-from tkinter import messagebox
+import sys
 
-try:
-    from gui import RSASignatureApp
-    from file_utils import create_default_directories
-except ImportError as e:
-    messagebox.showerror("Lỗi khi import", f"Không thể import các module cần thiết: {str(e)}")
-    exit(1)
+# Tk và giao diện chỉ được import khi mở cửa sổ; có tham số dòng lệnh thì
+# chuyển sang cli.py (không nạp tkinter, PIL), ví dụ: python main.py sign file.txt --key ...
 
 def main():
     """Hàm chính để khởi chạy ứng dụng"""
+    import tkinter as tk
+    from tkinter import messagebox
+    
+    try:
+        from gui import RSASignatureApp
+        from file_utils import create_default_directories
+    except ImportError as e:
+        messagebox.showerror("Lỗi khi import", f"Không thể import các module cần thiết: {str(e)}")
+        exit(1)
+    
     # Tạo các thư mục mặc định
     try:
         create_default_directories()
@@ -49,8 +54,12 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main())
     try:
         main()
     except Exception as e:
+        from tkinter import messagebox
         messagebox.showerror("Lỗi không xác định", f"Đã xảy ra lỗi không mong muốn: {str(e)}")
         exit(1) 
\ No newline at end of file
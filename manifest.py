@@ -0,0 +1,329 @@
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from rsa_utils import (
+    calculate_file_hash, calculate_data_hash, sign_digest, verify_digest,
+    public_key_fingerprint, key_algorithm, HASH_ALGORITHMS, DEFAULT_HASH_ALGORITHM
+)
+from key_cache import get_private_key, get_public_key
+from digest_cache import DigestCache
+from file_utils import save_signature, save_signature_info, load_signature, load_signature_info
+
+# Tên file manifest mặc định, đặt trong thư mục gốc
+DEFAULT_MANIFEST_NAME = "MANIFEST"
+# Dòng đầu của manifest; phiên bản định dạng và thuật toán hash
+MANIFEST_MAGIC = "# signed-manifest v1"
+# Tiền tố dòng của một liên kết tượng trưng trong manifest
+LINK_PREFIX = "link "
+# Số đường dẫn tối đa in ra cho mỗi loại khác biệt
+MAX_REPORTED_PATHS = 20
+
+def _relative_path(file_path, root_dir):
+    """Đường dẫn tương đối dùng '/' làm dấu phân cách trên mọi hệ điều hành"""
+    return os.path.relpath(file_path, root_dir).replace(os.sep, "/")
+
+def manifest_outputs(manifest_path):
+    """Các file do chính manifest tạo ra (không được ghi vào manifest)"""
+    return [manifest_path, manifest_path + ".sig", manifest_path + ".sig.info"]
+
+def scan_tree(root_dir, exclude_paths=()):
+    """
+    Liệt kê mọi mục trong cây thư mục để ghi vào manifest
+
+    Khác với batch_signer.iter_files, mọi file đều được liệt kê, kể cả các
+    file chữ ký (.sig, .sig.info, .rsig), vì manifest phải bao phủ toàn bộ
+    cây; chỉ các đường dẫn trong exclude_paths (manifest và chữ ký của nó) bị
+    bỏ qua. Liên kết tượng trưng không được đi theo mà được ghi lại kèm đích
+    của liên kết. Các mục đặc biệt (FIFO, socket, thiết bị) bị bỏ qua.
+
+    Trả về:
+        dict: {đường dẫn tương đối: (đường dẫn đầy đủ, kích thước, đích liên kết)};
+              với file thường đích là None, với liên kết kích thước là None
+    """
+    excluded = {os.path.abspath(path) for path in exclude_paths}
+    files = {}
+    stack = [root_dir]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if os.path.abspath(entry.path) in excluded:
+                    continue
+                relative_path = _relative_path(entry.path, root_dir)
+                if entry.is_symlink():
+                    files[relative_path] = (entry.path, None, os.readlink(entry.path))
+                elif entry.is_dir():
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    files[relative_path] = (entry.path, entry.stat().st_size, None)
+    return files
+
+def hash_files(paths, hash_algorithm=DEFAULT_HASH_ALGORITHM, workers=None, digest_cache=None):
+    """
+    Băm song song nhiều file trên pool luồng
+
+    hashlib nhả GIL khi băm các khối lớn, còn phần đọc file là I/O, nên luồng
+    đủ để tận dụng nhiều lõi mà không phải chuyển dữ liệu giữa các tiến trình.
+
+    Tham số:
+        paths: Danh sách đường dẫn file
+        digest_cache: digest_cache.DigestCache để bỏ qua việc băm lại file không đổi
+
+    Trả về:
+        list: Giá trị hash theo đúng thứ tự paths
+    """
+    workers = workers or min(32, (os.cpu_count() or 1) * 2)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(
+            lambda path: calculate_file_hash(path, cache=digest_cache, hash_algorithm=hash_algorithm),
+            paths
+        ))
+
+def format_manifest(entries, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+    """
+    Tạo nội dung manifest ở dạng chuẩn (canonical)
+
+    Dòng đầu là MANIFEST_MAGIC kèm thuật toán hash; mỗi dòng sau là
+    "<hash hex> <kích thước> <đường dẫn dạng chuỗi JSON>" với file thường hoặc
+    "link <đích dạng chuỗi JSON> <đường dẫn dạng chuỗi JSON>" với liên kết
+    tượng trưng, sắp xếp theo đường dẫn, kết thúc bằng "\\n" và mã hóa UTF-8.
+    Cùng một cây thư mục luôn cho cùng một chuỗi byte, nên chữ ký trên
+    manifest bao phủ toàn bộ cây.
+
+    Tham số:
+        entries: dict {đường dẫn tương đối: (kích thước, hash)}; liên kết
+                 tượng trưng có dạng (None, đích liên kết)
+
+    Trả về:
+        bytes: Nội dung manifest
+    """
+    lines = [f"{MANIFEST_MAGIC} hash={hash_algorithm}\n"]
+    for path in sorted(entries):
+        size, value = entries[path]
+        quoted_path = json.dumps(path, ensure_ascii=False)
+        if size is None:
+            lines.append(f"{LINK_PREFIX}{json.dumps(value, ensure_ascii=False)} {quoted_path}\n")
+        else:
+            lines.append(f"{value.hex()} {size} {quoted_path}\n")
+    return "".join(lines).encode('utf-8')
+
+def parse_manifest(data):
+    """
+    Đọc nội dung manifest
+
+    Trả về:
+        tuple: (thuật toán hash, dict {đường dẫn tương đối: (kích thước, hash)
+               hoặc (None, đích liên kết)})
+    """
+    lines = data.decode('utf-8').split("\n")
+    header = lines[0].split(" hash=")
+    if len(header) != 2 or header[0] != MANIFEST_MAGIC or header[1] not in HASH_ALGORITHMS:
+        raise ValueError("File không phải manifest hợp lệ")
+    entries = {}
+    for number, line in enumerate(lines[1:], start=2):
+        if not line:
+            continue
+        try:
+            if line.startswith(LINK_PREFIX):
+                decoder = json.JSONDecoder()
+                target, end = decoder.raw_decode(line, len(LINK_PREFIX))
+                entries[json.loads(line[end + 1:])] = (None, target)
+                continue
+            digest, size, path = line.split(" ", 2)
+            entries[json.loads(path)] = (int(size), bytes.fromhex(digest))
+        except ValueError:
+            raise ValueError(f"Dòng {number} của manifest không hợp lệ")
+    return header[1], entries
+
+def create_manifest(private_key_path, root_dir, manifest_path=None, password=None, workers=None,
+                    hash_algorithm=DEFAULT_HASH_ALGORITHM, creator="", digest_cache_path=None):
+    """
+    Băm toàn bộ cây thư mục, ghi manifest và ký manifest bằng một chữ ký
+
+    Chữ ký và thông tin chữ ký được lưu thành <manifest>.sig và
+    <manifest>.sig.info như một file đã ký thông thường.
+
+    Tham số:
+        private_key_path: Đường dẫn file khóa riêng tư (PEM)
+        root_dir: Thư mục gốc cần ký
+        manifest_path: File manifest (mặc định: MANIFEST trong thư mục gốc)
+        workers: Số luồng băm
+        digest_cache_path: File cache hash (SQLite) để không băm lại file không đổi
+
+    Trả về:
+        dict: Thống kê gồm số file, số byte, thời gian băm và ký
+    """
+    if hash_algorithm not in HASH_ALGORITHMS:
+        raise ValueError(f"Thuật toán hash không được hỗ trợ: {hash_algorithm}")
+    manifest_path = manifest_path or os.path.join(root_dir, DEFAULT_MANIFEST_NAME)
+    private_key = get_private_key(private_key_path, password)
+    digest_cache = DigestCache(digest_cache_path) if digest_cache_path else None
+
+    start_time = time.perf_counter()
+    files = scan_tree(root_dir, manifest_outputs(manifest_path))
+    entries = {path: (None, target) for path, (_, _, target) in files.items() if target is not None}
+    paths = sorted(path for path in files if path not in entries)
+    digests = hash_files([files[path][0] for path in paths], hash_algorithm, workers, digest_cache)
+    entries.update((path, (files[path][1], digest)) for path, digest in zip(paths, digests))
+    hash_elapsed = time.perf_counter() - start_time
+
+    data = format_manifest(entries, hash_algorithm)
+    digest = calculate_data_hash(data, hash_algorithm)
+    sign_start = time.perf_counter()
+    signature = sign_digest(private_key, digest, hash_algorithm)
+    sign_elapsed = time.perf_counter() - sign_start
+
+    with open(manifest_path, 'wb') as f:
+        f.write(data)
+    signature_path = manifest_path + ".sig"
+    save_signature(signature, signature_path)
+    save_signature_info(manifest_path, signature_path, signature_path + ".info", creator, {
+        "digest": digest.hex(),
+        "hash_algorithm": hash_algorithm,
+        "key_fingerprint": public_key_fingerprint(private_key.public_key()).hex(),
+        "signature_algorithm": key_algorithm(private_key),
+        "manifest_entries": len(entries)
+    })
+    return {
+        "manifest": manifest_path,
+        "signature": signature_path,
+        "files": len(entries),
+        "bytes": sum(size for size, _ in entries.values() if size is not None),
+        "hash_elapsed": hash_elapsed,
+        "sign_elapsed": sign_elapsed,
+        "elapsed": time.perf_counter() - start_time
+    }
+
+def compare_entries(expected, files, actual_digests):
+    """
+    So sánh manifest với cây thư mục hiện tại
+
+    Tham số:
+        expected: dict {đường dẫn: (kích thước, hash) hoặc (None, đích liên kết)} từ manifest
+        files: dict {đường dẫn: (đường dẫn đầy đủ, kích thước, đích liên kết)} từ scan_tree
+        actual_digests: dict {đường dẫn: hash} của các file đã băm lại
+
+    Trả về:
+        tuple: (danh sách thêm mới, danh sách bị xóa, danh sách bị sửa), đã sắp xếp
+    """
+    added = sorted(files.keys() - expected.keys())
+    removed = sorted(expected.keys() - files.keys())
+    changed = sorted(path for path in expected.keys() & files.keys()
+                     if not _entry_matches(expected[path], files[path], actual_digests.get(path)))
+    return added, removed, changed
+
+def _entry_matches(expected, current, digest):
+    """Một mục của manifest có khớp với trạng thái hiện tại không"""
+    expected_size, expected_value = expected
+    _, size, target = current
+    if expected_size is None:
+        return target == expected_value
+    return target is None and size == expected_size and digest == expected_value
+
+def verify_manifest(public_key_path, root_dir, manifest_path=None, workers=None, digest_cache_path=None):
+    """
+    Xác thực chữ ký của manifest rồi đối chiếu với cây thư mục hiện tại
+
+    File có kích thước khác manifest được coi là bị sửa mà không cần băm lại;
+    các file còn lại được băm song song.
+
+    Trả về:
+        dict: signature_valid, các danh sách added/removed/changed, số file
+              và ok (chữ ký hợp lệ và không có khác biệt)
+    """
+    manifest_path = manifest_path or os.path.join(root_dir, DEFAULT_MANIFEST_NAME)
+    signature_path = manifest_path + ".sig"
+    public_key = get_public_key(public_key_path)
+    info_path = signature_path + ".info"
+    signature_info = load_signature_info(info_path) if os.path.exists(info_path) else {}
+
+    start_time = time.perf_counter()
+    # Đọc manifest một lần: cùng các byte này được xác thực và phân tích
+    with open(manifest_path, 'rb') as f:
+        data = f.read()
+    hash_algorithm, expected = parse_manifest(data)
+    signature_valid = (
+        signature_info.get("signature_algorithm", key_algorithm(public_key)) == key_algorithm(public_key)
+        and signature_info.get("hash_algorithm", hash_algorithm) == hash_algorithm
+        and verify_digest(public_key, calculate_data_hash(data, hash_algorithm), load_signature(signature_path),
+                          hash_algorithm)
+    )
+
+    files = scan_tree(root_dir, manifest_outputs(manifest_path))
+    # Chỉ băm lại các file thường có trong manifest với cùng kích thước
+    to_hash = sorted(path for path in expected.keys() & files.keys()
+                     if files[path][2] is None and expected[path][0] is not None
+                     and files[path][1] == expected[path][0])
+    digest_cache = DigestCache(digest_cache_path) if digest_cache_path else None
+    actual_digests = {}
+    for path, digest in zip(to_hash, hash_files([files[path][0] for path in to_hash], hash_algorithm,
+                                                workers, digest_cache)):
+        actual_digests[path] = digest
+    added, removed, changed = compare_entries(expected, files, actual_digests)
+
+    return {
+        "signature_valid": signature_valid,
+        "files": len(files),
+        "hashed": len(to_hash),
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+        "ok": signature_valid and not (added or removed or changed),
+        "elapsed": time.perf_counter() - start_time
+    }
+
+def print_report(report):
+    """In kết quả đối chiếu manifest"""
+    print("\n=== KẾT QUẢ XÁC THỰC MANIFEST ===")
+    print("Chữ ký manifest: " + ("hợp lệ" if report["signature_valid"] else "KHÔNG hợp lệ"))
+    print(f"Số file hiện có: {report['files']} (băm lại {report['hashed']})")
+    for key, label in (("added", "Thêm mới"), ("removed", "Bị xóa"), ("changed", "Bị sửa")):
+        paths = report[key]
+        print(f"{label}: {len(paths)}")
+        for path in paths[:MAX_REPORTED_PATHS]:
+            print(f"    {path}")
+        if len(paths) > MAX_REPORTED_PATHS:
+            print(f"    ... và {len(paths) - MAX_REPORTED_PATHS} file khác")
+    print(f"Thời gian: {report['elapsed']:.2f} s")
+    print("Kết luận: " + ("khớp với manifest" if report["ok"] else "KHÔNG khớp với manifest"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Ký và xác thực cả cây thư mục bằng một manifest đã ký")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    create = subparsers.add_parser("create", help="Băm cây thư mục, ghi và ký manifest")
+    create.add_argument("root_dir", help="Thư mục cần ký")
+    create.add_argument("--key", required=True, help="File khóa riêng tư (PEM)")
+    create.add_argument("--password", default=None, help="Mật khẩu khóa riêng tư")
+    create.add_argument("--manifest", default=None, help=f"File manifest (mặc định: <root_dir>/{DEFAULT_MANIFEST_NAME})")
+    create.add_argument("--workers", type=int, default=None, help="Số luồng băm")
+    create.add_argument("--hash", choices=HASH_ALGORITHMS, default=DEFAULT_HASH_ALGORITHM, help="Thuật toán hash")
+    create.add_argument("--creator", default="", help="Tên người tạo chữ ký")
+    create.add_argument("--digest-cache", default=None, help="File cache hash (SQLite)")
+
+    verify = subparsers.add_parser("verify", help="Xác thực manifest và đối chiếu với cây thư mục")
+    verify.add_argument("root_dir", help="Thư mục cần xác thực")
+    verify.add_argument("--key", required=True, help="File khóa công khai (PEM)")
+    verify.add_argument("--manifest", default=None, help=f"File manifest (mặc định: <root_dir>/{DEFAULT_MANIFEST_NAME})")
+    verify.add_argument("--workers", type=int, default=None, help="Số luồng băm")
+    verify.add_argument("--digest-cache", default=None, help="File cache hash (SQLite)")
+    args = parser.parse_args()
+
+    if args.command == "create":
+        summary = create_manifest(args.key, args.root_dir, args.manifest, args.password, args.workers,
+                                  args.hash, args.creator, args.digest_cache)
+        print(f"Đã ghi {summary['manifest']} ({summary['files']} file, "
+              f"{summary['bytes'] / (1024 * 1024):.2f} MB) và chữ ký {summary['signature']}")
+        print(f"Thời gian: băm {summary['hash_elapsed']:.2f} s, ký {summary['sign_elapsed'] * 1000:.2f} ms, "
+              f"tổng {summary['elapsed']:.2f} s")
+    else:
+        report = verify_manifest(args.key, args.root_dir, args.manifest, args.workers, args.digest_cache)
+        print_report(report)
+        sys.exit(0 if report["ok"] else 1)
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,18 @@
 import time
 import os
-import matplotlib.pyplot as plt
-import numpy as np
-from rsa_utils import generate_key_pair, sign_data, verify_signature, sign_file, verify_file_signature
-import psutil
+import sys
+import json
+import argparse
+from datetime import datetime
+from rsa_utils import (
+    generate_key_pair, sign_data, verify_signature, sign_file, verify_file_signature,
+    calculate_file_hash, calculate_data_hash, sign_digest, verify_digest, HASH_BACKENDS, HASH_ALGORITHMS
+)
 import platform
-from cryptography import __version__ as crypto_version
+
+# matplotlib, numpy và psutil chỉ được import trong các hàm vẽ biểu đồ/thu
+# thập thông số hệ thống, để việc import module này (ví dụ lấy các hàm thống
+# kê hay so sánh kết quả) không tốn thời gian khởi động
 
 def measure_execution_time(func, *args, **kwargs):
     """
@@ -24,9 +31,105 @@ def measure_execution_time(func, *args, **kwargs):
     execution_time_ms = (end_time - start_time) * 1000
     return result, execution_time_ms
 
-def test_text_data_performance():
+# Số lần chạy khởi động (không tính) và số lần đo mặc định
+DEFAULT_WARMUP = 3
+DEFAULT_REPEAT = 20
+
+# Ngưỡng mặc định để coi là suy giảm hiệu suất khi so sánh hai lần chạy (10%)
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+
+def _int_at_least(minimum):
+    """Kiểu tham số argparse: số nguyên không nhỏ hơn minimum"""
+    def parse(value):
+        try:
+            number = int(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"không phải số nguyên: {value}")
+        if number < minimum:
+            raise argparse.ArgumentTypeError(f"phải lớn hơn hoặc bằng {minimum}: {value}")
+        return number
+    return parse
+
+# Số lần đo phải có ít nhất một mẫu; số lần chạy khởi động có thể bằng 0
+positive_int = _int_at_least(1)
+non_negative_int = _int_at_least(0)
+
+def percentile(sorted_values, fraction):
+    """Phân vị của danh sách đã sắp xếp (nội suy tuyến tính)"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def summarize_samples(samples):
+    """
+    Tính các thống kê cho một tập thời gian đo
+
+    Tham số:
+        samples: Danh sách thời gian (ms)
+
+    Trả về:
+        dict: median, iqr, p99, mean, min, max (ms), số lần đo và các mẫu
+    """
+    if not samples:
+        raise ValueError("Cần ít nhất một lần đo")
+    ordered = sorted(samples)
+    return {
+        "median": percentile(ordered, 0.50),
+        "iqr": percentile(ordered, 0.75) - percentile(ordered, 0.25),
+        "p99": percentile(ordered, 0.99),
+        "mean": sum(ordered) / len(ordered),
+        "min": ordered[0],
+        "max": ordered[-1],
+        "repeat": len(ordered),
+        "samples": samples
+    }
+
+def benchmark(func, *args, warmup=DEFAULT_WARMUP, repeat=DEFAULT_REPEAT, **kwargs):
+    """
+    Đo thời gian thực thi của một hàm nhiều lần sau các lần chạy khởi động
+
+    Các lần chạy khởi động làm nóng bộ nhớ đệm (file, CPU, khởi tạo thư viện)
+    và không được tính vào kết quả.
+
+    Tham số:
+        func: Hàm cần đo thời gian
+        *args, **kwargs: Tham số truyền vào hàm
+        warmup: Số lần chạy khởi động
+        repeat: Số lần đo
+
+    Trả về:
+        tuple: (kết quả của lần gọi cuối, dict thống kê từ summarize_samples)
+    """
+    result = None
+    for _ in range(warmup):
+        result = func(*args, **kwargs)
+    samples = []
+    for _ in range(repeat):
+        result, elapsed_ms = measure_execution_time(func, *args, **kwargs)
+        samples.append(elapsed_ms)
+    return result, summarize_samples(samples)
+
+def format_stats(stats):
+    """Chuỗi mô tả ngắn gọn thống kê thời gian"""
+    return (f"median {stats['median']:.2f} ms (IQR {stats['iqr']:.2f}, "
+            f"p99 {stats['p99']:.2f}, n={stats['repeat']})")
+
+def plot_with_spread(x, stats_list, label):
+    """Vẽ đường theo median, thanh sai số là khoảng tứ phân vị"""
+    import matplotlib.pyplot as plt
+    medians = [stats["median"] for stats in stats_list]
+    spread = [stats["iqr"] / 2 for stats in stats_list]
+    plt.errorbar(x, medians, yerr=spread, fmt='o-', capsize=4, label=label)
+
+def test_text_data_performance(warmup=DEFAULT_WARMUP, repeat=DEFAULT_REPEAT):
     """
     Thử nghiệm hiệu suất với dữ liệu văn bản (4.3.2)
+
+    Trả về:
+        dict: Thống kê thời gian theo tên phép đo
     """
     print("\n=== THỬ NGHIỆM VỚI DỮ LIỆU VĂN BẢN ===")
     
@@ -37,27 +140,33 @@ def test_text_data_performance():
     text_sizes = [1, 10, 100, 1000]
     signing_times = []
     verification_times = []
+    results = {}
     
     for size in text_sizes:
         # Tạo văn bản với kích thước tương ứng
         text = "A" * (size * 1024)
         
         # Đo thời gian ký
-        signature, signing_time = measure_execution_time(sign_data, private_key, text)
-        signing_times.append(signing_time)
+        signature, signing_stats = benchmark(sign_data, private_key, text, warmup=warmup, repeat=repeat)
+        signing_times.append(signing_stats)
         
         # Đo thời gian xác thực
-        _, verification_time = measure_execution_time(verify_signature, public_key, text, signature)
-        verification_times.append(verification_time)
+        _, verification_stats = benchmark(verify_signature, public_key, text, signature,
+                                          warmup=warmup, repeat=repeat)
+        verification_times.append(verification_stats)
+        
+        results[f"sign_{size}KB"] = signing_stats
+        results[f"verify_{size}KB"] = verification_stats
         
         print(f"\nKích thước văn bản: {size}KB")
-        print(f"Thời gian ký: {signing_time:.2f} ms")
-        print(f"Thời gian xác thực: {verification_time:.2f} ms")
+        print(f"Thời gian ký: {format_stats(signing_stats)}")
+        print(f"Thời gian xác thực: {format_stats(verification_stats)}")
     
     # Vẽ biểu đồ
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
-    plt.plot(text_sizes, signing_times, 'o-', label='Thời gian ký')
-    plt.plot(text_sizes, verification_times, 'o-', label='Thời gian xác thực')
+    plot_with_spread(text_sizes, signing_times, 'Thời gian ký')
+    plot_with_spread(text_sizes, verification_times, 'Thời gian xác thực')
     plt.xlabel('Kích thước văn bản (KB)')
     plt.ylabel('Thời gian (ms)')
     plt.title('Hiệu suất xử lý văn bản')
@@ -65,10 +174,14 @@ def test_text_data_performance():
     plt.grid(True)
     plt.savefig('text_performance.png')
     plt.close()
+    return results
 
-def test_image_data_performance():
+def test_image_data_performance(warmup=DEFAULT_WARMUP, repeat=DEFAULT_REPEAT):
     """
     Thử nghiệm hiệu suất với dữ liệu hình ảnh (4.3.3)
+
+    Trả về:
+        dict: Thống kê thời gian theo tên phép đo
     """
     print("\n=== THỬ NGHIỆM VỚI DỮ LIỆU HÌNH ẢNH ===")
     
@@ -86,6 +199,7 @@ def test_image_data_performance():
     signing_times = []
     verification_times = []
     file_sizes = []
+    results = {}
     
     for image_file in image_files:
         if not os.path.exists(image_file):
@@ -96,22 +210,28 @@ def test_image_data_performance():
         file_sizes.append(file_size)
         
         # Đo thời gian ký
-        signature, signing_time = measure_execution_time(sign_file, private_key, image_file)
-        signing_times.append(signing_time)
+        signature, signing_stats = benchmark(sign_file, private_key, image_file, warmup=warmup, repeat=repeat)
+        signing_times.append(signing_stats)
         
         # Đo thời gian xác thực
-        _, verification_time = measure_execution_time(verify_file_signature, public_key, image_file, signature)
-        verification_times.append(verification_time)
+        _, verification_stats = benchmark(verify_file_signature, public_key, image_file, signature,
+                                          warmup=warmup, repeat=repeat)
+        verification_times.append(verification_stats)
+        
+        name = os.path.basename(image_file)
+        results[f"sign_{name}"] = signing_stats
+        results[f"verify_{name}"] = verification_stats
         
         print(f"\nFile: {image_file}")
         print(f"Kích thước: {file_size:.2f} MB")
-        print(f"Thời gian ký: {signing_time:.2f} ms")
-        print(f"Thời gian xác thực: {verification_time:.2f} ms")
+        print(f"Thời gian ký: {format_stats(signing_stats)}")
+        print(f"Thời gian xác thực: {format_stats(verification_stats)}")
     
     # Vẽ biểu đồ
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
-    plt.plot(file_sizes, signing_times, 'o-', label='Thời gian ký')
-    plt.plot(file_sizes, verification_times, 'o-', label='Thời gian xác thực')
+    plot_with_spread(file_sizes, signing_times, 'Thời gian ký')
+    plot_with_spread(file_sizes, verification_times, 'Thời gian xác thực')
     plt.xlabel('Kích thước file (MB)')
     plt.ylabel('Thời gian (ms)')
     plt.title('Hiệu suất xử lý hình ảnh')
@@ -119,70 +239,356 @@ def test_image_data_performance():
     plt.grid(True)
     plt.savefig('image_performance.png')
     plt.close()
+    return results
 
-def test_key_size_performance():
+def test_key_size_performance(warmup=DEFAULT_WARMUP, repeat=DEFAULT_REPEAT):
     """
     Thử nghiệm hiệu suất với các kích thước khóa khác nhau (4.3.4)
+
+    Ngoài RSA 1024-4096 bit còn đo Ed25519 và ECDSA P-256 để so sánh thông
+    lượng ký/xác thực giữa các thuật toán. Việc tạo khóa RSA rất chậm (nhất
+    là 4096 bit) và có phương sai lớn, nên chỉ được khởi động một lần và đo
+    tối đa 5 lần.
+
+    Trả về:
+        dict: Thống kê thời gian theo tên phép đo
     """
     print("\n=== THỬ NGHIỆM VỚI CÁC KÍCH THƯỚC KHÓA KHÁC NHAU ===")
     
-    # Các kích thước khóa cần thử nghiệm
-    key_sizes = [1024, 2048, 3072, 4096]
+    # Các cấu hình cần thử nghiệm: (nhãn, thuật toán, kích thước khóa, tên phép đo)
+    configurations = [(f"RSA {size}", "rsa-pss", size, str(size)) for size in (1024, 2048, 3072, 4096)]
+    configurations += [("Ed25519", "ed25519", None, "ed25519"), ("ECDSA P-256", "ecdsa-p256", None, "ecdsa-p256")]
     
     key_generation_times = []
     signing_times = []
     verification_times = []
+    results = {}
     
     # Dữ liệu mẫu để ký và xác thực
     sample_data = "Test data for key size performance" * 100
     
-    for size in key_sizes:
-        print(f"\nKích thước khóa: {size} bit")
+    for label, algorithm, size, name in configurations:
+        print(f"\nKhóa: {label}" + (" bit" if size else ""))
         
-        # Đo thời gian tạo khóa
-        result, gen_time = measure_execution_time(generate_key_pair, size)
+        # Đo thời gian tạo khóa (không dùng pool khóa tạo sẵn)
+        result, gen_stats = benchmark(generate_key_pair, size, use_pool=False, algorithm=algorithm,
+                                      warmup=min(warmup, 1), repeat=min(repeat, 5))
         private_key, public_key = result
-        key_generation_times.append(gen_time)
-        print(f"Thời gian tạo khóa: {gen_time:.2f} ms")
+        key_generation_times.append(gen_stats)
+        print(f"Thời gian tạo khóa: {format_stats(gen_stats)}")
         
         # Đo thời gian ký
-        signature, signing_time = measure_execution_time(sign_data, private_key, sample_data)
-        signing_times.append(signing_time)
-        print(f"Thời gian ký: {signing_time:.2f} ms")
+        signature, signing_stats = benchmark(sign_data, private_key, sample_data, warmup=warmup, repeat=repeat)
+        signing_times.append(signing_stats)
+        print(f"Thời gian ký: {format_stats(signing_stats)}")
         
         # Đo thời gian xác thực
-        _, verification_time = measure_execution_time(verify_signature, public_key, sample_data, signature)
-        verification_times.append(verification_time)
-        print(f"Thời gian xác thực: {verification_time:.2f} ms")
+        _, verification_stats = benchmark(verify_signature, public_key, sample_data, signature,
+                                          warmup=warmup, repeat=repeat)
+        verification_times.append(verification_stats)
+        print(f"Thời gian xác thực: {format_stats(verification_stats)}")
+        print(f"Thông lượng (1 lõi): {1000 / signing_stats['median']:.0f} chữ ký/s, "
+              f"{1000 / verification_stats['median']:.0f} lần xác thực/s")
+        
+        results[f"keygen_{name}"] = gen_stats
+        results[f"sign_{name}"] = signing_stats
+        results[f"verify_{name}"] = verification_stats
     
-    # Vẽ biểu đồ
+    # Vẽ biểu đồ (trục thời gian dạng log vì RSA 4096 và Ed25519 chênh nhau hàng trăm lần)
+    positions = list(range(len(configurations)))
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
-    plt.plot(key_sizes, key_generation_times, 'o-', label='Tạo khóa')
-    plt.plot(key_sizes, signing_times, 'o-', label='Ký')
-    plt.plot(key_sizes, verification_times, 'o-', label='Xác thực')
-    plt.xlabel('Kích thước khóa (bit)')
+    plot_with_spread(positions, key_generation_times, 'Tạo khóa')
+    plot_with_spread(positions, signing_times, 'Ký')
+    plot_with_spread(positions, verification_times, 'Xác thực')
+    plt.xticks(positions, [configuration[0] for configuration in configurations])
+    plt.yscale('log')
+    plt.xlabel('Thuật toán / kích thước khóa')
     plt.ylabel('Thời gian (ms)')
-    plt.title('Hiệu suất theo kích thước khóa')
+    plt.title('Hiệu suất theo thuật toán và kích thước khóa')
     plt.legend()
     plt.grid(True)
     plt.savefig('key_size_performance.png')
     plt.close()
+    return results
 
-def report_system_metrics():
+def test_hash_backend_performance(warmup=DEFAULT_WARMUP, repeat=DEFAULT_REPEAT):
+    """
+    So sánh thông lượng tính hash file của các backend đọc file
+
+    Thông lượng được tính từ median thời gian; các lần khởi động đưa file vào
+    page cache nên kết quả phản ánh tốc độ băm khi file đã được đệm.
+
+    Trả về:
+        dict: Thống kê thời gian theo tên phép đo (kèm thông lượng MB/s)
+    """
+    print("\n=== THỬ NGHIỆM CÁC BACKEND TÍNH HASH FILE ===")
+    
+    # Các kích thước file cần thử nghiệm (tính bằng MB)
+    file_sizes_mb = [1, 16, 128]
+    os.makedirs("temp", exist_ok=True)
+    
+    throughputs = {backend: [] for backend in HASH_BACKENDS}
+    results = {}
+    
+    for size_mb in file_sizes_mb:
+        test_file = os.path.join("temp", f"hash_test_{size_mb}MB.bin")
+        with open(test_file, 'wb') as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024 * 1024))
+        
+        print(f"\nKích thước file: {size_mb} MB")
+        try:
+            expected = calculate_file_hash(test_file, backend='read')
+            for backend in HASH_BACKENDS:
+                digest, hash_stats = benchmark(calculate_file_hash, test_file, backend=backend,
+                                               warmup=warmup, repeat=repeat)
+                if digest != expected:
+                    print(f"Cảnh báo: backend {backend} cho kết quả hash khác")
+                hash_time = hash_stats["median"]
+                throughput = size_mb / (hash_time / 1000) if hash_time > 0 else 0.0
+                throughputs[backend].append(throughput)
+                hash_stats["mb_per_sec"] = throughput
+                results[f"{backend}_{size_mb}MB"] = hash_stats
+                print(f"{backend:>9}: {format_stats(hash_stats)} ({throughput:.2f} MB/s)")
+        finally:
+            os.remove(test_file)
+    
+    # Vẽ biểu đồ cột đặt cạnh nhau cho từng backend
+    import matplotlib.pyplot as plt
+    import numpy as np
+    plt.figure(figsize=(10, 6))
+    x = np.arange(len(file_sizes_mb))
+    width = 0.8 / len(HASH_BACKENDS)
+    for i, backend in enumerate(HASH_BACKENDS):
+        plt.bar(x + i * width, throughputs[backend], width, label=backend)
+    plt.xticks(x + width * (len(HASH_BACKENDS) - 1) / 2, [f"{size} MB" for size in file_sizes_mb])
+    plt.xlabel('Kích thước file')
+    plt.ylabel('Thông lượng (MB/s)')
+    plt.title('Thông lượng tính hash theo backend đọc file')
+    plt.legend()
+    plt.grid(True, axis='y')
+    plt.savefig('hash_backend_performance.png')
+    plt.close()
+    return results
+
+def test_hash_algorithm_performance(warmup=DEFAULT_WARMUP, repeat=DEFAULT_REPEAT):
+    """
+    So sánh thông lượng tính hash file và thời gian ký/xác thực của các thuật toán hash
+
+    Trả về:
+        dict: Thống kê thời gian theo tên phép đo (kèm thông lượng MB/s với phép băm)
+    """
+    print("\n=== THỬ NGHIỆM CÁC THUẬT TOÁN HASH ===")
+    
+    # Các kích thước file cần thử nghiệm (tính bằng MB)
+    file_sizes_mb = [1, 16, 128]
+    os.makedirs("temp", exist_ok=True)
+    private_key, public_key = generate_key_pair(2048)
+    
+    throughputs = {hash_algorithm: [] for hash_algorithm in HASH_ALGORITHMS}
+    results = {}
+    
+    for size_mb in file_sizes_mb:
+        test_file = os.path.join("temp", f"hash_algorithm_test_{size_mb}MB.bin")
+        with open(test_file, 'wb') as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024 * 1024))
+        
+        print(f"\nKích thước file: {size_mb} MB")
+        try:
+            for hash_algorithm in HASH_ALGORITHMS:
+                _, hash_stats = benchmark(calculate_file_hash, test_file, hash_algorithm=hash_algorithm,
+                                          warmup=warmup, repeat=repeat)
+                hash_time = hash_stats["median"]
+                throughput = size_mb / (hash_time / 1000) if hash_time > 0 else 0.0
+                throughputs[hash_algorithm].append(throughput)
+                hash_stats["mb_per_sec"] = throughput
+                results[f"{hash_algorithm}_{size_mb}MB"] = hash_stats
+                print(f"{hash_algorithm:>9}: {format_stats(hash_stats)} ({throughput:.2f} MB/s)")
+        finally:
+            os.remove(test_file)
+    
+    # Ký/xác thực giá trị hash (không phụ thuộc kích thước file)
+    print("\nKý/xác thực giá trị hash (RSA-PSS 2048 bit):")
+    for hash_algorithm in HASH_ALGORITHMS:
+        digest = calculate_data_hash(b"hash algorithm benchmark", hash_algorithm)
+        signature, sign_stats = benchmark(sign_digest, private_key, digest, hash_algorithm,
+                                          warmup=warmup, repeat=repeat)
+        _, verify_stats = benchmark(verify_digest, public_key, digest, signature, hash_algorithm,
+                                    warmup=warmup, repeat=repeat)
+        results[f"sign_{hash_algorithm}"] = sign_stats
+        results[f"verify_{hash_algorithm}"] = verify_stats
+        print(f"{hash_algorithm:>9}: ký {format_stats(sign_stats)}, xác thực {format_stats(verify_stats)}")
+    
+    # Vẽ biểu đồ cột đặt cạnh nhau cho từng thuật toán
+    import matplotlib.pyplot as plt
+    import numpy as np
+    plt.figure(figsize=(10, 6))
+    x = np.arange(len(file_sizes_mb))
+    width = 0.8 / len(HASH_ALGORITHMS)
+    for i, hash_algorithm in enumerate(HASH_ALGORITHMS):
+        plt.bar(x + i * width, throughputs[hash_algorithm], width, label=hash_algorithm)
+    plt.xticks(x + width * (len(HASH_ALGORITHMS) - 1) / 2, [f"{size} MB" for size in file_sizes_mb])
+    plt.xlabel('Kích thước file')
+    plt.ylabel('Thông lượng (MB/s)')
+    plt.title('Thông lượng tính hash theo thuật toán')
+    plt.legend()
+    plt.grid(True, axis='y')
+    plt.savefig('hash_algorithm_performance.png')
+    plt.close()
+    return results
+
+def collect_system_metrics():
+    """
+    Thu thập thông số hệ thống cho việc đo lường
+
+    Trả về:
+        dict: Hệ điều hành, CPU, số lõi, RAM, phiên bản Python và Cryptography
+    """
+    import psutil
+    from cryptography import __version__ as crypto_version
+    return {
+        "os": f"{platform.system()} {platform.release()}",
+        "cpu": platform.processor(),
+        "physical_cores": psutil.cpu_count(logical=False),
+        "logical_cores": psutil.cpu_count(),
+        "ram_gb": psutil.virtual_memory().total / (1024 * 1024 * 1024),
+        "python": platform.python_version(),
+        "cryptography": crypto_version
+    }
+
+def report_system_metrics(metrics=None):
     """Báo cáo thông số hệ thống cho việc đo lường"""
+    metrics = metrics or collect_system_metrics()
     print("\n=== THÔNG SỐ HỆ THỐNG ĐO LƯỜNG ===")
-    print(f"Hệ điều hành: {platform.system()} {platform.release()}")
-    print(f"CPU: {platform.processor()}")
-    print(f"Số lõi CPU: {psutil.cpu_count(logical=False)} (Vật lý), {psutil.cpu_count()} (Logical)")
-    print(f"RAM: {psutil.virtual_memory().total / (1024*1024*1024):.2f} GB")
-    print(f"Phiên bản Cryptography: {crypto_version}")
+    print(f"Hệ điều hành: {metrics['os']}")
+    print(f"CPU: {metrics['cpu']}")
+    print(f"Số lõi CPU: {metrics['physical_cores']} (Vật lý), {metrics['logical_cores']} (Logical)")
+    print(f"RAM: {metrics['ram_gb']:.2f} GB")
+    print(f"Phiên bản Python: {metrics['python']}")
+    print(f"Phiên bản Cryptography: {metrics['cryptography']}")
     print("===============================")
 
+# Các nhóm thử nghiệm theo tên dùng trên dòng lệnh và trong file kết quả
+BENCHMARKS = {
+    "text": test_text_data_performance,
+    "image": test_image_data_performance,
+    "key_size": test_key_size_performance,
+    "hash_backend": test_hash_backend_performance,
+    "hash_algorithm": test_hash_algorithm_performance
+}
+
+def run_benchmarks(names=None, warmup=DEFAULT_WARMUP, repeat=DEFAULT_REPEAT):
+    """
+    Chạy các nhóm thử nghiệm và gom kết quả
+
+    Tham số:
+        names: Danh sách tên nhóm trong BENCHMARKS (mặc định: tất cả)
+        warmup: Số lần chạy khởi động cho mỗi phép đo
+        repeat: Số lần đo cho mỗi phép đo
+
+    Trả về:
+        dict: Kết quả có thể ghi ra JSON (thông số hệ thống, cấu hình và kết quả)
+    """
+    metrics = collect_system_metrics()
+    report_system_metrics(metrics)
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = BENCHMARKS[name](warmup=warmup, repeat=repeat)
+    return {
+        "created": datetime.now().isoformat(),
+        "system": metrics,
+        "config": {"warmup": warmup, "repeat": repeat},
+        "results": results
+    }
+
+def save_results(report, output_path):
+    """Lưu kết quả đo ra file JSON"""
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+def load_results(path):
+    """Đọc kết quả đo từ file JSON"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def compare_results(baseline, current, threshold=DEFAULT_REGRESSION_THRESHOLD):
+    """
+    So sánh median của các phép đo chung giữa hai lần chạy
+
+    Một phép đo bị coi là suy giảm khi median tăng quá ngưỡng và mức tăng lớn
+    hơn IQR của lần chạy gốc (để không báo nhầm do nhiễu).
+
+    Tham số:
+        baseline: Kết quả lần chạy gốc (từ load_results)
+        current: Kết quả lần chạy mới
+        threshold: Tỷ lệ tăng tối đa cho phép (0.10 = 10%)
+
+    Trả về:
+        list: Các dict (name, baseline, current, change, regression), sắp theo tên
+    """
+    rows = []
+    for group, measurements in baseline["results"].items():
+        current_group = current["results"].get(group, {})
+        for name, base_stats in measurements.items():
+            if name not in current_group:
+                continue
+            base_median = base_stats["median"]
+            new_median = current_group[name]["median"]
+            change = (new_median - base_median) / base_median if base_median > 0 else 0.0
+            regression = change > threshold and new_median - base_median > base_stats["iqr"]
+            rows.append({
+                "name": f"{group}/{name}",
+                "baseline": base_median,
+                "current": new_median,
+                "change": change,
+                "regression": regression
+            })
+    return sorted(rows, key=lambda row: row["name"])
+
+def print_comparison(rows, threshold):
+    """In bảng so sánh, trả về số phép đo bị suy giảm"""
+    print(f"\n=== SO SÁNH KẾT QUẢ (ngưỡng {threshold * 100:.0f}%) ===")
+    for row in rows:
+        marker = "  SUY GIẢM" if row["regression"] else ""
+        print(f"{row['name']:<40} {row['baseline']:>10.2f} ms -> {row['current']:>10.2f} ms "
+              f"({row['change'] * 100:+.1f}%){marker}")
+    regressions = sum(1 for row in rows if row["regression"])
+    print(f"\nSố phép đo bị suy giảm: {regressions}/{len(rows)}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo lường hiệu suất chữ ký số RSA")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="Chạy các thử nghiệm hiệu suất (mặc định)")
+    run_parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Chỉ chạy các nhóm này")
+    run_parser.add_argument("--warmup", type=non_negative_int, default=DEFAULT_WARMUP, help="Số lần chạy khởi động")
+    run_parser.add_argument("--repeat", type=positive_int, default=DEFAULT_REPEAT, help="Số lần đo (ít nhất 1)")
+    run_parser.add_argument("--output", default=None, help="Lưu kết quả ra file JSON")
+
+    compare_parser = subparsers.add_parser("compare", help="So sánh hai file kết quả JSON")
+    compare_parser.add_argument("baseline", help="Kết quả lần chạy gốc")
+    compare_parser.add_argument("current", help="Kết quả lần chạy mới")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                                help="Tỷ lệ tăng thời gian tối đa cho phép (mặc định 0.10)")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        rows = compare_results(load_results(args.baseline), load_results(args.current), args.threshold)
+        if print_comparison(rows, args.threshold):
+            sys.exit(1)
+        return
+
+    if args.command is None:
+        # Không có lệnh con: chạy tất cả với cấu hình mặc định
+        args = run_parser.parse_args([])
+    report = run_benchmarks(args.only, args.warmup, args.repeat)
+    if args.output:
+        save_results(report, args.output)
+        print(f"\nĐã lưu kết quả vào {args.output}")
+
 if __name__ == "__main__":
-    # Báo cáo thông số hệ thống
-    report_system_metrics()
-    
-    # Chạy các thử nghiệm
-    test_text_data_performance()
-    test_image_data_performance()
-    test_key_size_performance() 
\ No newline at end of file
+    main()
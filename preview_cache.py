@@ -0,0 +1,189 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+# Thư mục mặc định của cache ảnh thu nhỏ trên đĩa
+DEFAULT_CACHE_DIR = os.path.join("temp", "thumbnails")
+# Số ảnh thu nhỏ giữ trong bộ nhớ
+DEFAULT_MAX_ENTRIES = 64
+# Số file tối đa của cache trên đĩa (các file cũ nhất bị xóa khi vượt quá)
+DEFAULT_MAX_DISK_ENTRIES = 1000
+# Kiểm tra giới hạn cache trên đĩa sau mỗi số lần ghi này
+_PRUNE_INTERVAL = 50
+
+# Các định dạng ảnh được xem trước
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
+
+def decode_thumbnail(file_path, size):
+    """
+    Giải mã ảnh ở độ phân giải nhỏ nhất đủ cho ảnh thu nhỏ
+
+    Với JPEG, draft() cho bộ giải mã giảm kích thước ngay khi giải mã (1/2,
+    1/4, 1/8) nên không phải giải mã toàn bộ điểm ảnh; các định dạng khác được
+    thu nhỏ bằng reduce() (qua reducing_gap) trước khi lọc lại.
+
+    Tham số:
+        file_path: Đường dẫn file ảnh
+        size: (rộng, cao) tối đa
+
+    Trả về:
+        PIL.Image.Image: Ảnh thu nhỏ đã nạp vào bộ nhớ
+    """
+    with Image.open(file_path) as image:
+        if image.format == "JPEG":
+            image.draft("RGB" if image.mode not in ("L", "RGB") else image.mode, size)
+        image.thumbnail(size, reducing_gap=2.0)
+        image.load()
+        # Chuyển sang chế độ màu mà PNG và ImageTk đều hỗ trợ
+        if image.mode not in ("1", "L", "RGB", "RGBA"):
+            return image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        return image.copy()
+
+class PreviewCache:
+    """
+    Cache ảnh thu nhỏ hai tầng: LRU trong bộ nhớ và file PNG trên đĩa
+
+    Khóa cache gồm đường dẫn tuyệt đối, kích thước file, mtime và kích thước
+    ảnh thu nhỏ, nên file bị sửa sẽ được giải mã lại. Việc giải mã chạy trên
+    pool luồng riêng (load_async) để luồng giao diện không bị chặn.
+
+    Tham số:
+        cache_dir: Thư mục cache trên đĩa (None để tắt cache trên đĩa)
+        max_entries: Số ảnh thu nhỏ giữ trong bộ nhớ
+        max_disk_entries: Số file tối đa trong thư mục cache
+        workers: Số luồng giải mã
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_disk_entries=DEFAULT_MAX_DISK_ENTRIES, workers=2):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._stores = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def cache_key(file_path, size):
+        """Khóa cache của ảnh thu nhỏ (đường dẫn, kích thước file, mtime, kích thước ảnh)"""
+        st = os.stat(file_path)
+        return (os.path.abspath(file_path), st.st_size, st.st_mtime_ns, tuple(size))
+
+    def _disk_path(self, key):
+        name = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, name + ".png")
+
+    def _remember(self, key, image):
+        with self._lock:
+            self._memory[key] = image
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def peek(self, file_path, size):
+        """Ảnh thu nhỏ nếu đã có trong bộ nhớ, không giải mã (an toàn trên luồng giao diện)"""
+        try:
+            key = self.cache_key(file_path, size)
+        except OSError:
+            return None
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+            return image
+
+    def get(self, file_path, size):
+        """
+        Lấy ảnh thu nhỏ: bộ nhớ, rồi đĩa, rồi giải mã từ file gốc
+
+        Trả về:
+            PIL.Image.Image: Ảnh thu nhỏ
+        """
+        key = self.cache_key(file_path, size)
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return image
+
+        disk_path = self._disk_path(key) if self.cache_dir else None
+        if disk_path and os.path.exists(disk_path):
+            try:
+                with Image.open(disk_path) as cached:
+                    cached.load()
+                    image = cached.copy()
+                with self._lock:
+                    self._stats["disk_hits"] += 1
+                self._remember(key, image)
+                return image
+            except OSError:
+                # File cache hỏng: giải mã lại từ file gốc
+                pass
+
+        image = decode_thumbnail(file_path, size)
+        with self._lock:
+            self._stats["misses"] += 1
+        self._remember(key, image)
+        if disk_path:
+            self._store_on_disk(disk_path, image)
+        return image
+
+    def _store_on_disk(self, disk_path, image):
+        # Ghi vào file tạm rồi đổi tên để luồng khác không đọc phải file ghi dở
+        temp_path = f"{disk_path}.{threading.get_ident()}.tmp"
+        try:
+            image.save(temp_path, format="PNG", compress_level=1)
+            os.replace(temp_path, disk_path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        with self._lock:
+            self._stores += 1
+            should_prune = self._stores % _PRUNE_INTERVAL == 0
+        if should_prune:
+            self.prune_disk()
+
+    def prune_disk(self):
+        """Xóa các file cũ nhất khi cache trên đĩa vượt quá max_disk_entries"""
+        if not self.cache_dir:
+            return
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".png"):
+                entries.append((entry.stat().st_mtime_ns, entry.path))
+        excess = len(entries) - self.max_disk_entries
+        if excess > 0:
+            for _, path in sorted(entries)[:excess]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def load_async(self, file_path, size):
+        """
+        Giải mã ảnh thu nhỏ trên pool luồng
+
+        Trả về:
+            concurrent.futures.Future: Kết quả là PIL.Image.Image
+        """
+        return self._executor.submit(self.get, file_path, size)
+
+    def stats(self):
+        """Số lần trúng cache bộ nhớ, trúng cache đĩa và phải giải mã"""
+        with self._lock:
+            return dict(self._stats, entries=len(self._memory))
+
+    def close(self):
+        """Dừng pool luồng giải mã"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,11 +1,126 @@
 import os
+import mmap
 import hashlib
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519, padding, utils
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.exceptions import InvalidSignature
 
-def generate_key_pair(key_size=2048):
-    """Tạo cặp khóa RSA (khóa riêng tư và khóa công khai)"""
+import instrumentation
+from instrumentation import instrumented
+
+class OperationCancelled(Exception):
+    """Thao tác bị hủy (hàm báo tiến độ ném ra ngoại lệ này để dừng việc băm file)"""
+
+# Pool khóa tạo sẵn (xem key_pool.KeyPool), None nếu không dùng
+_key_pool = None
+
+def set_key_pool(pool):
+    """Đặt pool khóa tạo sẵn cho generate_key_pair (None để tắt)"""
+    global _key_pool
+    _key_pool = pool
+
+def get_key_pool():
+    """Pool khóa tạo sẵn đang được dùng"""
+    return _key_pool
+
+# Các thuật toán chữ ký được hỗ trợ
+#   rsa-pss:    RSA với đệm PSS (MGF1 cùng hàm băm, salt tối đa) trên giá trị hash
+#   ed25519:    Ed25519 ký lên giá trị hash của dữ liệu
+#   ecdsa-p256: ECDSA trên đường cong P-256 với giá trị hash (Prehashed)
+SIGNATURE_ALGORITHMS = ("rsa-pss", "ed25519", "ecdsa-p256")
+DEFAULT_SIGNATURE_ALGORITHM = "rsa-pss"
+
+# Các thuật toán hash được hỗ trợ (tên ghi trong file thông tin chữ ký)
+HASH_ALGORITHMS = ("sha256", "sha512", "blake2b", "sha3_256", "sha3_512")
+DEFAULT_HASH_ALGORITHM = "sha256"
+
+_HASHLIB_CONSTRUCTORS = {
+    "sha256": hashlib.sha256,
+    "sha512": hashlib.sha512,
+    "blake2b": hashlib.blake2b,
+    "sha3_256": hashlib.sha3_256,
+    "sha3_512": hashlib.sha3_512
+}
+
+# Hàm băm của cryptography dùng cho PSS/MGF1 và Prehashed. OpenSSL không cho
+# dùng BLAKE2b trong RSA-PSS, nên giá trị hash BLAKE2b-512 được ký như một
+# giá trị hash 64 byte với tham số SHA-512; thuật toán thực sự được ghi trong
+# thông tin chữ ký nên không thể nhầm với chữ ký trên hash SHA-512.
+_SIGNATURE_HASHES = {
+    "sha256": hashes.SHA256,
+    "sha512": hashes.SHA512,
+    "blake2b": hashes.SHA512,
+    "sha3_256": hashes.SHA3_256,
+    "sha3_512": hashes.SHA3_512
+}
+
+def new_hash(hash_algorithm=DEFAULT_HASH_ALGORITHM):
+    """
+    Tạo đối tượng hash của hashlib theo tên thuật toán
+    
+    Trả về:
+        Đối tượng hash có update()/digest()
+    """
+    constructor = _HASHLIB_CONSTRUCTORS.get(hash_algorithm)
+    if constructor is None:
+        raise ValueError(f"Thuật toán hash không được hỗ trợ: {hash_algorithm}")
+    return constructor()
+
+def _signature_hash(hash_algorithm):
+    """Đối tượng hash của cryptography dùng khi ký/xác thực giá trị hash"""
+    if hash_algorithm not in _SIGNATURE_HASHES:
+        raise ValueError(f"Thuật toán hash không được hỗ trợ: {hash_algorithm}")
+    return _SIGNATURE_HASHES[hash_algorithm]()
+
+def _pss_padding(hash_algorithm):
+    return padding.PSS(
+        mgf=padding.MGF1(_signature_hash(hash_algorithm)),
+        salt_length=padding.PSS.MAX_LENGTH
+    )
+
+def key_algorithm(key):
+    """
+    Xác định thuật toán chữ ký từ loại khóa (riêng tư hoặc công khai)
+    
+    Trả về:
+        str: Một trong SIGNATURE_ALGORITHMS
+    """
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return "rsa-pss"
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return "ed25519"
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)) and \
+            isinstance(key.curve, ec.SECP256R1):
+        return "ecdsa-p256"
+    raise ValueError(f"Loại khóa không được hỗ trợ: {type(key).__name__}")
+
+@instrumented("keygen")
+def generate_key_pair(key_size=2048, use_pool=True, algorithm=DEFAULT_SIGNATURE_ALGORITHM):
+    """
+    Tạo cặp khóa (khóa riêng tư và khóa công khai)
+    
+    Tham số:
+        key_size: Độ dài khóa RSA (bỏ qua với ed25519 và ecdsa-p256)
+        use_pool: Lấy khóa RSA từ pool khóa tạo sẵn nếu có
+        algorithm: Một trong SIGNATURE_ALGORITHMS
+    
+    Nếu có pool khóa tạo sẵn và pool còn khóa cùng kích thước thì trả về
+    ngay khóa đó, nếu không thì tạo khóa mới.
+    """
+    if algorithm == "ed25519":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+        return private_key, private_key.public_key()
+    if algorithm == "ecdsa-p256":
+        private_key = ec.generate_private_key(ec.SECP256R1())
+        return private_key, private_key.public_key()
+    if algorithm != "rsa-pss":
+        raise ValueError(f"Thuật toán chữ ký không hợp lệ: {algorithm}")
+    
+    if use_pool and _key_pool is not None:
+        pair = _key_pool.take(key_size)
+        if pair is not None:
+            return pair
+    
     private_key = rsa.generate_private_key(
         public_exponent=65537,
         key_size=key_size
@@ -41,51 +156,181 @@ def save_public_key(public_key, path):
 
 def load_private_key(path, password=None):
     """Đọc khóa riêng tư từ file"""
-    with open(path, 'rb') as f:
-        private_key_data = f.read()
+    with instrumentation.phase("key_read") as p:
+        with open(path, 'rb') as f:
+            private_key_data = f.read()
+        p.add_bytes(len(private_key_data))
     
-    if password:
+    with instrumentation.phase("pem_parse"):
+        if password:
+            return serialization.load_pem_private_key(
+                private_key_data,
+                password=password.encode()
+            )
         return serialization.load_pem_private_key(
             private_key_data,
-            password=password.encode()
+            password=None
         )
-    return serialization.load_pem_private_key(
-        private_key_data,
-        password=None
-    )
 
 def load_public_key(path):
     """Đọc khóa công khai từ file"""
-    with open(path, 'rb') as f:
-        public_key_data = f.read()
+    with instrumentation.phase("key_read") as p:
+        with open(path, 'rb') as f:
+            public_key_data = f.read()
+        p.add_bytes(len(public_key_data))
+    
+    with instrumentation.phase("pem_parse"):
+        return serialization.load_pem_public_key(public_key_data)
+
+def public_key_fingerprint(public_key):
+    """Dấu vân tay của khóa công khai: SHA-256 của khóa dạng DER (SubjectPublicKeyInfo)"""
+    der = public_key.public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return hashlib.sha256(der).digest()
+
+# Các backend đọc file khi tính hash
+HASH_BACKENDS = ('read', 'readinto', 'mmap', 'fadvise')
+# Kích thước chunk mặc định của từng backend
+DEFAULT_CHUNK_SIZES = {
+    'read': 8192,
+    'readinto': 256 * 1024,
+    'mmap': 8 * 1024 * 1024,
+    'fadvise': 4 * 1024 * 1024
+}
+# File nhỏ hơn ngưỡng này dùng readinto, lớn hơn dùng mmap
+MMAP_THRESHOLD = 4 * 1024 * 1024
+
+def select_hash_backend(file_size):
+    """Chọn backend đọc file phù hợp theo kích thước file"""
+    if file_size < MMAP_THRESHOLD:
+        return 'readinto'
+    return 'mmap'
+
+def _hash_read(f, hash_obj, chunk_size):
+    """Đọc bằng f.read (mỗi chunk tạo một đối tượng bytes mới)"""
+    while chunk := f.read(chunk_size):
+        hash_obj.update(chunk)
+
+def _hash_readinto(f, hash_obj, chunk_size):
+    """Đọc bằng readinto vào một bộ đệm dùng lại, không cấp phát thêm"""
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    while n := f.readinto(buffer):
+        hash_obj.update(view[:n])
+
+def _hash_mmap(f, hash_obj, chunk_size):
+    """Ánh xạ file vào bộ nhớ và băm qua các lát memoryview (zero-copy)"""
+    size = os.fstat(f.fileno()).st_size
+    if size == 0:
+        return
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        view = memoryview(mapped)
+        try:
+            for offset in range(0, size, chunk_size):
+                # Giải phóng từng lát ngay cả khi update ném ngoại lệ (ví dụ bị
+                # hủy), nếu không mmap không thể đóng
+                chunk = view[offset:offset + chunk_size]
+                try:
+                    hash_obj.update(chunk)
+                finally:
+                    chunk.release()
+        finally:
+            view.release()
+
+def _hash_fadvise(f, hash_obj, chunk_size):
+    """Đọc chunk lớn với gợi ý đọc tuần tự posix_fadvise cho hệ điều hành"""
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    _hash_readinto(f, hash_obj, chunk_size)
+
+class _ProgressHash:
+    """Bọc đối tượng hash để báo số byte đã băm sau mỗi chunk"""
+    
+    def __init__(self, hash_obj, progress, total):
+        self._hash_obj = hash_obj
+        self._progress = progress
+        self._total = total
+        self._done = 0
     
-    return serialization.load_pem_public_key(public_key_data)
+    def update(self, data):
+        self._hash_obj.update(data)
+        self._done += len(data)
+        self._progress(self._done, self._total)
+
+_HASH_BACKEND_FUNCTIONS = {
+    'read': _hash_read,
+    'readinto': _hash_readinto,
+    'mmap': _hash_mmap,
+    'fadvise': _hash_fadvise
+}
+
+def calculate_file_hash(file_path, backend=None, chunk_size=None, cache=None, progress=None,
+                        hash_algorithm=DEFAULT_HASH_ALGORITHM):
+    """
+    Tính giá trị hash của file
 
-def calculate_file_hash(file_path):
-    """Tính giá trị hash của file"""
-    hash_obj = hashlib.sha256()
+    Tham số:
+        file_path: Đường dẫn file
+        backend: Cách đọc file ('read', 'readinto', 'mmap', 'fadvise');
+                 None thì tự chọn theo kích thước file
+        chunk_size: Kích thước mỗi lần đọc (None = mặc định của backend)
+        cache: digest_cache.DigestCache để bỏ qua việc băm lại file không đổi
+        progress: Hàm progress(số_byte_đã_băm, tổng_số_byte) được gọi sau mỗi
+                  chunk; có thể ném OperationCancelled để dừng
+        hash_algorithm: Một trong HASH_ALGORITHMS
+
+    Trả về:
+        bytes: Giá trị hash
+
+    Khi bật instrumentation, thời gian đọc file được ghi riêng ở giai đoạn
+    "file_read" (trừ backend mmap, nơi việc đọc xảy ra qua lỗi trang và được
+    tính chung vào "file_hash").
+    """
+    if cache is not None:
+        return cache.get_or_compute(
+            file_path,
+            lambda: calculate_file_hash(file_path, backend, chunk_size, progress=progress,
+                                        hash_algorithm=hash_algorithm),
+            hash_algorithm
+        )
     
-    with open(file_path, 'rb') as f:
-        while chunk := f.read(8192):
-            hash_obj.update(chunk)
+    if backend is not None and backend not in _HASH_BACKEND_FUNCTIONS:
+        raise ValueError(f"Backend không hợp lệ: {backend}")
+    
+    hash_obj = new_hash(hash_algorithm)
+    
+    with open(file_path, 'rb', buffering=0) as f, instrumentation.phase("file_hash") as p:
+        size = os.fstat(f.fileno()).st_size
+        p.add_bytes(size)
+        if backend is None:
+            backend = select_hash_backend(size)
+        source = instrumentation.TimedReader(f) if instrumentation.is_enabled() else f
+        target = _ProgressHash(hash_obj, progress, size) if progress is not None else hash_obj
+        _HASH_BACKEND_FUNCTIONS[backend](source, target, chunk_size or DEFAULT_CHUNK_SIZES[backend])
     
     return hash_obj.digest()
 
-def calculate_data_hash(data):
+def calculate_data_hash(data, hash_algorithm=DEFAULT_HASH_ALGORITHM):
     """Tính giá trị hash của dữ liệu"""
     if isinstance(data, str):
         data = data.encode('utf-8')
-    hash_obj = hashlib.sha256()
-    hash_obj.update(data)
-    return hash_obj.digest()
+    with instrumentation.phase("data_hash", len(data)):
+        hash_obj = new_hash(hash_algorithm)
+        hash_obj.update(data)
+        return hash_obj.digest()
 
-def sign_data(private_key, data):
+def sign_data(private_key, data, hash_algorithm=DEFAULT_HASH_ALGORITHM):
     """
-    Tạo chữ ký số cho dữ liệu sử dụng khóa riêng tư RSA
+    Tạo chữ ký số cho dữ liệu sử dụng khóa riêng tư
     
     Tham số:
-        private_key: Khóa RSA riêng tư
+        private_key: Khóa riêng tư (RSA, Ed25519 hoặc ECDSA P-256)
         data: Dữ liệu cần ký (dạng chuỗi hoặc bytes)
+        hash_algorithm: Một trong HASH_ALGORITHMS
         
     Trả về:
         bytes: Chữ ký số
@@ -94,35 +339,60 @@ def sign_data(private_key, data):
     if isinstance(data, str):
         data = data.encode('utf-8')
     
-    # Tạo chữ ký sử dụng thuật toán PSS
-    signature = private_key.sign(
-        data,
-        # Sử dụng PSS (Probabilistic Signature Scheme)
-        padding.PSS(
-            # MGF1 (Mask Generation Function 1) với SHA-256
-            mgf=padding.MGF1(hashes.SHA256()),
-            # Sử dụng độ dài salt tối đa để tăng tính bảo mật
-            salt_length=padding.PSS.MAX_LENGTH
-        ),
-        # Sử dụng hàm băm SHA-256
-        hashes.SHA256()
-    )
+    # Khóa Ed25519/ECDSA (và BLAKE2b, OpenSSL không tự băm được khi ký RSA):
+    # ký giá trị hash như sign_digest
+    if not isinstance(private_key, rsa.RSAPrivateKey) or hash_algorithm == "blake2b":
+        return sign_digest(private_key, calculate_data_hash(data, hash_algorithm), hash_algorithm)
+    
+    # Tạo chữ ký sử dụng thuật toán PSS (thời gian gồm cả việc băm dữ liệu)
+    with instrumentation.phase("rsa_sign", len(data)):
+        signature = private_key.sign(
+            data,
+            # Sử dụng PSS (Probabilistic Signature Scheme) với MGF1 cùng hàm
+            # băm và độ dài salt tối đa để tăng tính bảo mật
+            _pss_padding(hash_algorithm),
+            _signature_hash(hash_algorithm)
+        )
     
     return signature
 
-def sign_file(private_key, file_path):
-    """Tạo chữ ký số cho file"""
-    file_hash = calculate_file_hash(file_path)
-    return sign_data(private_key, file_hash)
+def sign_digest(private_key, digest, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+    """
+    Tạo chữ ký số cho giá trị hash đã tính sẵn
+    
+    Giá trị hash được ký trực tiếp (Prehashed) nên không bị băm lại lần nữa.
+    Chữ ký tạo ra giống hệt sign_data trên dữ liệu gốc tương ứng. Thuật toán
+    được chọn theo loại khóa (xem key_algorithm); hash_algorithm là thuật
+    toán đã dùng để tính digest.
+    """
+    algorithm = key_algorithm(private_key)
+    if algorithm == "ed25519":
+        with instrumentation.phase("ed25519_sign"):
+            return private_key.sign(digest)
+    if algorithm == "ecdsa-p256":
+        with instrumentation.phase("ecdsa_sign"):
+            return private_key.sign(digest, ec.ECDSA(utils.Prehashed(_signature_hash(hash_algorithm))))
+    with instrumentation.phase("rsa_sign"):
+        return private_key.sign(
+            digest,
+            _pss_padding(hash_algorithm),
+            utils.Prehashed(_signature_hash(hash_algorithm))
+        )
+
+def sign_file(private_key, file_path, digest_cache=None, progress=None, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+    """Tạo chữ ký số cho file (băm file một lần rồi ký giá trị hash)"""
+    file_hash = calculate_file_hash(file_path, cache=digest_cache, progress=progress, hash_algorithm=hash_algorithm)
+    return sign_digest(private_key, file_hash, hash_algorithm)
 
-def verify_signature(public_key, data, signature):
+def verify_signature(public_key, data, signature, hash_algorithm=DEFAULT_HASH_ALGORITHM):
     """
-    Xác thực chữ ký số cho dữ liệu sử dụng khóa công khai RSA
+    Xác thực chữ ký số cho dữ liệu sử dụng khóa công khai
     
     Tham số:
-        public_key: Khóa RSA công khai
+        public_key: Khóa công khai (RSA, Ed25519 hoặc ECDSA P-256)
         data: Dữ liệu cần xác thực (chuỗi hoặc bytes)
         signature: Chữ ký số cần kiểm tra
+        hash_algorithm: Thuật toán hash đã dùng khi ký
         
     Trả về:
         bool: True nếu chữ ký hợp lệ, False nếu không hợp lệ
@@ -131,25 +401,176 @@ def verify_signature(public_key, data, signature):
     if isinstance(data, str):
         data = data.encode('utf-8')
     
+    if not isinstance(public_key, rsa.RSAPublicKey) or hash_algorithm == "blake2b":
+        return verify_digest(public_key, calculate_data_hash(data, hash_algorithm), signature, hash_algorithm)
+    
     try:
         # Xác thực chữ ký
-        public_key.verify(
-            signature,
-            data,
-            # Sử dụng cùng phương pháp đệm PSS như khi ký
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
+        with instrumentation.phase("rsa_verify", len(data)):
+            public_key.verify(
+                signature,
+                data,
+                # Sử dụng cùng phương pháp đệm PSS như khi ký
+                _pss_padding(hash_algorithm),
+                _signature_hash(hash_algorithm)
+            )
         # Nếu không có ngoại lệ, chữ ký hợp lệ
         return True
     except InvalidSignature:
         # Nếu xảy ra ngoại lệ InvalidSignature, chữ ký không hợp lệ
         return False
 
-def verify_file_signature(public_key, file_path, signature):
-    """Xác thực chữ ký số cho file"""
-    file_hash = calculate_file_hash(file_path)
-    return verify_signature(public_key, file_hash, signature) 
\ No newline at end of file
+def verify_digest(public_key, digest, signature, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+    """Xác thực chữ ký số cho giá trị hash đã tính sẵn (thuật toán chữ ký theo loại khóa)"""
+    algorithm = key_algorithm(public_key)
+    try:
+        if algorithm == "ed25519":
+            with instrumentation.phase("ed25519_verify"):
+                public_key.verify(signature, digest)
+            return True
+        if algorithm == "ecdsa-p256":
+            with instrumentation.phase("ecdsa_verify"):
+                public_key.verify(signature, digest, ec.ECDSA(utils.Prehashed(_signature_hash(hash_algorithm))))
+            return True
+        with instrumentation.phase("rsa_verify"):
+            public_key.verify(
+                signature,
+                digest,
+                _pss_padding(hash_algorithm),
+                utils.Prehashed(_signature_hash(hash_algorithm))
+            )
+        return True
+    except InvalidSignature:
+        return False
+
+def verify_file_signature(public_key, file_path, signature, allow_legacy=True, signature_info=None,
+                          digest_cache=None, progress=None, verify_cache=None):
+    """
+    Xác thực chữ ký số cho file
+    
+    Tham số:
+        allow_legacy: Chấp nhận cả chữ ký kiểu cũ (ký lại hash của hash file)
+        signature_info: Thông tin chữ ký (từ file .info); nếu ghi chế độ hash
+                        dạng cây thì xác thực theo cây Merkle
+        digest_cache: digest_cache.DigestCache để bỏ qua việc băm lại file không đổi
+        progress: Hàm báo tiến độ băm file (xem calculate_file_hash); không
+                  dùng cho chế độ hash dạng cây
+        verify_cache: verify_cache.VerifyCache để dùng lại kết quả xác thực
+                      của cùng khóa, hash và chữ ký
+    
+    Nếu thông tin chữ ký ghi thuật toán khác với loại khóa công khai thì chữ
+    ký được coi là không hợp lệ. Thuật toán hash được lấy từ trường
+    hash_algorithm của thông tin chữ ký (mặc định SHA-256).
+    """
+    algorithm = key_algorithm(public_key)
+    if signature_info and signature_info.get("signature_algorithm", "rsa-pss") != algorithm:
+        return False
+    hash_algorithm = (signature_info or {}).get("hash_algorithm", DEFAULT_HASH_ALGORITHM)
+    
+    if signature_info and signature_info.get("hash_mode") == "tree":
+        from tree_hash import verify_tree_signature
+        return verify_tree_signature(public_key, file_path, signature, signature_info)
+    
+    file_hash = calculate_file_hash(file_path, cache=digest_cache, progress=progress, hash_algorithm=hash_algorithm)
+    # Chữ ký kiểu cũ chỉ có với RSA và SHA-256
+    legacy = allow_legacy and algorithm == "rsa-pss" and hash_algorithm == DEFAULT_HASH_ALGORITHM
+    
+    def verify():
+        if verify_digest(public_key, file_hash, signature, hash_algorithm):
+            return True
+        return legacy and verify_signature(public_key, file_hash, signature)
+    
+    if verify_cache is None:
+        return verify()
+    return verify_cache.get_or_verify(public_key_fingerprint(public_key), file_hash, signature, verify,
+                                      verify_cache_context(hash_algorithm, legacy))
+
+# Kích thước mỗi lần đọc khi đưa dữ liệu từ file/iterator vào Signer/Verifier
+STREAM_CHUNK_SIZE = 256 * 1024
+
+def verify_cache_context(hash_algorithm=DEFAULT_HASH_ALGORITHM, legacy=False):
+    """Ngữ cảnh xác thực dùng trong khóa của verify_cache.VerifyCache"""
+    return hash_algorithm + ("+legacy" if legacy else "")
+
+class _StreamingHash:
+    """Phần chung của Signer và Verifier: đưa dữ liệu từng phần vào một hàm băm"""
+    
+    def __init__(self, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+        self.hash_algorithm = hash_algorithm
+        self._hash_obj = new_hash(hash_algorithm)
+        self._finalized = False
+    
+    def update(self, data):
+        """Thêm một phần dữ liệu (str, bytes, bytearray hoặc memoryview)"""
+        if self._finalized:
+            raise ValueError("Không thể thêm dữ liệu sau khi đã finalize")
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._hash_obj.update(data)
+    
+    def update_from(self, source, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Thêm dữ liệu từ đối tượng dạng file hoặc iterable các chunk
+        
+        File nhị phân được đọc bằng readinto vào một bộ đệm dùng lại, nên bộ
+        nhớ sử dụng không phụ thuộc kích thước dữ liệu.
+        """
+        if hasattr(source, 'readinto'):
+            buffer = bytearray(chunk_size)
+            view = memoryview(buffer)
+            while n := source.readinto(buffer):
+                self.update(view[:n])
+        elif hasattr(source, 'read'):
+            while chunk := source.read(chunk_size):
+                self.update(chunk)
+        else:
+            for chunk in source:
+                self.update(chunk)
+    
+    def digest(self):
+        """Giá trị hash của dữ liệu đã đưa vào"""
+        return self._hash_obj.digest()
+
+class Signer(_StreamingHash):
+    """
+    Ký dữ liệu theo kiểu tăng dần với update()/finalize()
+    
+    Dữ liệu chỉ được băm một lần; chữ ký cuối cùng được tạo trên giá trị hash
+    như sign_digest (thuật toán theo loại khóa), giống hệt sign_data trên toàn
+    bộ dữ liệu.
+    """
+    
+    def __init__(self, private_key, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+        super().__init__(hash_algorithm)
+        self.private_key = private_key
+    
+    def finalize(self):
+        """Kết thúc và trả về chữ ký số"""
+        self._finalized = True
+        return sign_digest(self.private_key, self.digest(), self.hash_algorithm)
+
+class Verifier(_StreamingHash):
+    """
+    Xác thực chữ ký theo kiểu tăng dần với update()/finalize()
+    
+    Tham số:
+        public_key: Khóa công khai (RSA, Ed25519 hoặc ECDSA P-256)
+        legacy: Chấp nhận cả chữ ký kiểu cũ của sign_file (ký lại hash của
+                hash); chỉ có tác dụng với khóa RSA và SHA-256
+        hash_algorithm: Thuật toán hash đã dùng khi ký
+    """
+    
+    def __init__(self, public_key, legacy=False, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+        super().__init__(hash_algorithm)
+        self.public_key = public_key
+        # Chữ ký kiểu cũ chỉ có với RSA và SHA-256 (giống verify_file_signature)
+        self.legacy = (legacy and key_algorithm(public_key) == "rsa-pss"
+                       and hash_algorithm == DEFAULT_HASH_ALGORITHM)
+    
+    def finalize(self, signature):
+        """Kết thúc và trả về True nếu chữ ký hợp lệ"""
+        self._finalized = True
+        digest = self.digest()
+        if verify_digest(self.public_key, digest, signature, self.hash_algorithm):
+            return True
+        return self.legacy and verify_signature(self.public_key, digest, signature) 
\ No newline at end of file
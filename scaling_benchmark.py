@@ -0,0 +1,237 @@
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from cryptography.hazmat.primitives import serialization
+
+from rsa_utils import generate_key_pair, sign_data, verify_signature, sign_file
+from performance_test import collect_system_metrics, report_system_metrics, save_results
+
+# Các thao tác được đo
+OPERATIONS = ("sign", "verify", "sign_file")
+# Kích thước khóa mặc định
+DEFAULT_KEY_SIZES = (1024, 2048, 3072, 4096)
+# Thời gian đo cho mỗi cấu hình (giây)
+DEFAULT_DURATION = 1.0
+# Thời gian chờ để mọi worker bắt đầu đo cùng lúc (giây)
+START_DELAY = 0.2
+
+# Dữ liệu mẫu để ký văn bản
+SAMPLE_TEXT = "Test data for scaling performance" * 32
+
+# Trạng thái của worker (trong luồng thì dùng chung, trong tiến trình thì nạp một lần)
+_worker_private_key = None
+_worker_public_key = None
+_worker_signature = None
+_worker_file_path = None
+
+def _init_worker(private_pem, file_path):
+    """Nạp khóa và chuẩn bị chữ ký mẫu cho worker"""
+    global _worker_private_key, _worker_public_key, _worker_signature, _worker_file_path
+    _worker_private_key = serialization.load_pem_private_key(private_pem, password=None)
+    _worker_public_key = _worker_private_key.public_key()
+    _worker_signature = sign_data(_worker_private_key, SAMPLE_TEXT)
+    _worker_file_path = file_path
+
+def _spawn_probe(delay):
+    """Tác vụ rỗng để buộc pool khởi động đủ số worker trước khi đo"""
+    time.sleep(delay)
+    return os.getpid()
+
+def _run_operation(operation, start_at, duration):
+    """
+    Chờ đến thời điểm start_at rồi lặp lại thao tác trong duration giây
+
+    Trả về:
+        int: Số thao tác hoàn thành trong khoảng thời gian đo
+    """
+    if operation == "sign":
+        func = lambda: sign_data(_worker_private_key, SAMPLE_TEXT)
+    elif operation == "verify":
+        func = lambda: verify_signature(_worker_public_key, SAMPLE_TEXT, _worker_signature)
+    else:
+        func = lambda: sign_file(_worker_private_key, _worker_file_path)
+
+    # Chạy khởi động một lần trước khi đo
+    func()
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+    end_at = start_at + duration
+    count = 0
+    while time.time() < end_at:
+        func()
+        count += 1
+    return count
+
+def measure_throughput(mode, workers, operation, private_pem, file_path, duration=DEFAULT_DURATION):
+    """
+    Đo thông lượng của một thao tác với số luồng/tiến trình cho trước
+
+    Tham số:
+        mode: "thread" hoặc "process"
+        workers: Số worker chạy đồng thời
+        operation: Một trong OPERATIONS
+        private_pem: Khóa riêng tư dạng PEM (không mã hóa)
+        file_path: File dùng cho thao tác sign_file
+        duration: Thời gian đo (giây)
+
+    Trả về:
+        float: Số thao tác mỗi giây
+    """
+    if mode == "process":
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(private_pem, file_path))
+    else:
+        _init_worker(private_pem, file_path)
+        executor = ThreadPoolExecutor(max_workers=workers)
+    with executor:
+        # Khởi động đủ worker để thời gian tạo tiến trình không bị tính vào kết quả
+        list(executor.map(_spawn_probe, [0.05] * workers))
+        start_at = time.time() + START_DELAY
+        futures = [executor.submit(_run_operation, operation, start_at, duration) for _ in range(workers)]
+        total = sum(future.result() for future in futures)
+    return total / duration
+
+def worker_counts(max_workers):
+    """Các số worker cần đo: 1, 2, 4, ... và max_workers"""
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+def run_scaling_benchmark(key_sizes=DEFAULT_KEY_SIZES, operations=OPERATIONS, modes=("thread", "process"),
+                          max_workers=None, duration=DEFAULT_DURATION, file_size_mb=1):
+    """
+    Đo khả năng mở rộng của thao tác ký/xác thực theo số luồng và tiến trình
+
+    Tham số:
+        key_sizes: Các kích thước khóa (bit)
+        operations: Các thao tác trong OPERATIONS
+        modes: "thread" và/hoặc "process"
+        max_workers: Số worker tối đa (mặc định: số lõi CPU logic)
+        duration: Thời gian đo mỗi cấu hình (giây)
+        file_size_mb: Kích thước file dùng cho sign_file (MB)
+
+    Trả về:
+        list: Các dict (key_size, operation, mode, workers, ops_per_sec, speedup, efficiency)
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    os.makedirs("temp", exist_ok=True)
+    file_path = os.path.abspath(os.path.join("temp", f"scaling_test_{file_size_mb}MB.bin"))
+    with open(file_path, 'wb') as f:
+        for _ in range(file_size_mb):
+            f.write(os.urandom(1024 * 1024))
+
+    rows = []
+    try:
+        for key_size in key_sizes:
+            private_key, _ = generate_key_pair(key_size, use_pool=False)
+            private_pem = private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            )
+            for operation in operations:
+                for mode in modes:
+                    baseline = None
+                    for workers in worker_counts(max_workers):
+                        ops_per_sec = measure_throughput(mode, workers, operation, private_pem, file_path, duration)
+                        baseline = baseline or ops_per_sec
+                        speedup = ops_per_sec / baseline if baseline else 0.0
+                        row = {
+                            "key_size": key_size,
+                            "operation": operation,
+                            "mode": mode,
+                            "workers": workers,
+                            "ops_per_sec": ops_per_sec,
+                            "speedup": speedup,
+                            "efficiency": speedup / workers
+                        }
+                        rows.append(row)
+                        print(f"{key_size:>5} bit  {operation:<9} {mode:<7} {workers:>3} worker: "
+                              f"{ops_per_sec:>10.1f} ops/s  x{speedup:.2f}  hiệu suất {row['efficiency'] * 100:.0f}%")
+    finally:
+        os.remove(file_path)
+    return rows
+
+def scaling_results(rows):
+    """
+    Chuyển các dòng kết quả sang dạng so sánh được bằng performance_test.compare_results
+
+    Mỗi cấu hình được đặt tên "key_size/thao tác/chế độ/số worker"; median là
+    thời gian trung bình mỗi thao tác (ms), tính từ thông lượng đo được. Mỗi
+    cấu hình chỉ có một lần đo nên IQR bằng 0.
+
+    Trả về:
+        dict: Tên cấu hình -> median, iqr, ops_per_sec, speedup, efficiency
+    """
+    results = {}
+    for row in rows:
+        if not row["ops_per_sec"]:
+            # Không hoàn thành thao tác nào trong thời gian đo: không có thời gian để so sánh
+            continue
+        name = f"{row['key_size']}/{row['operation']}/{row['mode']}/{row['workers']}"
+        results[name] = {
+            "median": 1000 / row["ops_per_sec"],
+            "iqr": 0.0,
+            "ops_per_sec": row["ops_per_sec"],
+            "speedup": row["speedup"],
+            "efficiency": row["efficiency"]
+        }
+    return results
+
+def plot_scaling(rows, output_path='scaling_performance.png'):
+    """Vẽ đường tăng tốc theo số worker, mỗi thao tác một biểu đồ con"""
+    import matplotlib.pyplot as plt
+    operations = list(dict.fromkeys(row["operation"] for row in rows))
+    fig, axes = plt.subplots(1, len(operations), figsize=(6 * len(operations), 5), squeeze=False)
+    max_workers = max(row["workers"] for row in rows)
+    for ax, operation in zip(axes[0], operations):
+        series = {}
+        for row in rows:
+            if row["operation"] == operation:
+                series.setdefault((row["mode"], row["key_size"]), []).append(row)
+        for (mode, key_size), points in series.items():
+            style = 'o-' if mode == "process" else 's--'
+            ax.plot([p["workers"] for p in points], [p["speedup"] for p in points], style,
+                    label=f"{mode} {key_size} bit")
+        ax.plot([1, max_workers], [1, max_workers], 'k:', label='Lý tưởng')
+        ax.set_xlabel('Số worker')
+        ax.set_ylabel('Tăng tốc (lần)')
+        ax.set_title(f'Khả năng mở rộng: {operation}')
+        ax.grid(True)
+        ax.legend(fontsize='small')
+    fig.tight_layout()
+    fig.savefig(output_path)
+    plt.close(fig)
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo khả năng mở rộng đa lõi của thao tác ký/xác thực")
+    parser.add_argument("--key-sizes", type=int, nargs="+", default=list(DEFAULT_KEY_SIZES), help="Các kích thước khóa")
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=list(OPERATIONS), help="Các thao tác")
+    parser.add_argument("--modes", nargs="+", choices=("thread", "process"), default=["thread", "process"],
+                        help="Luồng và/hoặc tiến trình")
+    parser.add_argument("--max-workers", type=int, default=None, help="Số worker tối đa (mặc định: số lõi CPU)")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="Thời gian đo mỗi cấu hình (giây)")
+    parser.add_argument("--file-size-mb", type=int, default=1, help="Kích thước file cho sign_file (MB)")
+    parser.add_argument("--output", default=None, help="Lưu kết quả ra file JSON")
+    args = parser.parse_args()
+
+    metrics = collect_system_metrics()
+    report_system_metrics(metrics)
+    print("\n=== THỬ NGHIỆM KHẢ NĂNG MỞ RỘNG ĐA LÕI ===")
+    rows = run_scaling_benchmark(args.key_sizes, args.operations, args.modes,
+                                 args.max_workers, args.duration, args.file_size_mb)
+    plot_scaling(rows)
+    if args.output:
+        save_results({"system": metrics, "config": vars(args), "results": {"scaling": scaling_results(rows)}},
+                     args.output)
+        print(f"\nĐã lưu kết quả vào {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import base64
+import asyncio
+import argparse
+
+from signing_service import percentile
+
+async def _open(socket_path, host, port):
+    if socket_path:
+        return await asyncio.open_unix_connection(socket_path)
+    return await asyncio.open_connection(host, port)
+
+async def _client(socket_path, host, port, key, op, payload, depth, deadline, latencies, counters):
+    """
+    Một kết nối giữ lâu dài, gửi liên tục tối đa depth yêu cầu chưa có phản hồi
+    """
+    reader, writer = await _open(socket_path, host, port)
+    sent_at = {}
+    next_id = 0
+    window = asyncio.Semaphore(depth)
+    data = base64.b64encode(payload).decode('ascii')
+    signature = None
+
+    if op == "verify":
+        writer.write(json.dumps({"id": -1, "op": "sign", "key": key, "data": data}).encode() + b"\n")
+        await writer.drain()
+        signature = json.loads(await reader.readline())["signature"]
+
+    async def receive():
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            response = json.loads(line)
+            start = sent_at.pop(response["id"], None)
+            if start is not None:
+                latencies.append(time.perf_counter() - start)
+            counters["ok" if response.get("ok") else "errors"] += 1
+            window.release()
+
+    receiver = asyncio.create_task(receive())
+    while time.perf_counter() < deadline:
+        await window.acquire()
+        request = {"id": next_id, "op": op, "key": key, "data": data}
+        if signature is not None:
+            request["signature"] = signature
+        sent_at[next_id] = time.perf_counter()
+        next_id += 1
+        writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+
+    # Chờ các phản hồi còn lại
+    for _ in range(depth):
+        await window.acquire()
+    receiver.cancel()
+    writer.close()
+
+async def _server_stats(socket_path, host, port):
+    reader, writer = await _open(socket_path, host, port)
+    writer.write(b'{"id": 0, "op": "stats"}\n')
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    writer.close()
+    return response.get("stats", {})
+
+async def run_load(socket_path=None, host="127.0.0.1", port=8765, key="default", op="sign",
+                   connections=8, depth=16, duration=10.0, payload_size=1024):
+    """
+    Tạo tải cho dịch vụ ký và đo độ trễ phía client
+
+    Tham số:
+        connections: Số kết nối đồng thời
+        depth: Số yêu cầu gửi liên tục chưa có phản hồi trên mỗi kết nối
+        duration: Thời gian chạy (giây)
+        payload_size: Kích thước dữ liệu cần ký mỗi yêu cầu (byte)
+
+    Trả về:
+        dict: Số yêu cầu, thông lượng, độ trễ (ms) và thống kê phía server
+    """
+    payload = os.urandom(payload_size)
+    latencies = []
+    counters = {"ok": 0, "errors": 0}
+    start_time = time.perf_counter()
+    deadline = start_time + duration
+    await asyncio.gather(*[
+        _client(socket_path, host, port, key, op, payload, depth, deadline, latencies, counters)
+        for _ in range(connections)
+    ])
+    elapsed = time.perf_counter() - start_time
+    latencies.sort()
+    return {
+        "requests": counters["ok"] + counters["errors"],
+        "errors": counters["errors"],
+        "elapsed": elapsed,
+        "requests_per_sec": (counters["ok"] + counters["errors"]) / elapsed,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p90": percentile(latencies, 0.90) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "max": latencies[-1] * 1000 if latencies else 0.0
+        },
+        "server": await _server_stats(socket_path, host, port)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Tạo tải cho dịch vụ ký số cục bộ")
+    parser.add_argument("--socket", default=None, help="Đường dẫn Unix socket")
+    parser.add_argument("--host", default="127.0.0.1", help="Địa chỉ dịch vụ")
+    parser.add_argument("--port", type=int, default=8765, help="Cổng dịch vụ")
+    parser.add_argument("--key", default="default", help="Tên khóa trên dịch vụ")
+    parser.add_argument("--op", choices=("sign", "verify"), default="sign", help="Thao tác")
+    parser.add_argument("--connections", type=int, default=8, help="Số kết nối")
+    parser.add_argument("--depth", type=int, default=16, help="Số yêu cầu chờ phản hồi mỗi kết nối")
+    parser.add_argument("--duration", type=float, default=10.0, help="Thời gian chạy (giây)")
+    parser.add_argument("--payload-size", type=int, default=1024, help="Kích thước dữ liệu (byte)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load(
+        args.socket, args.host, args.port, args.key, args.op,
+        args.connections, args.depth, args.duration, args.payload_size
+    ))
+
+    print("\n=== KẾT QUẢ TẠO TẢI ===")
+    print(f"Số yêu cầu: {result['requests']} (lỗi: {result['errors']})")
+    print(f"Thông lượng: {result['requests_per_sec']:.1f} yêu cầu/s")
+    latency = result["latency_ms"]
+    print(f"Độ trễ: p50 {latency['p50']:.2f} ms, p90 {latency['p90']:.2f} ms, "
+          f"p99 {latency['p99']:.2f} ms, max {latency['max']:.2f} ms")
+    server = result["server"]
+    if server:
+        print(f"Server: {server['batches']} lô, trung bình {server['avg_batch_size']:.1f} yêu cầu/lô, "
+              f"hàng đợi {server['queue_depth']}/{server['queue_size']}")
+
+if __name__ == "__main__":
+    main()
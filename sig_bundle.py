@@ -0,0 +1,352 @@
+import os
+import sys
+import time
+import struct
+import argparse
+from datetime import datetime
+
+from rsa_utils import (
+    calculate_file_hash, sign_digest, verify_digest, verify_signature,
+    public_key_fingerprint, load_public_key, key_algorithm, verify_cache_context,
+    DEFAULT_HASH_ALGORITHM
+)
+from file_utils import save_signature, load_signature, save_signature_info, load_signature_info
+from tree_hash import merkle_root, verify_tree_signature
+
+# Định dạng gói chữ ký nhị phân (.rsig), thay cho cặp file .sig + .sig.info
+#
+# Tất cả số nguyên theo thứ tự big-endian:
+#
+#     Phần đầu cố định (64 byte):
+#         magic            4s   b"RSIG"
+#         version          B    1
+#         flags            B    FLAG_*
+#         hash_algorithm   B    mã thuật toán hash (HASH_ALGORITHM_IDS)
+#         signature_alg    B    mã thuật toán chữ ký (SIGNATURE_ALGORITHM_IDS)
+#         file_size        Q    kích thước file gốc
+#         creation_time    q    thời điểm tạo (nano giây từ epoch)
+#         signature_length I    độ dài chữ ký
+#         digest_length    H    độ dài giá trị hash
+#         field_count      H    số trường mở rộng
+#         key_fingerprint  32s  SHA-256 của khóa công khai (DER), toàn 0 nếu không có
+#     digest               digest_length byte
+#     signature            signature_length byte
+#     Các trường mở rộng:  tag (B), length (I), value
+
+MAGIC = b"RSIG"
+VERSION = 1
+BUNDLE_EXTENSION = ".rsig"
+
+HEADER = struct.Struct(">4sBBBBQqIHH32s")
+FIELD_HEADER = struct.Struct(">BI")
+
+# Chữ ký được tạo theo kiểu cũ (ký lại hash của hash file)
+FLAG_LEGACY_DOUBLE_HASH = 0x01
+
+HASH_ALGORITHM_IDS = {"sha256": 1, "sha512": 2, "blake2b": 3, "sha3_256": 4, "sha3_512": 5}
+SIGNATURE_ALGORITHM_IDS = {"rsa-pss": 1, "ed25519": 2, "ecdsa-p256": 3}
+
+# Các trường mở rộng
+TAG_ORIGINAL_FILE = 1
+TAG_CREATOR = 2
+TAG_HASH_MODE = 3
+TAG_LEAF_SIZE = 4
+TAG_LEAF_HASHES = 5
+
+_STRING_FIELDS = {
+    TAG_ORIGINAL_FILE: "original_file",
+    TAG_CREATOR: "creator",
+    TAG_HASH_MODE: "hash_mode"
+}
+
+_NO_FINGERPRINT = b"\x00" * 32
+
+class BundleFormatError(ValueError):
+    """Dữ liệu không phải gói chữ ký hợp lệ"""
+
+def _lookup_name(ids, value):
+    for name, algorithm_id in ids.items():
+        if algorithm_id == value:
+            return name
+    raise BundleFormatError(f"Mã thuật toán không hỗ trợ: {value}")
+
+def encode_bundle(bundle):
+    """
+    Mã hóa gói chữ ký thành bytes
+
+    Tham số:
+        bundle: dict gồm signature, digest, file_size và các trường tùy chọn
+                hash_algorithm, signature_algorithm, key_fingerprint,
+                creation_time_ns, original_file, creator, hash_mode,
+                leaf_size, leaf_hashes, legacy_double_hash
+
+    Trả về:
+        bytes: Nội dung file .rsig
+    """
+    signature = bundle["signature"]
+    digest = bundle["digest"]
+    flags = FLAG_LEGACY_DOUBLE_HASH if bundle.get("legacy_double_hash") else 0
+
+    fields = []
+    for tag, name in _STRING_FIELDS.items():
+        value = bundle.get(name)
+        if value:
+            fields.append((tag, value.encode('utf-8')))
+    if bundle.get("leaf_size"):
+        fields.append((TAG_LEAF_SIZE, struct.pack(">Q", bundle["leaf_size"])))
+    if bundle.get("leaf_hashes"):
+        fields.append((TAG_LEAF_HASHES, b"".join(bundle["leaf_hashes"])))
+
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        flags,
+        HASH_ALGORITHM_IDS[bundle.get("hash_algorithm", "sha256")],
+        SIGNATURE_ALGORITHM_IDS[bundle.get("signature_algorithm", "rsa-pss")],
+        bundle.get("file_size", 0),
+        bundle.get("creation_time_ns") or time.time_ns(),
+        len(signature),
+        len(digest),
+        len(fields),
+        bundle.get("key_fingerprint") or _NO_FINGERPRINT
+    )
+    parts = [header, digest, signature]
+    for tag, value in fields:
+        parts.append(FIELD_HEADER.pack(tag, len(value)))
+        parts.append(value)
+    return b"".join(parts)
+
+def decode_bundle(data):
+    """Giải mã nội dung file .rsig thành dict (không cần bộ phân tích JSON)"""
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise BundleFormatError("Dữ liệu quá ngắn")
+    (magic, version, flags, hash_id, signature_id, file_size, creation_time_ns,
+     signature_length, digest_length, field_count, fingerprint) = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise BundleFormatError("Sai magic của gói chữ ký")
+    if version != VERSION:
+        raise BundleFormatError(f"Phiên bản không hỗ trợ: {version}")
+
+    offset = HEADER.size
+    end = offset + digest_length + signature_length
+    if len(view) < end:
+        raise BundleFormatError("Dữ liệu bị cắt cụt")
+    bundle = {
+        "hash_algorithm": _lookup_name(HASH_ALGORITHM_IDS, hash_id),
+        "signature_algorithm": _lookup_name(SIGNATURE_ALGORITHM_IDS, signature_id),
+        "legacy_double_hash": bool(flags & FLAG_LEGACY_DOUBLE_HASH),
+        "file_size": file_size,
+        "creation_time_ns": creation_time_ns,
+        "key_fingerprint": None if fingerprint == _NO_FINGERPRINT else fingerprint,
+        "digest": bytes(view[offset:offset + digest_length]),
+        "signature": bytes(view[offset + digest_length:end]),
+        "original_file": "",
+        "creator": "",
+        "hash_mode": "flat"
+    }
+
+    offset = end
+    for _ in range(field_count):
+        if len(view) < offset + FIELD_HEADER.size:
+            raise BundleFormatError("Dữ liệu bị cắt cụt")
+        tag, length = FIELD_HEADER.unpack_from(view, offset)
+        offset += FIELD_HEADER.size
+        value = view[offset:offset + length]
+        if len(value) != length:
+            raise BundleFormatError("Dữ liệu bị cắt cụt")
+        offset += length
+        if tag in _STRING_FIELDS:
+            bundle[_STRING_FIELDS[tag]] = str(value, 'utf-8')
+        elif tag == TAG_LEAF_SIZE:
+            bundle["leaf_size"] = struct.unpack(">Q", value)[0]
+        elif tag == TAG_LEAF_HASHES:
+            # Hash của lá có cùng độ dài với hash gốc
+            leaf_length = digest_length or 32
+            bundle["leaf_hashes"] = [bytes(value[i:i + leaf_length]) for i in range(0, length, leaf_length)]
+        # Bỏ qua các trường không biết để tương thích với phiên bản sau
+
+    if bundle["hash_mode"] == "tree":
+        # Gói dạng cây bắt buộc có kích thước lá và hash các lá
+        if not bundle.get("leaf_size"):
+            raise BundleFormatError("Gói chữ ký dạng cây thiếu kích thước lá")
+        if not bundle.get("leaf_hashes"):
+            raise BundleFormatError("Gói chữ ký dạng cây thiếu hash các lá")
+    elif bundle["hash_mode"] != "flat":
+        raise BundleFormatError(f"Chế độ hash không hỗ trợ: {bundle['hash_mode']}")
+    return bundle
+
+def save_bundle(bundle, path):
+    """Lưu gói chữ ký vào file"""
+    with open(path, 'wb') as f:
+        f.write(encode_bundle(bundle))
+
+def load_bundle(path):
+    """Đọc gói chữ ký từ file"""
+    with open(path, 'rb') as f:
+        return decode_bundle(f.read())
+
+def create_file_bundle(private_key, file_path, creator="", digest_cache=None, hash_algorithm=DEFAULT_HASH_ALGORITHM):
+    """Ký file và tạo gói chữ ký tương ứng"""
+    digest = calculate_file_hash(file_path, cache=digest_cache, hash_algorithm=hash_algorithm)
+    return {
+        "signature": sign_digest(private_key, digest, hash_algorithm),
+        "digest": digest,
+        "hash_algorithm": hash_algorithm,
+        "file_size": os.path.getsize(file_path),
+        "key_fingerprint": public_key_fingerprint(private_key.public_key()),
+        "signature_algorithm": key_algorithm(private_key),
+        "creation_time_ns": time.time_ns(),
+        "original_file": os.path.basename(file_path),
+        "creator": creator
+    }
+
+def tree_info_from_bundle(bundle):
+    """Chuyển các trường cây Merkle của gói chữ ký sang dạng thông tin của tree_hash"""
+    return {
+        "hash_mode": "tree",
+        "file_size": bundle["file_size"],
+        "leaf_size": bundle["leaf_size"],
+        "leaf_hashes": [leaf_hash.hex() for leaf_hash in bundle["leaf_hashes"]]
+    }
+
+def verify_file_bundle(public_key, file_path, bundle, digest_cache=None, verify_cache=None):
+    """
+    Xác thực file với gói chữ ký
+
+    Kiểm tra nhanh thuật toán, dấu vân tay khóa và kích thước file trước khi
+    băm file. Nếu có verify_cache (verify_cache.VerifyCache) thì kết quả phép
+    toán khóa công khai được dùng lại cho cùng khóa, hash và chữ ký.
+    """
+    if bundle.get("signature_algorithm", "rsa-pss") != key_algorithm(public_key):
+        return False
+    fingerprint = bundle.get("key_fingerprint")
+    if fingerprint and fingerprint != public_key_fingerprint(public_key):
+        return False
+    # Gói chuyển từ cặp file cũ mà không có file gốc thì không biết kích thước
+    size_known = bundle["digest"] or bundle["file_size"] or bundle.get("hash_mode") == "tree"
+    if size_known and os.path.getsize(file_path) != bundle["file_size"]:
+        return False
+
+    if bundle.get("hash_mode") == "tree":
+        return verify_tree_signature(public_key, file_path, bundle["signature"], tree_info_from_bundle(bundle))
+
+    hash_algorithm = bundle.get("hash_algorithm", DEFAULT_HASH_ALGORITHM)
+    # Chữ ký kiểu cũ chỉ có với RSA và SHA-256 (giống rsa_utils.verify_file_signature)
+    legacy_allowed = key_algorithm(public_key) == "rsa-pss" and hash_algorithm == DEFAULT_HASH_ALGORITHM
+    if bundle.get("legacy_double_hash") and not legacy_allowed:
+        return False
+    digest = calculate_file_hash(file_path, cache=digest_cache, hash_algorithm=hash_algorithm)
+    if bundle["digest"] and digest != bundle["digest"]:
+        return False
+    signature = bundle["signature"]
+    if bundle.get("legacy_double_hash"):
+        context = hash_algorithm + "+legacy-only"
+        verify = lambda: verify_signature(public_key, digest, signature)
+    else:
+        # Gói chuyển từ cặp file cũ mà không có file gốc: chưa biết chữ ký kiểu cũ hay mới
+        unknown = not bundle["digest"] and legacy_allowed
+        context = verify_cache_context(hash_algorithm, unknown)
+        verify = lambda: (verify_digest(public_key, digest, signature, hash_algorithm)
+                          or (unknown and verify_signature(public_key, digest, signature)))
+    if verify_cache is None:
+        return verify()
+    return verify_cache.get_or_verify(public_key_fingerprint(public_key), digest, signature, verify, context)
+
+def bundle_from_legacy(signature_path, info_path=None, file_path=None, public_key=None):
+    """
+    Chuyển cặp .sig + .sig.info sang gói chữ ký
+
+    Cặp file cũ không lưu giá trị hash và kích thước file, nên các trường này
+    chỉ được điền khi có file_path. Nếu có thêm public_key, chữ ký được kiểm
+    tra để nhận biết chữ ký kiểu cũ (hash của hash) và ghi dấu vân tay khóa.
+    Không có public_key thì với RSA và SHA-256 giá trị hash được để trống, vì
+    chưa biết chữ ký là kiểu cũ hay mới.
+    """
+    info_path = info_path or signature_path + ".info"
+    info = load_signature_info(info_path) if os.path.exists(info_path) else {}
+    signature = load_signature(signature_path)
+
+    creation_time_ns = 0
+    if info.get("creation_time"):
+        creation_time_ns = int(datetime.fromisoformat(info["creation_time"]).timestamp() * 1e9)
+
+    bundle = {
+        "signature": signature,
+        "digest": b"",
+        "file_size": 0,
+        "creation_time_ns": creation_time_ns,
+        "original_file": info.get("original_file", ""),
+        "creator": info.get("creator", ""),
+        "hash_mode": info.get("hash_mode", "flat"),
+        "hash_algorithm": info.get("hash_algorithm", DEFAULT_HASH_ALGORITHM),
+        "signature_algorithm": info.get("signature_algorithm") or
+                               (key_algorithm(public_key) if public_key is not None else "rsa-pss")
+    }
+    if bundle["hash_mode"] == "tree":
+        bundle["leaf_size"] = info["leaf_size"]
+        bundle["leaf_hashes"] = [bytes.fromhex(leaf_hash) for leaf_hash in info["leaf_hashes"]]
+        bundle["file_size"] = info["file_size"]
+        bundle["digest"] = merkle_root(bundle["leaf_hashes"])
+
+    if file_path is not None:
+        bundle["file_size"] = os.path.getsize(file_path)
+        legacy_possible = bundle["signature_algorithm"] == "rsa-pss" and \
+            bundle["hash_algorithm"] == DEFAULT_HASH_ALGORITHM
+        if bundle["hash_mode"] != "tree" and (public_key is not None or not legacy_possible):
+            bundle["digest"] = calculate_file_hash(file_path, hash_algorithm=bundle["hash_algorithm"])
+            if public_key is not None and legacy_possible and \
+                    not verify_digest(public_key, bundle["digest"], signature, bundle["hash_algorithm"]):
+                bundle["legacy_double_hash"] = verify_signature(public_key, bundle["digest"], signature)
+    if public_key is not None:
+        bundle["key_fingerprint"] = public_key_fingerprint(public_key)
+    return bundle
+
+def bundle_to_legacy(bundle, signature_path, info_path=None):
+    """Ghi gói chữ ký ra cặp .sig + .sig.info kiểu cũ"""
+    info_path = info_path or signature_path + ".info"
+    save_signature(bundle["signature"], signature_path)
+
+    extra = {
+        "creation_time": datetime.fromtimestamp(bundle["creation_time_ns"] / 1e9).isoformat(),
+        "hash_mode": bundle.get("hash_mode", "flat"),
+        "hash_algorithm": bundle.get("hash_algorithm", DEFAULT_HASH_ALGORITHM),
+        "signature_algorithm": bundle.get("signature_algorithm", "rsa-pss")
+    }
+    if bundle["digest"]:
+        extra["digest"] = bundle["digest"].hex()
+    if bundle.get("key_fingerprint"):
+        extra["key_fingerprint"] = bundle["key_fingerprint"].hex()
+    if extra["hash_mode"] == "tree":
+        extra.update(tree_info_from_bundle(bundle))
+    save_signature_info(bundle.get("original_file", ""), signature_path, info_path,
+                        bundle.get("creator", ""), extra)
+
+def main():
+    parser = argparse.ArgumentParser(description="Chuyển đổi giữa gói chữ ký .rsig và cặp .sig/.sig.info")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    to_bundle = subparsers.add_parser("to-bundle", help="Chuyển .sig + .sig.info sang .rsig")
+    to_bundle.add_argument("signature", help="File .sig")
+    to_bundle.add_argument("--file", default=None, help="File gốc (để ghi hash và kích thước)")
+    to_bundle.add_argument("--key", default=None, help="Khóa công khai (để ghi dấu vân tay)")
+    to_bundle.add_argument("-o", "--output", default=None, help="File .rsig đầu ra")
+
+    to_legacy = subparsers.add_parser("to-legacy", help="Chuyển .rsig sang .sig + .sig.info")
+    to_legacy.add_argument("bundle", help="File .rsig")
+    to_legacy.add_argument("-o", "--output", default=None, help="File .sig đầu ra")
+
+    args = parser.parse_args()
+    if args.command == "to-bundle":
+        public_key = load_public_key(args.key) if args.key else None
+        bundle = bundle_from_legacy(args.signature, file_path=args.file, public_key=public_key)
+        output = args.output or os.path.splitext(args.signature)[0] + BUNDLE_EXTENSION
+        save_bundle(bundle, output)
+    else:
+        bundle = load_bundle(args.bundle)
+        output = args.output or os.path.splitext(args.bundle)[0] + ".sig"
+        bundle_to_legacy(bundle, output)
+    print(f"Đã ghi {output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+import os
+import time
+import sqlite3
+import threading
+import argparse
+from datetime import datetime
+
+from rsa_utils import calculate_file_hash, DEFAULT_HASH_ALGORITHM
+from file_utils import load_signature, load_signature_info
+from sig_bundle import load_bundle, BUNDLE_EXTENSION
+
+# Vị trí mặc định của kho chữ ký
+DEFAULT_STORE_PATH = os.path.join("signatures", "index.db")
+
+# Số bản ghi ghi trong mỗi giao dịch khi thêm hàng loạt
+DEFAULT_BATCH_SIZE = 1000
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS signatures (
+        id INTEGER PRIMARY KEY,
+        digest BLOB NOT NULL,
+        hash_algorithm TEXT NOT NULL DEFAULT 'sha256',
+        hash_mode TEXT NOT NULL DEFAULT 'flat',
+        signature_algorithm TEXT NOT NULL DEFAULT 'rsa-pss',
+        original_file TEXT NOT NULL DEFAULT '',
+        key_fingerprint BLOB,
+        creation_time_ns INTEGER NOT NULL,
+        creator TEXT NOT NULL DEFAULT '',
+        signature_path TEXT,
+        signature BLOB NOT NULL
+    )
+    """,
+    # Các chỉ mục B-tree cho tra cứu O(log n)
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_signatures_digest ON signatures (digest, signature)",
+    "CREATE INDEX IF NOT EXISTS idx_signatures_key ON signatures (key_fingerprint, creation_time_ns)",
+    "CREATE INDEX IF NOT EXISTS idx_signatures_time ON signatures (creation_time_ns)"
+]
+
+_COLUMNS = ("digest", "hash_algorithm", "hash_mode", "signature_algorithm", "original_file",
+            "key_fingerprint", "creation_time_ns", "creator", "signature_path", "signature")
+
+class SignatureStore:
+    """
+    Kho chữ ký có chỉ mục (SQLite)
+
+    Mỗi bản ghi là một dict với các khóa: digest, hash_algorithm, hash_mode,
+    signature_algorithm, original_file, key_fingerprint, creation_time_ns, creator, signature_path
+    và signature (giống các trường của gói chữ ký .rsig).
+
+    Tham số:
+        db_path: Đường dẫn file cơ sở dữ liệu
+    """
+
+    def __init__(self, db_path=DEFAULT_STORE_PATH):
+        self.db_path = db_path
+        # Thư mục của kho có thể chưa tồn tại (ví dụ nằm trong thư mục chữ ký sắp tạo)
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        # Các kết nối đã mở (pid, luồng, kết nối) để close() đóng được cả kết nối của luồng worker
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        # Các thuật toán hash có trong kho (đọc một lần, cập nhật khi thêm bản ghi)
+        self._hash_algorithms = None
+        self._connection()
+
+    def _connection(self):
+        """Kết nối SQLite riêng cho luồng (và tiến trình) hiện tại"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                for statement in _SCHEMA:
+                    connection.execute(statement)
+                # Kho tạo trước khi có cột signature_algorithm: mọi chữ ký cũ đều là RSA-PSS
+                columns = {row["name"] for row in connection.execute("PRAGMA table_info(signatures)")}
+                if "signature_algorithm" not in columns:
+                    connection.execute("ALTER TABLE signatures ADD COLUMN "
+                                       "signature_algorithm TEXT NOT NULL DEFAULT 'rsa-pss'")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+            self._track_connection(connection)
+        return connection
+
+    def _track_connection(self, connection):
+        """Ghi nhận kết nối mới; đóng kết nối của các luồng đã kết thúc"""
+        pid = os.getpid()
+        with self._connections_lock:
+            # Bỏ cả kết nối kế thừa qua fork: chúng thuộc về tiến trình cha
+            current = [entry for entry in self._connections if entry[0] == pid]
+            self._connections = [entry for entry in current if entry[1].is_alive()]
+            self._connections.append((pid, threading.current_thread(), connection))
+        for _, thread, finished in current:
+            if not thread.is_alive():
+                finished.close()
+
+    @staticmethod
+    def _row_values(record):
+        return (
+            record["digest"],
+            record.get("hash_algorithm") or DEFAULT_HASH_ALGORITHM,
+            record.get("hash_mode") or "flat",
+            record.get("signature_algorithm") or "rsa-pss",
+            record.get("original_file") or "",
+            record.get("key_fingerprint"),
+            record.get("creation_time_ns") or time.time_ns(),
+            record.get("creator") or "",
+            record.get("signature_path"),
+            record["signature"]
+        )
+
+    def add(self, record):
+        """Thêm một bản ghi chữ ký (bỏ qua nếu đã có)"""
+        self.add_many([record])
+
+    def add_many(self, records, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Thêm hàng loạt bản ghi, mỗi giao dịch ghi tối đa batch_size bản ghi
+
+        Trả về:
+            int: Số bản ghi đã được thêm (bản ghi trùng đã có trong kho không được tính)
+        """
+        connection = self._connection()
+        statement = (f"INSERT OR IGNORE INTO signatures ({', '.join(_COLUMNS)}) "
+                     f"VALUES ({', '.join('?' * len(_COLUMNS))})")
+        count = 0
+        batch = []
+        for record in records:
+            batch.append(self._row_values(record))
+            if self._hash_algorithms is not None:
+                self._hash_algorithms.add(batch[-1][1])
+            if len(batch) >= batch_size:
+                with connection:
+                    count += connection.executemany(statement, batch).rowcount
+                batch = []
+        if batch:
+            with connection:
+                count += connection.executemany(statement, batch).rowcount
+        return count
+
+    def _query(self, where, params, limit=None):
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM signatures WHERE {where} ORDER BY creation_time_ns DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(row) for row in self._connection().execute(sql, params)]
+
+    def find_by_digest(self, digest, key_fingerprint=None):
+        """Tìm các chữ ký của dữ liệu có giá trị hash này (mới nhất trước)"""
+        if key_fingerprint is None:
+            return self._query("digest = ?", (digest,))
+        return self._query("digest = ? AND key_fingerprint = ?", (digest, key_fingerprint))
+
+    def find_by_key(self, key_fingerprint, limit=None):
+        """Tìm các chữ ký tạo bởi khóa có dấu vân tay này"""
+        return self._query("key_fingerprint = ?", (key_fingerprint,), limit)
+
+    def find_by_time_range(self, start_ns, end_ns, limit=None):
+        """Tìm các chữ ký tạo trong khoảng thời gian [start_ns, end_ns)"""
+        return self._query("creation_time_ns >= ? AND creation_time_ns < ?", (start_ns, end_ns), limit)
+
+    def hash_algorithms(self, refresh=False):
+        """Các thuật toán hash của những bản ghi trong kho (mặc định SHA-256 nếu kho rỗng)"""
+        if self._hash_algorithms is None or refresh:
+            rows = self._connection().execute("SELECT DISTINCT hash_algorithm FROM signatures").fetchall()
+            self._hash_algorithms = {row[0] for row in rows}
+        return sorted(self._hash_algorithms) or [DEFAULT_HASH_ALGORITHM]
+
+    def find_for_file(self, file_path, key_fingerprint=None, digest_cache=None):
+        """
+        Tìm chữ ký của một file theo giá trị hash của nội dung file
+
+        File được băm bằng từng thuật toán hash có trong kho.
+        """
+        records = []
+        for hash_algorithm in self.hash_algorithms():
+            digest = calculate_file_hash(file_path, cache=digest_cache, hash_algorithm=hash_algorithm)
+            records.extend(self.find_by_digest(digest, key_fingerprint))
+        return records
+
+    def count(self):
+        """Số bản ghi trong kho"""
+        return self._connection().execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def close(self):
+        """Đóng mọi kết nối mà các luồng của tiến trình này đã mở"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            # Luồng dùng lại đối tượng sau khi đóng sẽ mở kết nối mới
+            self._local = threading.local()
+        pid = os.getpid()
+        for owner_pid, _, connection in connections:
+            # Kết nối kế thừa qua fork thuộc về tiến trình cha, không đóng ở đây
+            if owner_pid == pid:
+                connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def record_from_legacy(signature_path, info_path=None):
+    """
+    Tạo bản ghi từ cặp .sig + .sig.info
+
+    Trả về None nếu file thông tin không lưu giá trị hash (chữ ký tạo trước
+    khi .info có trường digest), vì khi đó không thể tra cứu theo hash.
+    """
+    info_path = info_path or signature_path + ".info"
+    if not os.path.exists(info_path):
+        return None
+    info = load_signature_info(info_path)
+    if not info.get("digest"):
+        return None
+    creation_time_ns = int(datetime.fromisoformat(info["creation_time"]).timestamp() * 1e9)
+    return {
+        "digest": bytes.fromhex(info["digest"]),
+        "hash_algorithm": info.get("hash_algorithm", DEFAULT_HASH_ALGORITHM),
+        "hash_mode": info.get("hash_mode", "flat"),
+        "signature_algorithm": info.get("signature_algorithm", "rsa-pss"),
+        "original_file": info.get("original_file", ""),
+        "key_fingerprint": bytes.fromhex(info["key_fingerprint"]) if info.get("key_fingerprint") else None,
+        "creation_time_ns": creation_time_ns,
+        "creator": info.get("creator", ""),
+        "signature_path": os.path.abspath(signature_path),
+        "signature": load_signature(signature_path)
+    }
+
+def record_from_bundle(bundle, signature_path=None):
+    """Tạo bản ghi từ gói chữ ký .rsig"""
+    record = {name: bundle.get(name) for name in _COLUMNS}
+    record["signature_path"] = os.path.abspath(signature_path) if signature_path else None
+    return record
+
+def iter_directory_records(signature_dir):
+    """Duyệt thư mục và tạo bản ghi cho mọi file .sig (có .info) và .rsig"""
+    for directory, _, filenames in os.walk(signature_dir):
+        for name in filenames:
+            path = os.path.join(directory, name)
+            if name.endswith(".sig"):
+                record = record_from_legacy(path)
+                if record is not None:
+                    yield record
+            elif name.endswith(BUNDLE_EXTENSION):
+                yield record_from_bundle(load_bundle(path), path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Quản lý kho chữ ký có chỉ mục")
+    parser.add_argument("--db", default=DEFAULT_STORE_PATH, help="File cơ sở dữ liệu")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Nhập các chữ ký trong một thư mục")
+    import_parser.add_argument("directory", help="Thư mục chứa .sig/.sig.info hoặc .rsig")
+
+    find_parser = subparsers.add_parser("find", help="Tìm chữ ký của một file theo hash")
+    find_parser.add_argument("file", help="File cần tìm chữ ký")
+
+    args = parser.parse_args()
+    store = SignatureStore(args.db)
+    if args.command == "import":
+        count = store.add_many(iter_directory_records(args.directory))
+        print(f"Đã nhập {count} chữ ký, kho hiện có {store.count()} bản ghi")
+    else:
+        records = store.find_for_file(args.file)
+        if not records:
+            print("Không tìm thấy chữ ký")
+        for record in records:
+            created = datetime.fromtimestamp(record["creation_time_ns"] / 1e9).isoformat()
+            fingerprint = record["key_fingerprint"].hex() if record["key_fingerprint"] else "-"
+            print(f"{created}  khóa {fingerprint[:16]}  {record['original_file']}  {record['signature_path'] or ''}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+import os
+import json
+import time
+import base64
+import asyncio
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from rsa_utils import (
+    sign_digest, verify_digest, calculate_data_hash, new_hash, HASH_ALGORITHMS, DEFAULT_HASH_ALGORITHM
+)
+from key_cache import get_private_key
+from performance_test import percentile
+
+# Số yêu cầu tối đa trong hàng đợi chung; khi đầy, server ngừng đọc thêm
+# yêu cầu từ các kết nối (backpressure) cho tới khi hàng đợi vơi bớt
+DEFAULT_QUEUE_SIZE = 1024
+# Số yêu cầu tối đa trong một lô và thời gian chờ gom lô
+DEFAULT_MAX_BATCH = 64
+DEFAULT_BATCH_WINDOW = 0.002
+# Số yêu cầu đang xử lý tối đa trên mỗi kết nối
+MAX_IN_FLIGHT_PER_CONNECTION = 256
+# Độ dài tối đa (byte) của một dòng yêu cầu; giới hạn mặc định 64 KiB của
+# asyncio chỉ đủ cho khoảng 48 KiB dữ liệu base64
+MAX_REQUEST_SIZE = 16 * 1024 * 1024
+# Số mẫu độ trễ giữ lại để tính phân vị
+LATENCY_SAMPLES = 10000
+
+# Khóa của tiến trình worker, nạp một lần trong initializer
+_worker_keys = {}
+
+def _init_worker(key_specs):
+    """Nạp các khóa riêng tư vào tiến trình worker"""
+    for name, (path, password) in key_specs.items():
+        private_key = get_private_key(path, password)
+        _worker_keys[name] = (private_key, private_key.public_key())
+
+def _process_batch(batch):
+    """
+    Xử lý một lô yêu cầu trong tiến trình worker
+
+    Tham số:
+        batch: Danh sách (op, tên khóa, hash hoặc None, dữ liệu hoặc None, chữ ký, thuật toán hash)
+
+    Trả về:
+        list: Kết quả từng yêu cầu dạng (thành công, giá trị hoặc thông báo lỗi)
+    """
+    results = []
+    for op, key_name, digest, data, signature, hash_algorithm in batch:
+        try:
+            private_key, public_key = _worker_keys[key_name]
+            if digest is None:
+                digest = calculate_data_hash(data, hash_algorithm)
+            if op == "sign":
+                results.append((True, sign_digest(private_key, digest, hash_algorithm)))
+            else:
+                results.append((True, verify_digest(public_key, digest, signature, hash_algorithm)))
+        except KeyError:
+            results.append((False, f"Không có khóa '{key_name}'"))
+        except Exception as e:
+            results.append((False, str(e)))
+    return results
+
+def decode_request(line):
+    """
+    Đọc một dòng yêu cầu JSON
+
+    Trả về:
+        dict: Yêu cầu
+
+    Lỗi ValueError nếu dòng không phải JSON hoặc không phải một đối tượng JSON.
+    """
+    try:
+        request = json.loads(line)
+    except ValueError:
+        raise ValueError("Yêu cầu không phải JSON hợp lệ")
+    if not isinstance(request, dict):
+        raise ValueError("Yêu cầu phải là một đối tượng JSON")
+    return request
+
+def _b64decode(value):
+    return base64.b64decode(value, validate=True)
+
+def _decode_field(request, name, decode, description):
+    """Giải mã một trường của yêu cầu, báo lỗi rõ ràng khi thiếu hoặc sai định dạng"""
+    if name not in request:
+        raise ValueError(f"Thiếu trường '{name}'")
+    try:
+        return decode(request[name])
+    except (TypeError, ValueError):
+        raise ValueError(f"Trường '{name}' không phải {description} hợp lệ")
+
+def parse_request(request):
+    """
+    Chuyển một yêu cầu sign/verify (đã qua decode_request) thành phần việc
+
+    Dùng chung cho dịch vụ này và chế độ serve của cli.py để hai nơi kiểm tra
+    và báo lỗi giống nhau.
+
+    Trả về:
+        tuple: (op, tên khóa, hash hoặc None, dữ liệu hoặc None, chữ ký, thuật toán hash)
+    """
+    op = request.get("op")
+    if op not in ("sign", "verify"):
+        raise ValueError(f"Thao tác không hợp lệ: {op}")
+    hash_algorithm = request.get("hash", DEFAULT_HASH_ALGORITHM)
+    if not isinstance(hash_algorithm, str) or hash_algorithm not in HASH_ALGORITHMS:
+        raise ValueError(f"Thuật toán hash không hợp lệ: {hash_algorithm}")
+    if "digest" in request:
+        digest = _decode_field(request, "digest", bytes.fromhex, "chuỗi hex")
+        if len(digest) != new_hash(hash_algorithm).digest_size:
+            raise ValueError(f"Độ dài 'digest' không khớp với thuật toán hash {hash_algorithm}")
+        data = None
+    elif "data" in request:
+        digest = None
+        data = _decode_field(request, "data", _b64decode, "base64")
+    else:
+        raise ValueError("Cần 'data' hoặc 'digest'")
+    signature = _decode_field(request, "signature", _b64decode, "base64") if op == "verify" else None
+    return (op, request.get("key", "default"), digest, data, signature, hash_algorithm)
+
+class SigningService:
+    """
+    Dịch vụ ký cục bộ chạy lâu dài, giữ sẵn các khóa đã phân tích trong bộ nhớ
+
+    Giao thức: mỗi dòng là một yêu cầu JSON trên kết nối giữ lâu dài (Unix
+    socket hoặc TCP loopback), ví dụ:
+
+        {"id": 1, "op": "sign", "key": "default", "data": "<base64>"}
+        {"id": 2, "op": "sign", "key": "default", "digest": "<hex SHA-256>"}
+        {"id": 3, "op": "verify", "key": "default", "data": "<base64>", "signature": "<base64>"}
+        {"id": 4, "op": "sign", "key": "default", "data": "<base64>", "hash": "blake2b"}
+        {"id": 5, "op": "stats"}
+
+    Trường "hash" (mặc định sha256) chọn thuật toán hash trong HASH_ALGORITHMS.
+    Phản hồi cũng là một dòng JSON có cùng "id" (thứ tự có thể khác thứ tự gửi).
+    Các yêu cầu đồng thời được gom thành lô nhỏ và chia cho các tiến trình worker.
+
+    Tham số:
+        key_specs: dict {tên khóa: (đường dẫn khóa riêng tư, mật khẩu)}
+        workers: Số tiến trình worker
+        queue_size: Kích thước hàng đợi yêu cầu
+        max_batch: Số yêu cầu tối đa trong một lô
+        batch_window: Thời gian tối đa (giây) chờ gom thêm yêu cầu vào lô
+        max_request_size: Độ dài tối đa (byte) của một dòng yêu cầu; yêu cầu
+                          dài hơn nhận phản hồi lỗi và kết nối bị đóng
+    """
+
+    def __init__(self, key_specs, workers=None, queue_size=DEFAULT_QUEUE_SIZE,
+                 max_batch=DEFAULT_MAX_BATCH, batch_window=DEFAULT_BATCH_WINDOW,
+                 max_request_size=MAX_REQUEST_SIZE):
+        self.key_specs = key_specs
+        self.max_request_size = max_request_size
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self._executor = None
+        self._queue = None
+        self._batch_slots = None
+        self._server = None
+        self._dispatch_tasks = set()
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._stats = {"requests": 0, "errors": 0, "batches": 0, "batched_requests": 0, "connections": 0}
+        self._start_time = time.perf_counter()
+
+    async def start(self, socket_path=None, host="127.0.0.1", port=8765):
+        """Khởi động các worker và bắt đầu lắng nghe kết nối"""
+        # Nạp khóa trong tiến trình chính trước để báo lỗi sớm
+        _init_worker(self.key_specs)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.key_specs,)
+        )
+        # Khởi động worker trước khi nhận kết nối: tiến trình fork sau đó sẽ
+        # kế thừa socket của client và giữ kết nối mở sau khi dịch vụ đóng nó
+        await asyncio.get_running_loop().run_in_executor(self._executor, os.getpid)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        # Mỗi worker xử lý tối đa hai lô cùng lúc để luôn có việc sẵn
+        self._batch_slots = asyncio.Semaphore(self.workers * 2)
+        self._batcher = asyncio.create_task(self._batch_loop())
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=socket_path,
+                                                           limit=self.max_request_size)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port,
+                                                      limit=self.max_request_size)
+        return self._server
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Dừng nhận kết nối và tắt các worker"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._batcher.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _batch_loop(self):
+        """Gom các yêu cầu trong hàng đợi thành lô và gửi cho worker"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._batch_slots.acquire()
+            # Giữ tham chiếu tới task để nó không bị thu hồi khi đang chạy
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatch_tasks.add(task)
+            task.add_done_callback(self._dispatch_tasks.discard)
+
+    async def _dispatch(self, batch):
+        """Gửi một lô sang worker và trả kết quả cho từng yêu cầu"""
+        loop = asyncio.get_running_loop()
+        try:
+            self._stats["batches"] += 1
+            self._stats["batched_requests"] += len(batch)
+            work = [item[0] for item in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, _process_batch, work)
+            except Exception as e:
+                results = [(False, str(e))] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._batch_slots.release()
+
+    def stats(self):
+        """Thống kê dịch vụ: số yêu cầu, thông lượng, độ trễ (ms) và độ sâu hàng đợi"""
+        latencies = sorted(self._latencies)
+        uptime = time.perf_counter() - self._start_time
+        batches = self._stats["batches"]
+        return {
+            "uptime": uptime,
+            "requests": self._stats["requests"],
+            "errors": self._stats["errors"],
+            "connections": self._stats["connections"],
+            "requests_per_sec": self._stats["requests"] / uptime if uptime > 0 else 0.0,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "batches": batches,
+            "avg_batch_size": self._stats["batched_requests"] / batches if batches else 0.0,
+            "latency_ms": {
+                "p50": percentile(latencies, 0.50) * 1000,
+                "p90": percentile(latencies, 0.90) * 1000,
+                "p99": percentile(latencies, 0.99) * 1000,
+                "max": latencies[-1] * 1000 if latencies else 0.0
+            }
+        }
+
+    async def _write_response(self, response, writer, write_lock):
+        """Ghi một dòng phản hồi; khóa giữ cho các phản hồi đồng thời không đan xen"""
+        self._stats["requests"] += 1
+        async with write_lock:
+            writer.write(json.dumps(response).encode('utf-8') + b"\n")
+            await writer.drain()
+
+    async def _handle_request(self, line, writer, write_lock, in_flight):
+        """Xử lý một dòng yêu cầu và ghi phản hồi (kể cả khi yêu cầu không hợp lệ)"""
+        start_time = time.perf_counter()
+        response = {"id": None}
+        try:
+            request = decode_request(line)
+            response["id"] = request.get("id")
+            if request.get("op") == "stats":
+                response.update(ok=True, stats=self.stats())
+            else:
+                future = asyncio.get_running_loop().create_future()
+                # Chờ khi hàng đợi đầy (backpressure)
+                await self._queue.put((parse_request(request), future))
+                success, value = await future
+                if not success:
+                    raise ValueError(value)
+                if request["op"] == "sign":
+                    response.update(ok=True, signature=base64.b64encode(value).decode('ascii'))
+                else:
+                    response.update(ok=True, valid=value)
+                self._latencies.append(time.perf_counter() - start_time)
+        except Exception as e:
+            self._stats["errors"] += 1
+            response.update(ok=False, error=str(e))
+        finally:
+            in_flight.release()
+        await self._write_response(response, writer, write_lock)
+
+    async def _handle_connection(self, reader, writer):
+        """Đọc các yêu cầu trên một kết nối giữ lâu dài"""
+        self._stats["connections"] += 1
+        write_lock = asyncio.Lock()
+        in_flight = asyncio.Semaphore(MAX_IN_FLIGHT_PER_CONNECTION)
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Dòng dài hơn max_request_size: phần còn lại của dòng vẫn
+                    # nằm trong luồng nên không đọc tiếp được, báo lỗi rồi đóng
+                    self._stats["errors"] += 1
+                    await self._write_response({"id": None, "ok": False,
+                                                "error": f"Yêu cầu dài quá {self.max_request_size} byte"},
+                                               writer, write_lock)
+                    break
+                if not line:
+                    break
+                await in_flight.acquire()
+                task = asyncio.create_task(self._handle_request(line, writer, write_lock, in_flight))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            # Các yêu cầu đã nhận vẫn được trả lời trước khi đóng kết nối
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+def parse_key_specs(values, password=None):
+    """Chuyển các tham số dạng "tên=đường_dẫn" thành dict key_specs"""
+    key_specs = {}
+    for value in values:
+        name, _, path = value.rpartition("=")
+        key_specs[name or "default"] = (path, password)
+    return key_specs
+
+def main():
+    parser = argparse.ArgumentParser(description="Dịch vụ ký số cục bộ")
+    parser.add_argument("--key", action="append", required=True,
+                        help="Khóa riêng tư dạng tên=đường_dẫn (có thể lặp lại)")
+    parser.add_argument("--password", default=os.environ.get("RSA_KEY_PASSWORD"),
+                        help="Mật khẩu khóa riêng tư (mặc định lấy từ RSA_KEY_PASSWORD)")
+    parser.add_argument("--socket", default=None, help="Đường dẫn Unix socket")
+    parser.add_argument("--host", default="127.0.0.1", help="Địa chỉ lắng nghe khi không dùng Unix socket")
+    parser.add_argument("--port", type=int, default=8765, help="Cổng lắng nghe")
+    parser.add_argument("--workers", type=int, default=None, help="Số tiến trình worker")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="Kích thước hàng đợi")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Số yêu cầu tối đa mỗi lô")
+    parser.add_argument("--batch-window", type=float, default=DEFAULT_BATCH_WINDOW,
+                        help="Thời gian gom lô (giây)")
+    parser.add_argument("--max-request-size", type=int, default=MAX_REQUEST_SIZE,
+                        help="Độ dài tối đa của một dòng yêu cầu (byte)")
+    args = parser.parse_args()
+
+    service = SigningService(
+        parse_key_specs(args.key, args.password),
+        workers=args.workers,
+        queue_size=args.queue_size,
+        max_batch=args.max_batch,
+        batch_window=args.batch_window,
+        max_request_size=args.max_request_size
+    )
+
+    async def run():
+        await service.start(args.socket, args.host, args.port)
+        where = args.socket or f"{args.host}:{args.port}"
+        print(f"Dịch vụ ký đang lắng nghe tại {where}")
+        try:
+            await service.serve_forever()
+        finally:
+            await service.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
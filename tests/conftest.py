@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+# Các module của dự án nằm ở thư mục gốc (không đóng gói)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rsa_utils import generate_key_pair, save_private_key, save_public_key, SIGNATURE_ALGORITHMS
+
+@pytest.fixture(scope="session")
+def key_pairs():
+    """Một cặp khóa cho mỗi thuật toán chữ ký: {thuật toán: (khóa riêng tư, khóa công khai)}"""
+    return {algorithm: generate_key_pair(2048, use_pool=False, algorithm=algorithm)
+            for algorithm in SIGNATURE_ALGORITHMS}
+
+@pytest.fixture(scope="session")
+def key_files(key_pairs, tmp_path_factory):
+    """File PEM của các cặp khóa: {thuật toán: (đường dẫn khóa riêng tư, đường dẫn khóa công khai)}"""
+    directory = tmp_path_factory.mktemp("keys")
+    paths = {}
+    for algorithm, (private_key, public_key) in key_pairs.items():
+        private_path = str(directory / f"private_{algorithm}.pem")
+        public_path = str(directory / f"public_{algorithm}.pem")
+        save_private_key(private_key, private_path)
+        save_public_key(public_key, public_path)
+        paths[algorithm] = (private_path, public_path)
+    return paths
+
+@pytest.fixture
+def data_file(tmp_path):
+    """File dữ liệu nhỏ dùng để ký (byte đầu cố định để các bài kiểm thử có thể sửa nó)"""
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"du lieu can ky" + os.urandom(4096))
+    return str(path)
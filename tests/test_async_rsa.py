@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from rsa_utils import (
+    sign_data, sign_file, verify_signature, verify_file_signature, calculate_file_hash,
+    calculate_data_hash, SIGNATURE_ALGORITHMS
+)
+from tree_hash import sign_file_tree
+from async_rsa import AsyncRSA
+
+def _run(executor, work):
+    async def run():
+        async with AsyncRSA(executor=executor, max_workers=2, chunk_size=1000) as async_rsa:
+            return await work(async_rsa)
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+@pytest.mark.parametrize("algorithm", SIGNATURE_ALGORITHMS)
+def test_results_match_sync(key_pairs, data_file, algorithm, executor):
+    private_key, public_key = key_pairs[algorithm]
+    with open(data_file, 'rb') as f:
+        data = f.read()
+
+    async def work(async_rsa):
+        return (await async_rsa.hash_file(data_file, "sha512"),
+                await async_rsa.sign_data(private_key, b"du lieu"),
+                await async_rsa.sign_file(private_key, data_file, "sha512"))
+
+    file_hash, data_signature, file_signature = _run(executor, work)
+    assert file_hash == calculate_file_hash(data_file, hash_algorithm="sha512") == \
+        calculate_data_hash(data, "sha512")
+    # Chữ ký bất đồng bộ xác thực được bằng các hàm đồng bộ
+    assert verify_signature(public_key, b"du lieu", data_signature)
+    info = {"signature_algorithm": algorithm, "hash_algorithm": "sha512"}
+    assert verify_file_signature(public_key, data_file, file_signature, signature_info=info)
+
+@pytest.mark.parametrize("algorithm", SIGNATURE_ALGORITHMS)
+def test_verify_file_signature_matches_sync(key_pairs, data_file, algorithm):
+    private_key, public_key = key_pairs[algorithm]
+    sha512_signature = sign_file(private_key, data_file, hash_algorithm="sha512")
+    legacy_signature = sign_data(private_key, calculate_file_hash(data_file))
+    tree_signature, tree_info = sign_file_tree(private_key, data_file, leaf_size=1000)
+    tree_info["signature_algorithm"] = algorithm
+    other_algorithm = next(a for a in SIGNATURE_ALGORITHMS if a != algorithm)
+    cases = [
+        (sha512_signature, {"hash_algorithm": "sha512", "signature_algorithm": algorithm}),
+        (sha512_signature, None),
+        (sha512_signature, {"hash_algorithm": "sha512", "signature_algorithm": other_algorithm}),
+        (legacy_signature, None),
+        (legacy_signature, {"hash_algorithm": "sha512"}),
+        (tree_signature, tree_info),
+    ]
+
+    async def work(async_rsa):
+        return [await async_rsa.verify_file_signature(public_key, data_file, signature, signature_info=info)
+                for signature, info in cases]
+
+    expected = [verify_file_signature(public_key, data_file, signature, signature_info=info)
+                for signature, info in cases]
+    assert _run("thread", work) == expected
+    assert expected[0] and expected[-1]
+    assert not expected[1] and not expected[2]
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+import batch_signer
+from batch_signer import sign_directory, iter_files, database_files
+from rsa_utils import verify_file_signature
+from file_utils import load_signature, load_signature_info
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "release"
+    (root / "sub" / "deep").mkdir(parents=True)
+    for i, directory in enumerate((root, root / "sub", root / "sub" / "deep")):
+        (directory / f"file{i}.bin").write_bytes(os.urandom(1000 + i))
+    (root / "notes.txt").write_text("ghi chú")
+    return root
+
+def _verify_all(public_key, root, signature_root, algorithm):
+    for file_path in iter_files(str(root)):
+        relative_path = os.path.relpath(file_path, root)
+        signature_path = os.path.join(signature_root, relative_path + ".sig")
+        info = load_signature_info(signature_path + ".info")
+        assert info["signature_algorithm"] == algorithm
+        assert verify_file_signature(public_key, file_path, load_signature(signature_path), signature_info=info)
+
+@pytest.mark.parametrize("use_processes", [True, False], ids=["processes", "threads"])
+def test_sign_directory(key_files, key_pairs, tree, use_processes):
+    summary = sign_directory(key_files["ecdsa-p256"][0], str(tree), workers=2, max_pending=2,
+                             use_processes=use_processes, hash_algorithm="sha512")
+    assert summary["files"] == 4
+    assert summary["failed"] == 0
+    assert summary["bytes"] == sum(os.path.getsize(path) for path in iter_files(str(tree)))
+    _verify_all(key_pairs["ecdsa-p256"][1], tree, str(tree), "ecdsa-p256")
+
+def test_output_dir_keeps_structure(key_files, key_pairs, tree, tmp_path):
+    output_dir = tree / "signatures"
+    summary = sign_directory(key_files["rsa-pss"][0], str(tree), output_dir=str(output_dir), use_processes=False)
+    # Thư mục chữ ký nằm trong cây nhưng không bị ký lại
+    assert summary["files"] == 4
+    assert (output_dir / "sub" / "deep" / "file2.bin.sig").exists()
+    assert not (tree / "file0.bin.sig").exists()
+    _verify_all(key_pairs["rsa-pss"][1], tree, str(output_dir), "rsa-pss")
+
+def test_signature_files_not_signed(key_files, tree):
+    sign_directory(key_files["ed25519"][0], str(tree), use_processes=False)
+    (tree / "old.rsig").write_bytes(b"bundle")
+    # Lần ký thứ hai không ký các file .sig/.sig.info/.rsig vừa tạo
+    summary = sign_directory(key_files["ed25519"][0], str(tree), use_processes=False)
+    assert summary["files"] == 4
+    assert not list(tree.rglob("*.sig.sig"))
+    assert not list(tree.rglob("*.info.sig"))
+    assert not (tree / "old.rsig.sig").exists()
+
+def test_error_report_capped(key_files, tree, monkeypatch):
+    def failing_sign_one(file_path, *args):
+        raise OSError(f"không đọc được {file_path}")
+    monkeypatch.setattr(batch_signer, "_sign_one", failing_sign_one)
+    monkeypatch.setattr(batch_signer, "MAX_REPORTED_ERRORS", 2)
+    results = []
+    summary = sign_directory(key_files["rsa-pss"][0], str(tree), use_processes=False,
+                             on_result=lambda *result: results.append(result))
+    assert summary["files"] == 0
+    assert summary["failed"] == 4
+    assert len(summary["errors"]) == 2
+    assert all(signature_path is None and isinstance(error, OSError) for _, signature_path, error in results)
+
+def test_databases_in_tree_not_signed(key_files, tree):
+    store_path = str(tree / "index.db")
+    digest_cache_path = str(tree / "sub" / "digests.db")
+    # Kho và cache (cùng các file -wal/-shm) được mở trước khi duyệt cây
+    for _ in range(2):
+        summary = sign_directory(key_files["ed25519"][0], str(tree), use_processes=False,
+                                 store_path=store_path, digest_cache_path=digest_cache_path)
+        assert summary["files"] == 4
+    assert (tree / "index.db").exists()
+    assert not list(tree.rglob("*.db*.sig"))
+    exclude_paths = database_files(store_path) + database_files(digest_cache_path) + [str(tree / "notes.txt")]
+    assert sorted(iter_files(str(tree), exclude_paths=exclude_paths)) == \
+        sorted(str(path) for path in tree.rglob("file*.bin"))
@@ -0,0 +1,114 @@
+import os
+import time
+import sqlite3
+import threading
+
+import pytest
+
+from batch_signer import sign_directory
+from batch_verifier import verify_pairs, pairs_from_directory, pairs_from_manifest, pairs_from_files
+from digest_cache import DigestCache
+from verify_cache import VerifyCache
+from signature_store import SignatureStore
+
+@pytest.fixture
+def signed_tree(key_files, tmp_path):
+    root = tmp_path / "release"
+    (root / "sub").mkdir(parents=True)
+    for i in range(6):
+        (root / ("sub" if i % 2 else "") / f"file{i}.bin").write_bytes(os.urandom(2000 + i))
+    sign_directory(key_files["ed25519"][0], str(root), use_processes=False,
+                   store_path=str(tmp_path / "store.db"))
+    return root
+
+def test_all_valid(key_pairs, signed_tree):
+    results = []
+    report = verify_pairs(key_pairs["ed25519"][1], pairs_from_directory(str(signed_tree)), workers=3,
+                          on_result=results.append)
+    assert report["total"] == report["passed"] == len(results) == 6
+    assert report["failed"] == report["errors"] == 0
+    assert report["bytes"] == sum(2000 + i for i in range(6))
+
+def test_tampered_missing_and_wrong_key(key_pairs, signed_tree):
+    with open(signed_tree / "file0.bin", "ab") as f:
+        f.write(b"x")
+    os.remove(signed_tree / "sub" / "file1.bin")
+    report = verify_pairs(key_pairs["ed25519"][1], pairs_from_directory(str(signed_tree)), workers=2)
+    assert (report["passed"], report["failed"], report["errors"]) == (4, 1, 1)
+    failures = {os.path.basename(result["file"]): result for result in report["failures"]}
+    assert failures["file0.bin"]["error"] is None
+    assert failures["file1.bin"]["error"]
+
+    # Chữ ký Ed25519 không hợp lệ với khóa của thuật toán khác
+    report = verify_pairs(key_pairs["rsa-pss"][1], pairs_from_directory(str(signed_tree)))
+    assert report["passed"] == 0
+
+def test_fail_fast_stops_early(key_pairs, signed_tree):
+    for path in signed_tree.rglob("*.bin"):
+        with open(path, "ab") as f:
+            f.write(b"x")
+    report = verify_pairs(key_pairs["ed25519"][1], pairs_from_directory(str(signed_tree)), workers=1,
+                          max_pending=1, fail_fast=True)
+    assert report["aborted"]
+    assert report["total"] < 6
+
+def test_manifest_pairs(key_pairs, signed_tree):
+    manifest = signed_tree / "manifest.txt"
+    manifest.write_text("# danh sách\nfile0.bin\n\nsub/file1.bin\tsub/file1.bin.sig\n", encoding="utf-8")
+    report = verify_pairs(key_pairs["ed25519"][1], pairs_from_manifest(str(manifest)))
+    assert report["total"] == report["passed"] == 2
+
+def test_store_lookup_with_caches(key_pairs, signed_tree, tmp_path):
+    for path in signed_tree.rglob("*.sig*"):
+        os.remove(path)
+    # File vừa ghi nằm trong khoảng mtime chưa ổn định nên không được cache hash
+    old_ns = time.time_ns() - 60 * 10**9
+    for path in signed_tree.rglob("*.bin"):
+        os.utime(path, ns=(old_ns, old_ns))
+    store = SignatureStore(str(tmp_path / "store.db"))
+    digest_cache = DigestCache(str(tmp_path / "digests.db"))
+    verify_cache = VerifyCache(str(tmp_path / "verify.db"))
+    try:
+        for _ in range(2):
+            report = verify_pairs(key_pairs["ed25519"][1], pairs_from_files(str(signed_tree)), workers=4,
+                                  digest_cache=digest_cache, store=store, verify_cache=verify_cache)
+            assert report["total"] == report["passed"] == 6
+        assert digest_cache.stats()["hits"] == 6
+        assert verify_cache.stats()["hits"] == 6
+    finally:
+        for resource in (store, digest_cache, verify_cache):
+            resource.close()
+
+def test_close_closes_worker_connections(tmp_path):
+    cache = DigestCache(str(tmp_path / "digests.db"))
+    connections = [cache._connection()]
+
+    def worker():
+        connections.append(cache._connection())
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    assert connections[0] is not connections[1]
+    cache.close()
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+    # Đối tượng vẫn dùng được sau khi đóng: kết nối mới được mở lại
+    assert cache._connection().execute("SELECT 1").fetchone() == (1,)
+    cache.close()
+
+def test_finished_thread_connections_closed(tmp_path):
+    store = SignatureStore(str(tmp_path / "store.db"))
+    connections = []
+    thread = threading.Thread(target=lambda: connections.append(store._connection()))
+    thread.start()
+    thread.join()
+    # Kết nối của luồng đã kết thúc được đóng khi một luồng khác mở kết nối mới
+    thread = threading.Thread(target=lambda: connections.append(store._connection()))
+    thread.start()
+    thread.join()
+    with pytest.raises(sqlite3.ProgrammingError):
+        connections[0].execute("SELECT 1")
+    connections[1].execute("SELECT 1")
+    store.close()
@@ -0,0 +1,16 @@
+import pytest
+
+from rsa_utils import save_private_key
+from cli import main
+
+@pytest.mark.parametrize("password, message", [(None, "cần --password"), ("sai", "bỏ --password")])
+def test_sign_reports_password_mismatch(key_pairs, data_file, tmp_path, capsys, password, message):
+    private_key, _ = key_pairs["ed25519"]
+    key_path = str(tmp_path / "private_key.pem")
+    # Khóa được mã hóa khi thiếu mật khẩu, khóa không mã hóa khi có mật khẩu
+    save_private_key(private_key, key_path, None if password else "mat khau")
+    argv = ["sign", data_file, "--key", key_path]
+    if password:
+        argv += ["--password", password]
+    assert main(argv) == 2
+    assert message in capsys.readouterr().err
@@ -0,0 +1,92 @@
+import os
+import time
+
+import pytest
+
+from digest_cache import DigestCache, RACY_WINDOW_NS
+from rsa_utils import calculate_file_hash
+
+def _age(path, seconds=60):
+    """Lùi mtime của file ra ngoài khoảng thời gian chưa được lưu vào cache"""
+    mtime_ns = time.time_ns() - seconds * 1000 * 1000 * 1000
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return mtime_ns
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = DigestCache(str(tmp_path / "digests.db"))
+    yield cache
+    cache.close()
+
+def _compute_counter(path, calls):
+    def compute():
+        calls.append(path)
+        return calculate_file_hash(path)
+    return compute
+
+def test_hit_after_store(cache, data_file):
+    _age(data_file)
+    calls = []
+    first = cache.get_or_compute(data_file, _compute_counter(data_file, calls))
+    second = cache.get_or_compute(data_file, _compute_counter(data_file, calls))
+    assert first == second == calculate_file_hash(data_file)
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+def test_invalidated_by_mtime(cache, data_file):
+    mtime_ns = _age(data_file)
+    calls = []
+    cache.get_or_compute(data_file, _compute_counter(data_file, calls))
+    # Cùng kích thước, nội dung khác, mtime khác
+    with open(data_file, 'r+b') as f:
+        f.write(b"Z")
+    os.utime(data_file, ns=(mtime_ns + 10 ** 9, mtime_ns + 10 ** 9))
+    digest = cache.get_or_compute(data_file, _compute_counter(data_file, calls))
+    assert digest == calculate_file_hash(data_file)
+    assert len(calls) == 2
+
+def test_invalidated_by_size(cache, data_file):
+    mtime_ns = _age(data_file)
+    calls = []
+    cache.get_or_compute(data_file, _compute_counter(data_file, calls))
+    # Kích thước khác nhưng mtime được đặt lại như cũ
+    with open(data_file, 'ab') as f:
+        f.write(b"more")
+    os.utime(data_file, ns=(mtime_ns, mtime_ns))
+    digest = cache.get_or_compute(data_file, _compute_counter(data_file, calls))
+    assert digest == calculate_file_hash(data_file)
+    assert len(calls) == 2
+
+def test_recently_modified_file_not_cached(cache, data_file):
+    calls = []
+    cache.get_or_compute(data_file, _compute_counter(data_file, calls))
+    cache.get_or_compute(data_file, _compute_counter(data_file, calls))
+    assert time.time_ns() - os.stat(data_file).st_mtime_ns < RACY_WINDOW_NS
+    assert len(calls) == 2
+
+def test_algorithm_is_part_of_key(cache, data_file):
+    _age(data_file)
+    sha256 = cache.get_or_compute(data_file, lambda: calculate_file_hash(data_file), "sha256")
+    sha512 = cache.get_or_compute(data_file, lambda: calculate_file_hash(data_file, hash_algorithm="sha512"),
+                                  "sha512")
+    assert sha256 != sha512
+    assert cache.stats()["misses"] == 2
+
+def test_paranoid_recheck_detects_corruption(tmp_path, data_file):
+    mtime_ns = _age(data_file)
+    cache = DigestCache(str(tmp_path / "paranoid.db"), paranoid_fraction=1.0)
+    cache.get_or_compute(data_file, lambda: calculate_file_hash(data_file))
+    # Nội dung đổi nhưng kích thước và mtime giữ nguyên (dữ liệu hỏng âm thầm)
+    with open(data_file, 'r+b') as f:
+        f.write(b"Q")
+    os.utime(data_file, ns=(mtime_ns, mtime_ns))
+    assert cache.get_or_compute(data_file, lambda: calculate_file_hash(data_file)) == calculate_file_hash(data_file)
+    assert cache.stats()["corruptions"] == 1
+    assert cache.corrupted_paths == [os.path.abspath(data_file)]
+    cache.close()
+
+def test_calculate_file_hash_uses_cache(cache, data_file):
+    _age(data_file)
+    calculate_file_hash(data_file, cache=cache)
+    calculate_file_hash(data_file, cache=cache)
+    assert cache.stats()["hits"] == 1
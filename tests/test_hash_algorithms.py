@@ -0,0 +1,51 @@
+import pytest
+
+from rsa_utils import (
+    new_hash, sign_data, sign_file, verify_signature, verify_file_signature, calculate_data_hash,
+    calculate_file_hash, Signer, Verifier, SIGNATURE_ALGORITHMS, HASH_ALGORITHMS
+)
+
+def test_unknown_hash_rejected():
+    with pytest.raises(ValueError):
+        new_hash("md5")
+
+def test_file_and_data_hash_agree(data_file):
+    with open(data_file, 'rb') as f:
+        data = f.read()
+    for hash_algorithm in HASH_ALGORITHMS:
+        assert calculate_file_hash(data_file, hash_algorithm=hash_algorithm) == \
+            calculate_data_hash(data, hash_algorithm)
+
+@pytest.mark.parametrize("hash_algorithm", HASH_ALGORITHMS)
+@pytest.mark.parametrize("algorithm", SIGNATURE_ALGORITHMS)
+def test_sign_verify_round_trip(key_pairs, data_file, algorithm, hash_algorithm):
+    private_key, public_key = key_pairs[algorithm]
+    signature = sign_data(private_key, b"du lieu", hash_algorithm)
+    assert verify_signature(public_key, b"du lieu", signature, hash_algorithm)
+
+    signature = sign_file(private_key, data_file, hash_algorithm=hash_algorithm)
+    info = {"signature_algorithm": algorithm, "hash_algorithm": hash_algorithm}
+    assert verify_file_signature(public_key, data_file, signature, signature_info=info)
+
+@pytest.mark.parametrize("hash_algorithm", [h for h in HASH_ALGORITHMS if h != "sha256"])
+def test_hash_algorithm_taken_from_info(key_pairs, data_file, hash_algorithm):
+    private_key, public_key = key_pairs["rsa-pss"]
+    signature = sign_file(private_key, data_file, hash_algorithm=hash_algorithm)
+    # Không có thông tin chữ ký thì mặc định SHA-256
+    assert not verify_file_signature(public_key, data_file, signature)
+    assert verify_file_signature(public_key, data_file, signature, signature_info={"hash_algorithm": hash_algorithm})
+
+@pytest.mark.parametrize("hash_algorithm", HASH_ALGORITHMS)
+def test_streaming_with_hash_algorithm(key_pairs, hash_algorithm):
+    private_key, public_key = key_pairs["ecdsa-p256"]
+    signer = Signer(private_key, hash_algorithm)
+    signer.update(b"abc")
+    verifier = Verifier(public_key, hash_algorithm=hash_algorithm)
+    verifier.update(b"abc")
+    assert verifier.finalize(signer.finalize())
+
+def test_legacy_double_hash_requires_sha256(key_pairs, data_file):
+    private_key, public_key = key_pairs["rsa-pss"]
+    digest = calculate_file_hash(data_file, hash_algorithm="sha512")
+    signature = sign_data(private_key, digest, "sha512")
+    assert not verify_file_signature(public_key, data_file, signature, signature_info={"hash_algorithm": "sha512"})
@@ -0,0 +1,71 @@
+import re
+
+import pytest
+
+import instrumentation
+
+@pytest.fixture
+def enabled():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+def _samples(text):
+    """Các dòng mẫu của văn bản Prometheus: (tên, nhãn, giá trị)"""
+    samples = []
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        match = re.fullmatch(r'([a-z_]+)\{([^}]*)\} (\S+)', line)
+        assert match, line
+        labels = dict(re.findall(r'(\w+)="([^"]*)"', match.group(2)))
+        samples.append((match.group(1), labels, float(match.group(3))))
+    return samples
+
+def test_disabled_records_nothing():
+    instrumentation.reset()
+    with instrumentation.phase("file_hash") as p:
+        p.add_bytes(10)
+    assert instrumentation.snapshot() == {}
+
+def test_prometheus_histogram(enabled):
+    instrumentation.record("file_hash", 0.0002, 100)
+    instrumentation.record("file_hash", 0.003, 50)
+    instrumentation.record("file_hash", 20.0)
+    with instrumentation.phase("sign") as p:
+        p.add_bytes(7)
+
+    text = instrumentation.prometheus_text()
+    assert text.endswith("\n")
+    assert "# TYPE rsa_phase_seconds histogram" in text
+    assert "# TYPE rsa_phase_bytes_total counter" in text
+    samples = _samples(text)
+
+    buckets = [(labels["le"], value) for name, labels, value in samples
+               if name == "rsa_phase_seconds_bucket" and labels["phase"] == "file_hash"]
+    assert [le for le, _ in buckets] == [f"{b:g}" for b in instrumentation.HISTOGRAM_BUCKETS] + ["+Inf"]
+    counts = [value for _, value in buckets]
+    # Histogram tích lũy: không giảm, mốc +Inf bằng tổng số lần
+    assert counts == sorted(counts)
+    assert dict(buckets)["0.0001"] == 0
+    assert dict(buckets)["0.0005"] == 1
+    assert dict(buckets)["0.005"] == 2
+    assert dict(buckets)["10"] == 2
+    assert dict(buckets)["+Inf"] == 3
+
+    values = {(name, labels["phase"]): value for name, labels, value in samples if "le" not in labels}
+    assert values[("rsa_phase_seconds_count", "file_hash")] == 3
+    assert values[("rsa_phase_seconds_sum", "file_hash")] == pytest.approx(20.0032)
+    assert values[("rsa_phase_bytes_total", "file_hash")] == 150
+    assert values[("rsa_phase_bytes_total", "sign")] == 7
+
+def test_chrome_trace_events(enabled):
+    with instrumentation.phase("sign"):
+        pass
+    instrumentation.record("file_read", 0.001, 10)
+    events = instrumentation.chrome_trace()["traceEvents"]
+    # Chỉ các giai đoạn có thời điểm bắt đầu mới tạo sự kiện trace
+    assert [event["name"] for event in events] == ["sign"]
+    assert events[0]["ph"] == "X"
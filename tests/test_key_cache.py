@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+import key_cache
+from key_cache import get_private_key, get_public_key, evict, set_max_entries, cache_stats, reset_stats
+from rsa_utils import generate_key_pair, save_private_key, save_public_key, public_key_fingerprint
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    evict()
+    reset_stats()
+    yield
+    evict()
+    set_max_entries(key_cache.DEFAULT_MAX_ENTRIES)
+
+def _fingerprint(private_key):
+    return public_key_fingerprint(private_key.public_key())
+
+def test_hit_returns_same_object(key_files):
+    private_path, public_path = key_files["ed25519"]
+    assert get_private_key(private_path) is get_private_key(private_path)
+    assert get_public_key(public_path) is get_public_key(public_path)
+    stats = cache_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 2, 2)
+
+def test_rewritten_key_file_reloaded(tmp_path):
+    path = str(tmp_path / "private_key.pem")
+    first, _ = generate_key_pair(algorithm="ed25519")
+    second, _ = generate_key_pair(algorithm="ed25519")
+    save_private_key(first, path)
+    assert _fingerprint(get_private_key(path)) == _fingerprint(first)
+
+    # Ghi đè bằng khóa khác (cùng kích thước file), chỉ mtime thay đổi
+    save_private_key(second, path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert _fingerprint(get_private_key(path)) == _fingerprint(second)
+    # Phiên bản cũ bị bỏ khỏi bộ nhớ đệm
+    assert cache_stats()["size"] == 1
+    assert cache_stats()["misses"] == 2
+
+def test_password_is_part_of_key(tmp_path, key_pairs):
+    path = str(tmp_path / "private_key.pem")
+    save_private_key(key_pairs["ed25519"][0], path, "mat khau")
+    assert get_private_key(path, "mat khau") is not None
+    # Mật khẩu sai không dùng được khóa đã giải mã trong bộ nhớ đệm
+    with pytest.raises(ValueError):
+        get_private_key(path, "sai")
+
+def test_lru_eviction(tmp_path):
+    set_max_entries(2)
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f"public_key_{i}.pem")
+        save_public_key(generate_key_pair(algorithm="ed25519")[1], path)
+        paths.append(path)
+    get_public_key(paths[0])
+    get_public_key(paths[1])
+    get_public_key(paths[0])
+    get_public_key(paths[2])
+    stats = cache_stats()
+    assert (stats["size"], stats["evictions"]) == (2, 1)
+    # paths[1] ít được dùng gần đây nhất nên bị loại
+    get_public_key(paths[0])
+    get_public_key(paths[1])
+    assert cache_stats()["misses"] == 4
+    assert evict(paths[0]) == 1
@@ -0,0 +1,84 @@
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import key_pool
+import rsa_utils
+from key_pool import KeyPool, _generate_private_key_der
+
+class ImmediateExecutor:
+    """Executor chạy ngay trên luồng gọi, trả về future đã xong"""
+
+    def __init__(self, max_workers=None, fail=False):
+        self.fail = fail
+        self.submitted = 0
+
+    def submit(self, func, *args):
+        self.submitted += 1
+        future = Future()
+        if self.fail:
+            future.set_exception(RuntimeError("worker hỏng"))
+        else:
+            future.set_result(func(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+class BrokenExecutor(ImmediateExecutor):
+    def submit(self, func, *args):
+        raise RuntimeError("pool đã hỏng")
+
+def _make_pool(monkeypatch, executor_class, **kwargs):
+    monkeypatch.setattr(key_pool, "ProcessPoolExecutor", executor_class)
+    result = {}
+    # Chạy trong luồng riêng để bài kiểm thử không bị treo nếu có deadlock
+    thread = threading.Thread(target=lambda: result.update(pool=KeyPool(**kwargs)), daemon=True)
+    thread.start()
+    thread.join(30)
+    assert not thread.is_alive(), "KeyPool bị deadlock khi future đã xong ngay"
+    return result["pool"]
+
+def test_completed_futures_do_not_deadlock(monkeypatch):
+    pool = _make_pool(monkeypatch, ImmediateExecutor, key_sizes=(1024,), high_water=2)
+    metrics = pool.metrics()[1024]
+    assert (metrics["depth"], metrics["in_flight"], metrics["generated"]) == (2, 0, 2)
+    private_key, public_key = pool.take(1024)
+    assert public_key.key_size == 1024
+    # Lấy một khóa thì pool tự bù lại
+    assert pool.metrics()[1024]["depth"] == 2
+    pool.close()
+
+def test_failed_generation_counted(monkeypatch):
+    monkeypatch.setattr(key_pool, "ProcessPoolExecutor", lambda max_workers=None: ImmediateExecutor(fail=True))
+    pool = KeyPool(key_sizes=(1024,), high_water=3)
+    metrics = pool.metrics()[1024]
+    assert (metrics["in_flight"], metrics["failed"], metrics["depth"]) == (0, 3, 0)
+    assert "worker hỏng" in metrics["last_error"]
+    assert pool.take(1024) is None
+    pool.close()
+
+def test_submit_failure_releases_in_flight(monkeypatch):
+    pool = _make_pool(monkeypatch, BrokenExecutor, key_sizes=(1024,), high_water=2)
+    metrics = pool.metrics()[1024]
+    assert (metrics["in_flight"], metrics["failed"]) == (0, 2)
+    assert "pool đã hỏng" in metrics["last_error"]
+    pool.close()
+
+def test_install_serves_generate_key_pair(monkeypatch):
+    pool = _make_pool(monkeypatch, ImmediateExecutor, key_sizes=(1024,), high_water=1).install()
+    try:
+        private_key, _ = rsa_utils.generate_key_pair(1024)
+        assert pool.metrics()[1024]["served"] == 1
+    finally:
+        pool.close()
+    assert rsa_utils.get_key_pool() is None
+
+def test_high_water_validated():
+    with pytest.raises(ValueError):
+        KeyPool(high_water=0)
+
+def test_generate_der_in_worker():
+    der, elapsed = _generate_private_key_der(1024)
+    assert der[:1] == b"\x30" and elapsed >= 0
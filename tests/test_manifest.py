@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from manifest import create_manifest, verify_manifest, format_manifest, parse_manifest, DEFAULT_MANIFEST_NAME
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "release"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.txt").write_bytes(b"alpha")
+    (root / "sub" / "b.bin").write_bytes(os.urandom(2048))
+    # Chữ ký đi kèm dữ liệu cũng là nội dung cần bảo vệ
+    (root / "sub" / "b.bin.sig").write_bytes(b"signature")
+    (root / "sub" / "b.bin.sig.info").write_text("{}")
+    os.symlink("a.txt", root / "link")
+    return root
+
+@pytest.fixture(params=["rsa-pss", "ed25519"])
+def signed_tree(request, tree, key_files):
+    private_path, public_path = key_files[request.param]
+    result = create_manifest(private_path, str(tree), hash_algorithm="blake2b")
+    assert result["files"] == 5
+    return tree, public_path
+
+def _verify(signed_tree):
+    tree, public_path = signed_tree
+    return verify_manifest(public_path, str(tree))
+
+def test_format_parse_round_trip():
+    entries = {"a b.txt": (3, b"\x01" * 32), "dir/\"q\".bin": (0, b"\x02" * 32), "link": (None, "../x")}
+    hash_algorithm, parsed = parse_manifest(format_manifest(entries, "sha512"))
+    assert hash_algorithm == "sha512"
+    assert parsed == entries
+
+def test_untouched_tree_verifies(signed_tree):
+    report = _verify(signed_tree)
+    assert report["ok"], report
+    assert report["signature_valid"]
+
+def test_same_size_change_detected(signed_tree):
+    tree, _ = signed_tree
+    (tree / "a.txt").write_bytes(b"ALPHA")
+    report = _verify(signed_tree)
+    assert report["changed"] == ["a.txt"]
+    assert not report["ok"]
+
+def test_added_and_removed_detected(signed_tree):
+    tree, _ = signed_tree
+    (tree / "sub" / "b.bin").unlink()
+    (tree / "new.txt").write_bytes(b"new")
+    report = _verify(signed_tree)
+    assert report["added"] == ["new.txt"]
+    assert report["removed"] == ["sub/b.bin"]
+
+def test_signature_files_in_tree_protected(signed_tree):
+    tree, _ = signed_tree
+    (tree / "sub" / "b.bin.sig").write_bytes(b"SIGNATURE")
+    (tree / "sub" / "b.bin.sig.info").write_text('{"x": 1}')
+    assert _verify(signed_tree)["changed"] == ["sub/b.bin.sig", "sub/b.bin.sig.info"]
+
+def test_symlink_retarget_detected(signed_tree):
+    tree, _ = signed_tree
+    os.unlink(tree / "link")
+    os.symlink("sub/b.bin", tree / "link")
+    assert _verify(signed_tree)["changed"] == ["link"]
+
+def test_tampered_manifest_rejected(signed_tree):
+    tree, _ = signed_tree
+    manifest_path = tree / DEFAULT_MANIFEST_NAME
+    data = manifest_path.read_bytes()
+    manifest_path.write_bytes(data.replace(b"a.txt", b"A.txt"))
+    report = _verify(signed_tree)
+    assert not report["signature_valid"]
+    assert not report["ok"]
+
+def test_wrong_key_rejected(signed_tree, key_files):
+    tree, _ = signed_tree
+    report = verify_manifest(key_files["ecdsa-p256"][1], str(tree))
+    assert not report["signature_valid"]
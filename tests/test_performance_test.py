@@ -0,0 +1,21 @@
+import argparse
+
+import pytest
+
+from performance_test import summarize_samples, positive_int, non_negative_int
+
+def test_summarize_samples():
+    stats = summarize_samples([4.0, 1.0, 3.0, 2.0])
+    assert stats["median"] == 2.5
+    assert (stats["min"], stats["max"], stats["repeat"]) == (1.0, 4.0, 4)
+
+def test_summarize_samples_requires_samples():
+    with pytest.raises(ValueError):
+        summarize_samples([])
+
+def test_repeat_and_warmup_types():
+    assert positive_int("1") == 1
+    assert non_negative_int("0") == 0
+    for parse, value in ((positive_int, "0"), (non_negative_int, "-1"), (positive_int, "abc")):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse(value)
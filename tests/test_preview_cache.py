@@ -0,0 +1,70 @@
+import os
+
+import pytest
+from PIL import Image
+
+from preview_cache import PreviewCache, decode_thumbnail
+
+@pytest.fixture
+def image_file(tmp_path):
+    path = tmp_path / "anh.jpg"
+    Image.new("RGB", (800, 600), (200, 30, 30)).save(path, format="JPEG")
+    return str(path)
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PreviewCache(str(tmp_path / "thumbnails"), max_entries=2)
+    yield cache
+    cache.close()
+
+def test_decode_thumbnail_fits_size(image_file, tmp_path):
+    assert decode_thumbnail(image_file, (100, 100)).size == (100, 75)
+    palette_path = str(tmp_path / "anh.gif")
+    Image.new("P", (40, 40)).save(palette_path, format="GIF")
+    # Ảnh bảng màu được chuyển sang chế độ màu ImageTk hỗ trợ
+    assert decode_thumbnail(palette_path, (20, 20)).mode in ("RGB", "RGBA")
+
+def test_memory_then_disk_hits(image_file, tmp_path):
+    first = PreviewCache(str(tmp_path / "thumbnails"))
+    image = first.get(image_file, (100, 100))
+    assert first.get(image_file, (100, 100)) is image
+    assert first.peek(image_file, (100, 100)) is image
+    assert first.stats() == {"memory_hits": 2, "disk_hits": 0, "misses": 1, "entries": 1}
+    first.close()
+
+    # Cache mới (bộ nhớ trống) đọc ảnh thu nhỏ từ đĩa thay vì giải mã lại
+    second = PreviewCache(str(tmp_path / "thumbnails"))
+    assert second.peek(image_file, (100, 100)) is None
+    assert second.get(image_file, (100, 100)).size == image.size
+    assert second.stats()["disk_hits"] == 1
+    second.close()
+
+def test_modified_file_decoded_again(cache, image_file):
+    cache.get(image_file, (100, 100))
+    Image.new("RGB", (300, 300)).save(image_file, format="JPEG")
+    stat = os.stat(image_file)
+    os.utime(image_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.get(image_file, (100, 100)).size == (100, 100)
+    assert cache.stats()["misses"] == 2
+
+def test_memory_lru_and_async(cache, image_file):
+    sizes = [(50, 50), (60, 60), (70, 70)]
+    for size in sizes:
+        assert cache.load_async(image_file, size).result(timeout=30).size[0] == size[0]
+    assert cache.stats()["entries"] == 2
+    assert cache.peek(image_file, sizes[0]) is None
+
+def test_prune_disk(tmp_path, image_file):
+    cache = PreviewCache(str(tmp_path / "thumbnails"), max_disk_entries=2)
+    for width in (10, 20, 30, 40):
+        cache.get(image_file, (width, width))
+    cache.prune_disk()
+    assert len(os.listdir(tmp_path / "thumbnails")) == 2
+    cache.close()
+
+def test_disk_cache_disabled(image_file):
+    cache = PreviewCache(cache_dir=None)
+    cache.get(image_file, (100, 100))
+    cache.prune_disk()
+    assert cache.stats()["misses"] == 1
+    cache.close()
@@ -0,0 +1,19 @@
+from performance_test import compare_results
+from scaling_benchmark import scaling_results
+
+def _row(workers, ops_per_sec, mode="process"):
+    return {"key_size": 2048, "operation": "sign", "mode": mode, "workers": workers,
+            "ops_per_sec": ops_per_sec, "speedup": ops_per_sec / 100, "efficiency": ops_per_sec / 100 / workers}
+
+def test_results_comparable():
+    baseline = {"results": {"scaling": scaling_results([_row(1, 100), _row(2, 200), _row(4, 0)])}}
+    current = {"results": {"scaling": scaling_results([_row(1, 100), _row(2, 100), _row(4, 400)])}}
+    assert baseline["results"]["scaling"]["2048/sign/process/1"]["median"] == 10.0
+    # Cấu hình không hoàn thành thao tác nào không có thời gian để so sánh
+    assert "2048/sign/process/4" not in baseline["results"]["scaling"]
+
+    rows = compare_results(baseline, current)
+    assert [row["name"] for row in rows] == ["scaling/2048/sign/process/1", "scaling/2048/sign/process/2"]
+    # Thông lượng giảm một nửa: thời gian mỗi thao tác tăng gấp đôi
+    assert [row["regression"] for row in rows] == [False, True]
+    assert rows[1]["change"] == 1.0
@@ -0,0 +1,143 @@
+import os
+
+import pytest
+
+from rsa_utils import calculate_file_hash, sign_data, sign_file, public_key_fingerprint
+from file_utils import save_signature, save_signature_info, load_signature, load_signature_info
+from sig_bundle import (
+    encode_bundle, decode_bundle, create_file_bundle, verify_file_bundle,
+    bundle_from_legacy, bundle_to_legacy, BundleFormatError, HEADER, FIELD_HEADER
+)
+from tree_hash import sign_file_tree
+
+def test_encode_decode_round_trip(key_pairs, data_file):
+    private_key, public_key = key_pairs["ecdsa-p256"]
+    bundle = create_file_bundle(private_key, data_file, creator="tester", hash_algorithm="sha3_256")
+    decoded = decode_bundle(encode_bundle(bundle))
+    for name in ("signature", "digest", "file_size", "hash_algorithm", "signature_algorithm",
+                 "key_fingerprint", "creation_time_ns", "original_file", "creator"):
+        assert decoded[name] == bundle[name]
+    assert decoded["hash_mode"] == "flat"
+    assert not decoded["legacy_double_hash"]
+    assert verify_file_bundle(public_key, data_file, decoded)
+
+def test_tree_bundle_round_trip(key_pairs, data_file):
+    private_key, public_key = key_pairs["rsa-pss"]
+    signature, tree_info = sign_file_tree(private_key, data_file, leaf_size=1024)
+    bundle = {
+        "signature": signature,
+        "digest": b"",
+        "file_size": tree_info["file_size"],
+        "hash_mode": "tree",
+        "leaf_size": tree_info["leaf_size"],
+        "leaf_hashes": [bytes.fromhex(leaf_hash) for leaf_hash in tree_info["leaf_hashes"]]
+    }
+    decoded = decode_bundle(encode_bundle(bundle))
+    assert decoded["leaf_size"] == 1024
+    assert decoded["leaf_hashes"] == bundle["leaf_hashes"]
+    assert verify_file_bundle(public_key, data_file, decoded)
+
+def test_tree_bundle_without_leaf_size_rejected():
+    data = encode_bundle({"signature": b"s", "digest": b"", "file_size": 1, "hash_mode": "tree",
+                          "leaf_hashes": [b"\x00" * 32]})
+    with pytest.raises(BundleFormatError):
+        decode_bundle(data)
+
+def test_malformed_bundles_rejected(key_pairs, data_file):
+    data = encode_bundle(create_file_bundle(key_pairs["ed25519"][0], data_file))
+    with pytest.raises(BundleFormatError):
+        decode_bundle(data[:10])
+    with pytest.raises(BundleFormatError):
+        decode_bundle(b"XXXX" + data[4:])
+    with pytest.raises(BundleFormatError):
+        decode_bundle(data[:-1])
+
+def test_unknown_fields_ignored(key_pairs, data_file):
+    bundle = create_file_bundle(key_pairs["ed25519"][0], data_file)
+    data = bytearray(encode_bundle(bundle))
+    # Thêm một trường có mã chưa biết (như của phiên bản sau) và tăng số trường trong header
+    fields = list(HEADER.unpack_from(data))
+    fields[9] += 1
+    HEADER.pack_into(data, 0, *fields)
+    data += FIELD_HEADER.pack(200, 3) + b"new"
+    decoded = decode_bundle(bytes(data))
+    assert decoded["signature"] == bundle["signature"]
+    assert decoded["original_file"] == bundle["original_file"]
+
+def test_tampered_file_rejected(key_pairs, data_file):
+    private_key, public_key = key_pairs["rsa-pss"]
+    bundle = create_file_bundle(private_key, data_file)
+    with open(data_file, 'r+b') as f:
+        f.write(b"X")
+    assert not verify_file_bundle(public_key, data_file, bundle)
+
+def _legacy_pair(tmp_path, signature, extra=None):
+    signature_path = str(tmp_path / "data.bin.sig")
+    save_signature(signature, signature_path)
+    save_signature_info("data.bin", signature_path, signature_path + ".info", extra=extra)
+    return signature_path
+
+def test_bundle_from_legacy_new_style(key_pairs, data_file, tmp_path):
+    private_key, public_key = key_pairs["ed25519"]
+    signature_path = _legacy_pair(tmp_path, sign_file(private_key, data_file),
+                                  {"signature_algorithm": "ed25519"})
+    bundle = bundle_from_legacy(signature_path, file_path=data_file, public_key=public_key)
+    assert bundle["digest"] == calculate_file_hash(data_file)
+    assert bundle["key_fingerprint"] == public_key_fingerprint(public_key)
+    assert not bundle.get("legacy_double_hash")
+    assert verify_file_bundle(public_key, data_file, decode_bundle(encode_bundle(bundle)))
+
+def test_bundle_from_legacy_double_hash(key_pairs, data_file, tmp_path):
+    private_key, public_key = key_pairs["rsa-pss"]
+    signature_path = _legacy_pair(tmp_path, sign_data(private_key, calculate_file_hash(data_file)))
+    bundle = bundle_from_legacy(signature_path, file_path=data_file, public_key=public_key)
+    assert bundle["legacy_double_hash"]
+    decoded = decode_bundle(encode_bundle(bundle))
+    assert decoded["legacy_double_hash"]
+    assert verify_file_bundle(public_key, data_file, decoded)
+
+def test_bundle_from_legacy_without_file(key_pairs, data_file, tmp_path):
+    private_key, public_key = key_pairs["rsa-pss"]
+    signature_path = _legacy_pair(tmp_path, sign_data(private_key, calculate_file_hash(data_file)))
+    bundle = bundle_from_legacy(signature_path)
+    assert bundle["digest"] == b""
+    # Chưa biết kiểu chữ ký: với khóa RSA và SHA-256 vẫn chấp nhận chữ ký kiểu cũ
+    assert verify_file_bundle(public_key, data_file, bundle)
+
+def test_bundle_from_legacy_file_without_key(key_pairs, data_file, tmp_path):
+    private_key, public_key = key_pairs["rsa-pss"]
+    signature_path = _legacy_pair(tmp_path, sign_data(private_key, calculate_file_hash(data_file)))
+    bundle = bundle_from_legacy(signature_path, file_path=data_file)
+    assert bundle["digest"] == b""
+    assert bundle["file_size"] == os.path.getsize(data_file)
+    # Chữ ký kiểu cũ vẫn hợp lệ sau khi mã hóa và đọc lại
+    decoded = decode_bundle(encode_bundle(bundle))
+    assert verify_file_bundle(public_key, data_file, decoded)
+    with open(data_file, "ab") as f:
+        f.write(b"x")
+    assert not verify_file_bundle(public_key, data_file, decoded)
+
+@pytest.mark.parametrize("algorithm", ["ed25519", "ecdsa-p256"])
+def test_legacy_bundle_rejected_for_non_rsa(key_pairs, data_file, algorithm):
+    private_key, public_key = key_pairs[algorithm]
+    digest = calculate_file_hash(data_file)
+    signature = sign_data(private_key, digest)
+    bundle = {"signature": signature, "digest": digest, "file_size": len(open(data_file, 'rb').read()),
+              "signature_algorithm": algorithm, "legacy_double_hash": True}
+    assert not verify_file_bundle(public_key, data_file, bundle)
+    bundle.update(digest=b"", legacy_double_hash=False)
+    assert not verify_file_bundle(public_key, data_file, bundle)
+
+def test_bundle_to_legacy_round_trip(key_pairs, data_file, tmp_path):
+    private_key, public_key = key_pairs["ecdsa-p256"]
+    bundle = create_file_bundle(private_key, data_file, creator="tester", hash_algorithm="blake2b")
+    signature_path = str(tmp_path / "out.sig")
+    bundle_to_legacy(bundle, signature_path)
+    assert load_signature(signature_path) == bundle["signature"]
+    info = load_signature_info(signature_path + ".info")
+    assert info["hash_algorithm"] == "blake2b"
+    assert info["signature_algorithm"] == "ecdsa-p256"
+    assert info["digest"] == bundle["digest"].hex()
+    converted = bundle_from_legacy(signature_path, file_path=data_file, public_key=public_key)
+    assert converted["digest"] == bundle["digest"]
+    assert verify_file_bundle(public_key, data_file, converted)
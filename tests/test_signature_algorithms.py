@@ -0,0 +1,62 @@
+import pytest
+
+from rsa_utils import (
+    generate_key_pair, key_algorithm, sign_data, sign_digest, sign_file, verify_signature, verify_digest,
+    verify_file_signature, calculate_data_hash, calculate_file_hash, Verifier, SIGNATURE_ALGORITHMS
+)
+
+@pytest.mark.parametrize("algorithm", SIGNATURE_ALGORITHMS)
+def test_key_algorithm(key_pairs, algorithm):
+    private_key, public_key = key_pairs[algorithm]
+    assert key_algorithm(private_key) == key_algorithm(public_key) == algorithm
+
+def test_unknown_algorithm_rejected():
+    with pytest.raises(ValueError):
+        generate_key_pair(algorithm="dsa")
+
+@pytest.mark.parametrize("algorithm", SIGNATURE_ALGORITHMS)
+def test_sign_verify_data_round_trip(key_pairs, algorithm):
+    private_key, public_key = key_pairs[algorithm]
+    signature = sign_data(private_key, "văn bản cần ký")
+    assert verify_signature(public_key, "văn bản cần ký", signature)
+    assert not verify_signature(public_key, "văn bản đã sửa", signature)
+
+@pytest.mark.parametrize("algorithm", SIGNATURE_ALGORITHMS)
+def test_sign_data_matches_sign_digest(key_pairs, algorithm):
+    private_key, public_key = key_pairs[algorithm]
+    data = b"x" * 1000
+    digest = calculate_data_hash(data)
+    # Chữ ký trên dữ liệu xác thực được như chữ ký trên giá trị hash và ngược lại
+    assert verify_digest(public_key, digest, sign_data(private_key, data))
+    assert verify_signature(public_key, data, sign_digest(private_key, digest))
+
+@pytest.mark.parametrize("algorithm", SIGNATURE_ALGORITHMS)
+def test_sign_verify_file_round_trip(key_pairs, data_file, algorithm):
+    private_key, public_key = key_pairs[algorithm]
+    signature = sign_file(private_key, data_file)
+    info = {"signature_algorithm": algorithm}
+    assert verify_file_signature(public_key, data_file, signature, signature_info=info)
+    with open(data_file, 'ab') as f:
+        f.write(b"!")
+    assert not verify_file_signature(public_key, data_file, signature, signature_info=info)
+
+def test_signature_info_algorithm_mismatch(key_pairs, data_file):
+    private_key, public_key = key_pairs["ed25519"]
+    signature = sign_file(private_key, data_file)
+    assert not verify_file_signature(public_key, data_file, signature,
+                                     signature_info={"signature_algorithm": "rsa-pss"})
+
+def test_signature_from_other_key_type_rejected(key_pairs):
+    signature = sign_data(key_pairs["ed25519"][0], b"data")
+    assert not verify_signature(key_pairs["ecdsa-p256"][1], b"data", signature)
+
+@pytest.mark.parametrize("algorithm", ["ed25519", "ecdsa-p256"])
+def test_legacy_double_hash_rejected_for_non_rsa(key_pairs, data_file, algorithm):
+    private_key, public_key = key_pairs[algorithm]
+    # Chữ ký kiểu cũ (hash của hash) chỉ có với RSA
+    signature = sign_data(private_key, calculate_file_hash(data_file))
+    assert not verify_file_signature(public_key, data_file, signature, signature_info={"signature_algorithm": algorithm})
+    verifier = Verifier(public_key, legacy=True)
+    with open(data_file, 'rb') as f:
+        verifier.update_from(f)
+    assert not verifier.finalize(signature)
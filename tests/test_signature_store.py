@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from rsa_utils import calculate_file_hash, sign_file, public_key_fingerprint
+from file_utils import save_signature, save_signature_info
+from sig_bundle import create_file_bundle, save_bundle
+from signature_store import SignatureStore, iter_directory_records
+
+@pytest.fixture
+def store(tmp_path):
+    # Thư mục của kho chưa tồn tại: kho phải tự tạo
+    with SignatureStore(str(tmp_path / "store" / "index.db")) as store:
+        yield store
+
+def _record(digest, signature, fingerprint=None, time_ns=1, hash_algorithm="sha256"):
+    return {"digest": digest, "signature": signature, "key_fingerprint": fingerprint,
+            "creation_time_ns": time_ns, "hash_algorithm": hash_algorithm}
+
+def test_find_by_digest_newest_first(store):
+    store.add_many([_record(b"d" * 32, b"old", time_ns=1), _record(b"d" * 32, b"new", time_ns=2),
+                    _record(b"e" * 32, b"other", time_ns=3)])
+    assert [record["signature"] for record in store.find_by_digest(b"d" * 32)] == [b"new", b"old"]
+    assert store.find_by_digest(b"f" * 32) == []
+    assert store.count() == 3
+
+def test_duplicates_ignored(store):
+    store.add(_record(b"d" * 32, b"sig"))
+    store.add(_record(b"d" * 32, b"sig"))
+    assert store.count() == 1
+
+def test_add_many_counts_inserted_records(store):
+    records = [_record(bytes([i]) * 32, b"sig") for i in range(5)]
+    assert store.add_many(records[:3]) == 3
+    # Bản ghi đã có trong kho hoặc trùng trong cùng lô không được tính
+    assert store.add_many(records + records[3:], batch_size=2) == 2
+    assert store.count() == 5
+
+def test_find_by_key_and_time(store):
+    store.add_many([_record(b"a" * 32, b"1", b"k" * 32, 10), _record(b"b" * 32, b"2", b"k" * 32, 20),
+                    _record(b"c" * 32, b"3", b"j" * 32, 30)])
+    assert [record["signature"] for record in store.find_by_key(b"k" * 32)] == [b"2", b"1"]
+    assert len(store.find_by_key(b"k" * 32, limit=1)) == 1
+    assert [record["signature"] for record in store.find_by_time_range(10, 30)] == [b"2", b"1"]
+    assert store.find_by_digest(b"a" * 32, b"j" * 32) == []
+
+def test_find_for_file_uses_stored_hash_algorithms(store, key_pairs, data_file):
+    private_key, public_key = key_pairs["ed25519"]
+    fingerprint = public_key_fingerprint(public_key)
+    digest = calculate_file_hash(data_file, hash_algorithm="sha3_512")
+    store.add({"digest": digest, "signature": b"sig", "key_fingerprint": fingerprint,
+               "hash_algorithm": "sha3_512", "signature_algorithm": "ed25519"})
+    assert store.hash_algorithms() == ["sha3_512"]
+    records = store.find_for_file(data_file, fingerprint)
+    assert len(records) == 1
+    assert records[0]["signature_algorithm"] == "ed25519"
+
+def test_import_directory(store, key_pairs, data_file, tmp_path):
+    private_key, _ = key_pairs["rsa-pss"]
+    signature_dir = tmp_path / "signatures"
+    signature_dir.mkdir()
+    signature_path = str(signature_dir / "data.bin.sig")
+    save_signature(sign_file(private_key, data_file), signature_path)
+    save_signature_info(data_file, signature_path, signature_path + ".info",
+                        extra={"digest": calculate_file_hash(data_file).hex()})
+    bundle = create_file_bundle(key_pairs["ecdsa-p256"][0], data_file, hash_algorithm="sha512")
+    save_bundle(bundle, str(signature_dir / "data.bin.rsig"))
+
+    store.add_many(iter_directory_records(str(signature_dir)))
+    assert store.count() == 2
+    records = store.find_for_file(data_file)
+    assert {record["signature_algorithm"] for record in records} == {"rsa-pss", "ecdsa-p256"}
+    assert {record["signature_path"] for record in records} == {
+        os.path.abspath(signature_path), os.path.abspath(str(signature_dir / "data.bin.rsig"))}
@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import base64
+import subprocess
+
+import pytest
+
+from rsa_utils import calculate_data_hash, verify_digest
+from signing_service import decode_request, parse_request
+
+CLI_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cli.py")
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+@pytest.mark.parametrize("line, message", [
+    (b"not json", "JSON hợp lệ"),
+    (b"[1, 2]", "đối tượng JSON"),
+    (b"42", "đối tượng JSON")
+])
+def test_decode_request_rejects(line, message):
+    with pytest.raises(ValueError, match=message):
+        decode_request(line)
+
+def test_parse_sign_data():
+    op, key, digest, data, signature, hash_algorithm = parse_request(
+        {"op": "sign", "data": _b64(b"hello"), "hash": "sha512"})
+    assert (op, key, digest, data, signature, hash_algorithm) == ("sign", "default", None, b"hello", None, "sha512")
+
+def test_parse_verify_digest():
+    digest = calculate_data_hash(b"hello")
+    request = {"op": "verify", "key": "k", "digest": digest.hex(), "signature": _b64(b"sig")}
+    assert parse_request(request) == ("verify", "k", digest, None, b"sig", "sha256")
+
+@pytest.mark.parametrize("request_, message", [
+    ({"op": "delete", "data": ""}, "Thao tác không hợp lệ"),
+    ({"op": "sign"}, "Cần 'data' hoặc 'digest'"),
+    ({"op": "sign", "data": "@@@"}, "Trường 'data' không phải base64"),
+    ({"op": "sign", "data": 5}, "Trường 'data' không phải base64"),
+    ({"op": "sign", "digest": "zz"}, "Trường 'digest' không phải chuỗi hex"),
+    ({"op": "sign", "digest": "00" * 31}, "Độ dài 'digest'"),
+    ({"op": "sign", "digest": "00" * 32, "hash": "sha512"}, "Độ dài 'digest'"),
+    ({"op": "sign", "data": "", "hash": "md5"}, "Thuật toán hash không hợp lệ"),
+    ({"op": "sign", "data": "", "hash": ["sha256"]}, "Thuật toán hash không hợp lệ"),
+    ({"op": "verify", "data": ""}, "Thiếu trường 'signature'"),
+    ({"op": "verify", "data": "", "signature": "!"}, "Trường 'signature' không phải base64")
+])
+def test_parse_request_rejects(request_, message):
+    with pytest.raises(ValueError, match=message):
+        parse_request(request_)
+
+def test_cli_serve(key_files, key_pairs):
+    private_path, _ = key_files["ecdsa-p256"]
+    _, public_key = key_pairs["ecdsa-p256"]
+    digest = calculate_data_hash(b"hello", "sha3_256")
+    lines = [
+        json.dumps({"id": 1, "op": "sign", "data": _b64(b"hello"), "hash": "sha3_256"}),
+        "[1]",
+        json.dumps({"id": 3, "op": "sign", "digest": "abc"}),
+        "",
+        json.dumps({"id": 4, "op": "stats"})
+    ]
+    result = subprocess.run([sys.executable, CLI_PATH, "serve", "--key", private_path],
+                            input="\n".join(lines) + "\n", capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    responses = [json.loads(line) for line in result.stdout.splitlines()]
+    assert len(responses) == 4
+
+    assert responses[0]["id"] == 1 and responses[0]["ok"]
+    assert verify_digest(public_key, digest, base64.b64decode(responses[0]["signature"]), "sha3_256")
+    # Lỗi được báo bằng đúng thông điệp của signing_service
+    assert responses[1] == {"id": None, "ok": False, "error": "Yêu cầu phải là một đối tượng JSON"}
+    assert responses[2] == {"id": 3, "ok": False, "error": "Trường 'digest' không phải chuỗi hex hợp lệ"}
+    assert responses[3]["stats"] == {"requests": 3, "errors": 2}
+
+def _service_exchange(key_files, tmp_path, lines, max_request_size):
+    """Khởi động dịch vụ trên Unix socket, gửi các dòng và đọc mọi phản hồi tới khi kết nối đóng"""
+    import asyncio
+    from signing_service import SigningService
+
+    socket_path = str(tmp_path / "service.sock")
+
+    async def run():
+        service = SigningService({"default": (key_files["ed25519"][0], None)}, workers=1,
+                                 max_request_size=max_request_size)
+        await service.start(socket_path)
+        try:
+            reader, writer = await asyncio.open_unix_connection(socket_path, limit=max_request_size)
+            for line in lines:
+                writer.write(line + b"\n")
+            await writer.drain()
+            responses = []
+            while line := await asyncio.wait_for(reader.readline(), 60):
+                responses.append(json.loads(line))
+            writer.close()
+            return responses
+        finally:
+            await service.close()
+
+    return asyncio.run(run())
+
+def test_service_large_and_oversized_requests(key_files, key_pairs, tmp_path):
+    limit = 256 * 1024
+    # Lớn hơn giới hạn mặc định 64 KiB của asyncio nhưng nhỏ hơn max_request_size
+    large = os.urandom(100 * 1024)
+    lines = [
+        json.dumps({"id": 1, "op": "sign", "data": _b64(large)}).encode(),
+        json.dumps({"id": 2, "op": "sign", "data": _b64(os.urandom(limit))}).encode(),
+        json.dumps({"id": 3, "op": "sign", "data": _b64(b"never read")}).encode()
+    ]
+    responses = _service_exchange(key_files, tmp_path, lines, limit)
+    by_id = {response["id"]: response for response in responses}
+    assert by_id[1]["ok"]
+    assert verify_digest(key_pairs["ed25519"][1], calculate_data_hash(large), base64.b64decode(by_id[1]["signature"]))
+    # Yêu cầu quá dài được trả lời bằng lỗi, sau đó kết nối đóng
+    assert by_id[None]["ok"] is False
+    assert "dài quá" in by_id[None]["error"]
+    assert 3 not in by_id
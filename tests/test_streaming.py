@@ -0,0 +1,51 @@
+import pytest
+
+from rsa_utils import (
+    sign_data, sign_file, verify_signature, verify_file_signature, calculate_file_hash, Signer, Verifier
+)
+
+def _legacy_signature(private_key, file_path):
+    """Chữ ký kiểu cũ: ký lại giá trị hash của file như dữ liệu (hash của hash)"""
+    return sign_data(private_key, calculate_file_hash(file_path))
+
+def test_streaming_signer_verifier(key_pairs):
+    private_key, public_key = key_pairs["rsa-pss"]
+    chunks = [b"a" * 100, "b" * 200, memoryview(b"c")]
+    signer = Signer(private_key)
+    signer.update_from(iter(chunks))
+    signature = signer.finalize()
+    assert verify_signature(public_key, b"a" * 100 + b"b" * 200 + b"c", signature)
+
+    verifier = Verifier(public_key)
+    for chunk in chunks:
+        verifier.update(chunk)
+    assert verifier.finalize(signature)
+
+def test_update_from_file_matches_sign_file(key_pairs, data_file):
+    private_key, public_key = key_pairs["rsa-pss"]
+    verifier = Verifier(public_key)
+    with open(data_file, 'rb') as f:
+        verifier.update_from(f, chunk_size=1000)
+    # sign_file không còn băm hai lần: chữ ký xác thực được bằng Verifier
+    assert verifier.finalize(sign_file(private_key, data_file))
+
+def test_update_after_finalize_rejected(key_pairs):
+    signer = Signer(key_pairs["rsa-pss"][0])
+    signer.finalize()
+    with pytest.raises(ValueError):
+        signer.update(b"more")
+
+def test_legacy_double_hash_accepted_for_rsa(key_pairs, data_file):
+    private_key, public_key = key_pairs["rsa-pss"]
+    signature = _legacy_signature(private_key, data_file)
+    assert verify_file_signature(public_key, data_file, signature)
+    assert not verify_file_signature(public_key, data_file, signature, allow_legacy=False)
+
+def test_streaming_verifier_legacy(key_pairs, data_file):
+    private_key, public_key = key_pairs["rsa-pss"]
+    signature = _legacy_signature(private_key, data_file)
+    for legacy in (True, False):
+        verifier = Verifier(public_key, legacy=legacy)
+        with open(data_file, 'rb') as f:
+            verifier.update_from(f)
+        assert verifier.finalize(signature) == legacy
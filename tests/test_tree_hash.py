@@ -0,0 +1,49 @@
+import hashlib
+
+import pytest
+
+from tree_hash import (
+    merkle_root, calculate_tree_hash, sign_file_tree, verify_tree_signature, find_changed_leaves,
+    LEAF_PREFIX, NODE_PREFIX
+)
+
+def _leaf(data):
+    return hashlib.sha256(LEAF_PREFIX + data).digest()
+
+def _node(left, right):
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+def test_single_leaf_is_root():
+    leaf = _leaf(b"a")
+    assert merkle_root([leaf]) == leaf
+
+def test_empty_tree_rejected():
+    with pytest.raises(ValueError):
+        merkle_root([])
+
+def test_odd_node_promoted_unchanged():
+    a, b, c = _leaf(b"a"), _leaf(b"b"), _leaf(b"c")
+    # Nút lẻ c được đưa thẳng lên tầng trên, không băm với chính nó
+    assert merkle_root([a, b, c]) == _node(_node(a, b), c)
+    assert merkle_root([a, b, c]) != _node(_node(a, b), _node(c, c))
+
+def test_odd_node_promoted_across_levels():
+    leaves = [_leaf(bytes([i])) for i in range(5)]
+    ab, cd = _node(leaves[0], leaves[1]), _node(leaves[2], leaves[3])
+    assert merkle_root(leaves) == _node(_node(ab, cd), leaves[4])
+
+def test_tree_signature_and_changed_leaves(key_pairs, tmp_path):
+    private_key, public_key = key_pairs["rsa-pss"]
+    path = tmp_path / "big.bin"
+    path.write_bytes(b"0" * 1000 + b"1" * 1000 + b"2" * 500)
+    signature, tree_info = sign_file_tree(private_key, str(path), leaf_size=1000)
+    assert len(tree_info["leaf_hashes"]) == 3
+    assert calculate_tree_hash(str(path), leaf_size=1000)[0] == merkle_root(
+        [bytes.fromhex(leaf_hash) for leaf_hash in tree_info["leaf_hashes"]])
+    assert verify_tree_signature(public_key, str(path), signature, tree_info)
+
+    with open(path, 'r+b') as f:
+        f.seek(1500)
+        f.write(b"x")
+    assert not verify_tree_signature(public_key, str(path), signature, tree_info)
+    assert find_changed_leaves(str(path), tree_info) == [1]
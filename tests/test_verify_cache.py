@@ -0,0 +1,83 @@
+import pytest
+
+import verify_cache as verify_cache_module
+from verify_cache import VerifyCache
+from rsa_utils import (
+    sign_data, calculate_file_hash, verify_file_signature, verify_cache_context, public_key_fingerprint
+)
+
+FINGERPRINT = b"k" * 32
+DIGEST = b"d" * 32
+
+class CountingVerify:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.result
+
+def test_hit_and_miss_keyed_by_context():
+    cache = VerifyCache()
+    verify = CountingVerify(True)
+    assert cache.get_or_verify(FINGERPRINT, DIGEST, b"sig", verify, "sha256")
+    assert cache.get_or_verify(FINGERPRINT, DIGEST, b"sig", verify, "sha256")
+    assert verify.calls == 1
+    # Cùng khóa, hash và chữ ký nhưng ngữ cảnh khác: phải xác thực lại
+    rejecting = CountingVerify(False)
+    assert not cache.get_or_verify(FINGERPRINT, DIGEST, b"sig", rejecting, "sha256+legacy")
+    assert not cache.get_or_verify(FINGERPRINT, DIGEST, b"sig", rejecting, "sha256+legacy")
+    assert rejecting.calls == 1
+    # Chữ ký hoặc khóa khác là mục khác
+    assert cache.lookup(FINGERPRINT, DIGEST, b"other", "sha256") is None
+    assert cache.lookup(b"j" * 32, DIGEST, b"sig", "sha256") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 4)
+
+def test_disk_tier_and_expiry(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "verify.db")
+    cache = VerifyCache(db_path, ttl=100)
+    cache.store(FINGERPRINT, DIGEST, b"sig", True, "sha256")
+    cache.close()
+
+    # Cache mới đọc kết quả từ đĩa, rồi giữ trong bộ nhớ
+    cache = VerifyCache(db_path, ttl=100)
+    assert cache.lookup(FINGERPRINT, DIGEST, b"sig", "sha256") is True
+    assert cache.lookup(FINGERPRINT, DIGEST, b"sig", "sha256") is True
+    assert (cache.stats()["disk_hits"], cache.stats()["memory_hits"]) == (1, 1)
+
+    now = verify_cache_module.time.time()
+    monkeypatch.setattr(verify_cache_module.time, "time", lambda: now + 200)
+    assert cache.lookup(FINGERPRINT, DIGEST, b"sig", "sha256") is None
+    assert cache.prune_expired() == 1
+    cache.close()
+
+def test_invalidate_key_and_lru(tmp_path):
+    cache = VerifyCache(str(tmp_path / "verify.db"), max_entries=2)
+    for signature in (b"1", b"2", b"3"):
+        cache.store(FINGERPRINT, DIGEST, signature, True)
+    assert cache.stats()["entries"] == 2
+    assert cache.invalidate_key(FINGERPRINT) == 2
+    # Bản trên đĩa cũng bị xóa
+    assert cache.lookup(FINGERPRINT, DIGEST, b"1") is None
+    cache.close()
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        VerifyCache(max_entries=0)
+    with pytest.raises(ValueError):
+        VerifyCache(ttl=0)
+
+def test_legacy_result_not_reused_without_legacy(key_pairs, data_file):
+    private_key, public_key = key_pairs["rsa-pss"]
+    legacy_signature = sign_data(private_key, calculate_file_hash(data_file))
+    cache = VerifyCache()
+    assert verify_file_signature(public_key, data_file, legacy_signature, verify_cache=cache)
+    # Kết quả "hợp lệ" của ngữ cảnh chấp nhận chữ ký kiểu cũ không được dùng khi tắt allow_legacy
+    assert not verify_file_signature(public_key, data_file, legacy_signature, allow_legacy=False,
+                                     verify_cache=cache)
+    fingerprint = public_key_fingerprint(public_key)
+    digest = calculate_file_hash(data_file)
+    assert cache.lookup(fingerprint, digest, legacy_signature, verify_cache_context("sha256", True)) is True
+    assert cache.lookup(fingerprint, digest, legacy_signature, verify_cache_context("sha256")) is False
@@ -0,0 +1,48 @@
+import os
+import time
+import threading
+
+import watch_signer
+from watch_signer import WatchSigner
+
+def _run_in_background(signer, duration):
+    thread = threading.Thread(target=signer.run, kwargs={"scan_existing": True, "duration": duration})
+    thread.start()
+    return thread
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+def test_signs_and_forgets_deleted_files(key_files, tmp_path):
+    root = tmp_path / "watched"
+    root.mkdir()
+    (root / "a.txt").write_text("a")
+    (root / "b.txt").write_text("b")
+    signer = WatchSigner(key_files["ed25519"][0], str(root), output_dir=str(tmp_path / "sig"), settle=0)
+    start = time.process_time()
+    thread = _run_in_background(signer, 1.0)
+    try:
+        assert _wait_for(lambda: signer.summary["signed"] == 2)
+        os.remove(root / "a.txt")
+        assert _wait_for(lambda: str(root / "a.txt") not in signer._signed_digests)
+    finally:
+        thread.join()
+        signer.close()
+    assert list(signer._signed_digests) == [str(root / "b.txt")]
+    # --settle 0 không được làm vòng lặp chính quay liên tục
+    assert time.process_time() - start < 0.5
+
+def test_signed_digests_bounded(key_files, tmp_path, monkeypatch):
+    monkeypatch.setattr(watch_signer, "MAX_SIGNED_DIGESTS", 2)
+    root = tmp_path / "watched"
+    root.mkdir()
+    signer = WatchSigner(key_files["rsa-pss"][0], str(root), settle=0)
+    try:
+        for name in ("a", "b", "a", "c"):
+            signer._remember_digest(name, name.encode())
+        assert list(signer._signed_digests) == ["a", "c"]
+    finally:
+        signer.close()
@@ -0,0 +1,153 @@
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from rsa_utils import sign_digest, verify_digest
+
+# Kích thước mặc định của mỗi lá (phần file được băm độc lập)
+DEFAULT_LEAF_SIZE = 4 * 1024 * 1024
+# Kích thước bộ đệm đọc trong mỗi lá
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Tiền tố phân biệt hash của lá và hash của nút trong (chống tấn công hoán đổi)
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+HASH_MODE = "tree"
+
+def leaf_count(file_size, leaf_size):
+    """Số lá của file (file rỗng có một lá rỗng)"""
+    return max(1, -(-file_size // leaf_size))
+
+def hash_leaf(file_path, index, leaf_size):
+    """Tính hash của lá thứ index trong file"""
+    hash_obj = hashlib.sha256(LEAF_PREFIX)
+    buffer = bytearray(min(leaf_size, READ_CHUNK_SIZE))
+    view = memoryview(buffer)
+    remaining = leaf_size
+    with open(file_path, 'rb', buffering=0) as f:
+        f.seek(index * leaf_size)
+        while remaining > 0:
+            n = f.readinto(view[:min(remaining, len(buffer))])
+            if not n:
+                break
+            hash_obj.update(view[:n])
+            remaining -= n
+    return hash_obj.digest()
+
+def calculate_leaf_hashes(file_path, leaf_size=DEFAULT_LEAF_SIZE, workers=None, indices=None):
+    """
+    Tính hash của các lá song song bằng nhiều luồng
+
+    hashlib nhả GIL khi băm các khối lớn nên các luồng chạy thực sự song song
+    trên nhiều lõi CPU.
+
+    Tham số:
+        file_path: Đường dẫn file
+        leaf_size: Kích thước mỗi lá
+        workers: Số luồng (mặc định bằng số lõi CPU)
+        indices: Chỉ số các lá cần tính (None = tất cả)
+
+    Trả về:
+        list: Hash của các lá theo thứ tự indices
+    """
+    if indices is None:
+        indices = range(leaf_count(os.path.getsize(file_path), leaf_size))
+    indices = list(indices)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(indices) == 1:
+        return [hash_leaf(file_path, index, leaf_size) for index in indices]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda index: hash_leaf(file_path, index, leaf_size), indices))
+
+def merkle_root(leaf_hashes):
+    """Tính hash gốc của cây Merkle từ danh sách hash các lá"""
+    level = list(leaf_hashes)
+    if not level:
+        raise ValueError("Cây Merkle cần ít nhất một lá")
+    while len(level) > 1:
+        next_level = []
+        for i in range(0, len(level) - 1, 2):
+            next_level.append(hashlib.sha256(NODE_PREFIX + level[i] + level[i + 1]).digest())
+        if len(level) % 2:
+            # Nút lẻ cuối cùng được đưa thẳng lên tầng trên
+            next_level.append(level[-1])
+        level = next_level
+    return level[0]
+
+def calculate_tree_hash(file_path, leaf_size=DEFAULT_LEAF_SIZE, workers=None):
+    """
+    Tính hash dạng cây cho file
+
+    Trả về:
+        tuple: (hash gốc, danh sách hash các lá)
+    """
+    leaf_hashes = calculate_leaf_hashes(file_path, leaf_size, workers)
+    return merkle_root(leaf_hashes), leaf_hashes
+
+def sign_file_tree(private_key, file_path, leaf_size=DEFAULT_LEAF_SIZE, workers=None):
+    """
+    Tạo chữ ký số cho file theo chế độ hash dạng cây
+
+    Trả về:
+        tuple: (chữ ký, thông tin cây để lưu vào file thông tin chữ ký)
+    """
+    root, leaf_hashes = calculate_tree_hash(file_path, leaf_size, workers)
+    tree_info = {
+        "hash_mode": HASH_MODE,
+        "file_size": os.path.getsize(file_path),
+        "leaf_size": leaf_size,
+        "leaf_hashes": [leaf_hash.hex() for leaf_hash in leaf_hashes]
+    }
+    return sign_digest(private_key, root), tree_info
+
+def authenticate_leaf_hashes(public_key, signature, tree_info):
+    """
+    Kiểm tra danh sách hash các lá lưu trong thông tin chữ ký có đúng với chữ ký
+
+    Chỉ tính lại hash gốc từ các lá đã lưu, không cần đọc file.
+    """
+    leaf_hashes = [bytes.fromhex(leaf_hash) for leaf_hash in tree_info["leaf_hashes"]]
+    return verify_digest(public_key, merkle_root(leaf_hashes), signature)
+
+def find_changed_leaves(file_path, tree_info, indices=None, workers=None):
+    """
+    Tìm các vùng của file đã thay đổi so với thông tin cây đã lưu
+
+    Tham số:
+        indices: Chỉ kiểm tra lại các lá này (None = tất cả)
+
+    Trả về:
+        list: Chỉ số các lá khác với hash đã lưu (kể cả lá bị thêm/bớt
+              khi kích thước file thay đổi)
+    """
+    leaf_size = tree_info["leaf_size"]
+    stored = tree_info["leaf_hashes"]
+    current_count = leaf_count(os.path.getsize(file_path), leaf_size)
+    if indices is None:
+        indices = range(max(current_count, len(stored)))
+
+    changed = []
+    to_hash = []
+    for index in indices:
+        if index >= current_count or index >= len(stored):
+            changed.append(index)
+        else:
+            to_hash.append(index)
+
+    current = calculate_leaf_hashes(file_path, leaf_size, workers, to_hash)
+    for index, leaf_hash in zip(to_hash, current):
+        if leaf_hash.hex() != stored[index]:
+            changed.append(index)
+    return sorted(changed)
+
+def leaf_ranges(tree_info, indices):
+    """Chuyển chỉ số lá thành các khoảng byte (bắt đầu, kết thúc) trong file"""
+    leaf_size = tree_info["leaf_size"]
+    return [(index * leaf_size, (index + 1) * leaf_size) for index in indices]
+
+def verify_tree_signature(public_key, file_path, signature, tree_info, workers=None):
+    """Xác thực chữ ký số của file được ký theo chế độ hash dạng cây"""
+    if not authenticate_leaf_hashes(public_key, signature, tree_info):
+        return False
+    return not find_changed_leaves(file_path, tree_info, workers=workers)
@@ -0,0 +1,223 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Số kết quả xác thực giữ trong bộ nhớ
+DEFAULT_MAX_ENTRIES = 10000
+# Thời gian sống mặc định của một kết quả (giây)
+DEFAULT_TTL = 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS verifications (
+    fingerprint BLOB NOT NULL,
+    digest BLOB NOT NULL,
+    signature_hash BLOB NOT NULL,
+    context TEXT NOT NULL,
+    valid INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (fingerprint, digest, signature_hash, context)
+)
+"""
+
+def signature_hash(signature):
+    """SHA-256 của chữ ký, dùng làm một phần khóa cache thay cho cả chữ ký"""
+    return hashlib.sha256(signature).digest()
+
+class VerifyCache:
+    """
+    Bộ nhớ đệm kết quả xác thực chữ ký
+
+    Khóa gồm dấu vân tay khóa công khai, giá trị hash của nội dung, hash của
+    chữ ký và ngữ cảnh xác thực (ví dụ có chấp nhận chữ ký kiểu cũ hay không).
+    Kết quả (hợp lệ hoặc không) là hàm xác định của khóa này, nên lần kiểm tra
+    lặp lại không cần thực hiện phép toán khóa công khai. Dùng kèm
+    digest_cache.DigestCache để bỏ qua cả việc băm lại file không đổi.
+
+    Tầng bộ nhớ là LRU giới hạn max_entries mục; tầng đĩa (SQLite, chế độ WAL,
+    mỗi luồng/tiến trình một kết nối) giữ kết quả giữa các lần chạy. Mục quá
+    ttl giây bị bỏ qua ở cả hai tầng.
+
+    Tham số:
+        db_path: Đường dẫn file cơ sở dữ liệu (None để chỉ dùng bộ nhớ)
+        max_entries: Số kết quả tối đa trong bộ nhớ
+        ttl: Thời gian sống của một kết quả (giây)
+    """
+
+    def __init__(self, db_path=None, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        if max_entries < 1:
+            raise ValueError("max_entries phải lớn hơn 0")
+        if ttl <= 0:
+            raise ValueError("ttl phải lớn hơn 0")
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Các kết nối đã mở (pid, luồng, kết nối) để close() đóng được cả kết nối của luồng worker
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "invalidated": 0}
+        if db_path:
+            # Tạo bảng ngay để lỗi đường dẫn được báo sớm
+            self._connection()
+
+    def _connection(self):
+        """Kết nối SQLite riêng cho luồng (và tiến trình) hiện tại"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(_SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+            self._track_connection(connection)
+        return connection
+
+    def _track_connection(self, connection):
+        """Ghi nhận kết nối mới; đóng kết nối của các luồng đã kết thúc"""
+        pid = os.getpid()
+        with self._connections_lock:
+            # Bỏ cả kết nối kế thừa qua fork: chúng thuộc về tiến trình cha
+            current = [entry for entry in self._connections if entry[0] == pid]
+            self._connections = [entry for entry in current if entry[1].is_alive()]
+            self._connections.append((pid, threading.current_thread(), connection))
+        for _, thread, finished in current:
+            if not thread.is_alive():
+                finished.close()
+
+    def _remember(self, key, valid, expires_at):
+        with self._lock:
+            self._memory[key] = (valid, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def lookup(self, fingerprint, digest, signature, context=""):
+        """
+        Kết quả xác thực đã lưu
+
+        Trả về:
+            bool hoặc None: Kết quả đã lưu, None nếu chưa có hoặc đã hết hạn
+        """
+        key = (fingerprint, digest, signature_hash(signature), context)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return entry[0]
+                del self._memory[key]
+                self._stats["expired"] += 1
+
+        if self.db_path:
+            row = self._connection().execute(
+                "SELECT valid, expires_at FROM verifications "
+                "WHERE fingerprint = ? AND digest = ? AND signature_hash = ? AND context = ?",
+                key
+            ).fetchone()
+            if row is not None:
+                if row[1] > now:
+                    valid = bool(row[0])
+                    with self._lock:
+                        self._stats["disk_hits"] += 1
+                    self._remember(key, valid, row[1])
+                    return valid
+                with self._lock:
+                    self._stats["expired"] += 1
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def store(self, fingerprint, digest, signature, valid, context=""):
+        """Lưu kết quả xác thực với thời hạn ttl giây kể từ bây giờ"""
+        key = (fingerprint, digest, signature_hash(signature), context)
+        expires_at = time.time() + self.ttl
+        self._remember(key, bool(valid), expires_at)
+        if self.db_path:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO verifications "
+                "(fingerprint, digest, signature_hash, context, valid, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+                key + (int(bool(valid)), expires_at)
+            )
+
+    def get_or_verify(self, fingerprint, digest, signature, verify, context=""):
+        """
+        Lấy kết quả xác thực từ cache, hoặc gọi verify() rồi lưu lại
+
+        Tham số:
+            fingerprint: Dấu vân tay khóa công khai (rsa_utils.public_key_fingerprint)
+            digest: Giá trị hash của nội dung đã ký
+            signature: Chữ ký
+            verify: Hàm không tham số trả về True/False
+            context: Chuỗi phân biệt các cách xác thực khác nhau trên cùng dữ liệu
+
+        Trả về:
+            bool: Chữ ký có hợp lệ không
+        """
+        cached = self.lookup(fingerprint, digest, signature, context)
+        if cached is not None:
+            return cached
+        valid = bool(verify())
+        self.store(fingerprint, digest, signature, valid, context)
+        return valid
+
+    def invalidate_key(self, fingerprint):
+        """
+        Xóa mọi kết quả của một khóa (ví dụ khi khóa bị thu hồi)
+
+        Trả về:
+            int: Số mục đã xóa trong bộ nhớ
+        """
+        with self._lock:
+            keys = [key for key in self._memory if key[0] == fingerprint]
+            for key in keys:
+                del self._memory[key]
+            self._stats["invalidated"] += len(keys)
+        if self.db_path:
+            self._connection().execute("DELETE FROM verifications WHERE fingerprint = ?", (fingerprint,))
+        return len(keys)
+
+    def clear(self):
+        """Xóa toàn bộ cache"""
+        with self._lock:
+            self._memory.clear()
+        if self.db_path:
+            self._connection().execute("DELETE FROM verifications")
+
+    def prune_expired(self):
+        """Xóa các mục đã hết hạn trên đĩa, trả về số mục đã xóa"""
+        if not self.db_path:
+            return 0
+        cursor = self._connection().execute("DELETE FROM verifications WHERE expires_at <= ?", (time.time(),))
+        return cursor.rowcount
+
+    def stats(self):
+        """Thống kê số lần trúng (bộ nhớ/đĩa), trượt, hết hạn và tỉ lệ trúng"""
+        with self._lock:
+            result = dict(self._stats, entries=len(self._memory))
+        hits = result["memory_hits"] + result["disk_hits"]
+        lookups = hits + result["misses"]
+        result["hits"] = hits
+        result["hit_rate"] = hits / lookups if lookups else 0.0
+        return result
+
+    def close(self):
+        """Đóng mọi kết nối mà các luồng của tiến trình này đã mở"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            # Luồng dùng lại đối tượng sau khi đóng sẽ mở kết nối mới
+            self._local = threading.local()
+        pid = os.getpid()
+        for owner_pid, _, connection in connections:
+            # Kết nối kế thừa qua fork thuộc về tiến trình cha, không đóng ở đây
+            if owner_pid == pid:
+                connection.close()
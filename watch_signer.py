@@ -0,0 +1,519 @@
+import os
+import sys
+import time
+import errno
+import struct
+import select
+import signal
+import ctypes
+import fnmatch
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from rsa_utils import (
+    calculate_file_hash, sign_digest, public_key_fingerprint, key_algorithm,
+    HASH_ALGORITHMS, DEFAULT_HASH_ALGORITHM
+)
+from key_cache import get_private_key
+from batch_signer import iter_files, signature_output_path, MAX_REPORTED_ERRORS
+from file_utils import save_signature, save_signature_info, load_signature_info, ensure_directory_exists
+
+# Thời gian (giây) file phải không đổi trước khi được ký
+DEFAULT_SETTLE = 1.0
+# Chu kỳ quét thư mục khi không dùng được inotify
+DEFAULT_POLL_INTERVAL = 1.0
+# Thời gian chờ sự kiện tối đa của mỗi vòng lặp chính
+_TICK = 0.25
+# Thời gian chờ tối thiểu (kể cả với --settle 0) để vòng lặp không quay liên tục
+_MIN_TICK = 0.01
+# Số hash đã ký được nhớ tối đa (LRU); file bị đẩy ra vẫn được so với file .info
+MAX_SIGNED_DIGESTS = 100000
+# Mẫu tên file bỏ qua mặc định (file tạm của trình soạn thảo, file đang tải)
+DEFAULT_IGNORE = (".*", "*.tmp", "*.part", "*.swp", "*~")
+# Phần mở rộng của các file chữ ký (không ký lại chính chữ ký)
+SIGNATURE_EXTENSIONS = (".sig", ".sig.info", ".rsig")
+
+# Hằng số của inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+class InotifyWatcher:
+    """
+    Theo dõi cây thư mục bằng inotify (Linux, gọi qua ctypes)
+
+    Mỗi thư mục con có một watch; thư mục mới được thêm watch ngay khi xuất
+    hiện và các file đã có trong đó được báo là thay đổi. Khi hàng đợi sự
+    kiện của kernel bị tràn, toàn bộ cây được báo là thay đổi.
+
+    Tham số:
+        root_dir: Thư mục cần theo dõi
+        exclude_dirs: Các thư mục con không theo dõi (ví dụ thư mục chữ ký)
+    """
+
+    def __init__(self, root_dir, exclude_dirs=()):
+        libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "Hệ thống không hỗ trợ inotify")
+        self._libc = libc
+        self.root_dir = root_dir
+        self._exclude_dirs = list(exclude_dirs)
+        self._excluded = {os.path.abspath(d) for d in exclude_dirs}
+        self._watches = {}
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        try:
+            self._add_tree(root_dir)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_tree(self, directory, found=None):
+        """Thêm watch cho thư mục và các thư mục con; ghi các file gặp được vào found"""
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(current), _WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOSPC:
+                    raise OSError(error, "Vượt giới hạn số watch của inotify (fs.inotify.max_user_watches)")
+                # Thư mục đã bị xóa hoặc không có quyền
+                continue
+            self._watches[wd] = current
+            try:
+                entries = os.scandir(current)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if os.path.abspath(entry.path) not in self._excluded:
+                            stack.append(entry.path)
+                    elif found is not None and entry.is_file(follow_symlinks=False):
+                        found.add(entry.path)
+
+    def read(self, timeout):
+        """
+        Chờ sự kiện tối đa timeout giây
+
+        Trả về:
+            set: Các đường dẫn file được tạo, sửa, đổi tên hoặc xóa
+        """
+        changed = set()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return changed
+        while True:
+            try:
+                buffer = os.read(self._fd, _READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, name_length = _EVENT_HEADER.unpack_from(buffer, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(buffer[offset:offset + name_length].rstrip(b"\0"))
+                offset += name_length
+                if mask & IN_Q_OVERFLOW:
+                    changed.update(iter_files(self.root_dir, self._exclude_dirs))
+                    continue
+                if mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+                directory = self._watches.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and os.path.abspath(path) not in self._excluded:
+                        self._add_tree(path, changed)
+                else:
+                    changed.add(path)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+class PollingWatcher:
+    """
+    Theo dõi cây thư mục bằng cách quét định kỳ (dùng khi không có inotify)
+
+    Một file được báo là thay đổi khi kích thước hoặc mtime khác lần quét
+    trước, hoặc khi file xuất hiện/biến mất.
+
+    Tham số:
+        root_dir: Thư mục cần theo dõi
+        exclude_dirs: Các thư mục con không theo dõi
+        interval: Chu kỳ quét (giây)
+    """
+
+    def __init__(self, root_dir, exclude_dirs=(), interval=DEFAULT_POLL_INTERVAL):
+        self.root_dir = root_dir
+        self.interval = interval
+        self._exclude_dirs = list(exclude_dirs)
+        self._snapshot = self._scan()
+        self._next_scan = time.monotonic() + interval
+
+    def _scan(self):
+        snapshot = {}
+        for path in iter_files(self.root_dir, self._exclude_dirs):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def read(self, timeout):
+        """Chờ tới lần quét kế tiếp (tối đa timeout giây), trả về tập file thay đổi"""
+        delay = self._next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return set()
+        if delay > 0:
+            time.sleep(delay)
+        snapshot = self._scan()
+        self._next_scan = time.monotonic() + self.interval
+        changed = {path for path, state in snapshot.items() if self._snapshot.get(path) != state}
+        changed.update(self._snapshot.keys() - snapshot.keys())
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+def create_watcher(root_dir, exclude_dirs=(), backend="auto", poll_interval=DEFAULT_POLL_INTERVAL):
+    """
+    Tạo bộ theo dõi thư mục
+
+    Tham số:
+        backend: "inotify", "poll" hoặc "auto" (inotify nếu dùng được, nếu không thì quét định kỳ)
+    """
+    if backend in ("auto", "inotify"):
+        try:
+            return InotifyWatcher(root_dir, exclude_dirs)
+        except OSError as e:
+            if backend == "inotify":
+                raise
+            print(f"Không dùng được inotify ({e}), chuyển sang quét định kỳ", file=sys.stderr)
+    return PollingWatcher(root_dir, exclude_dirs, poll_interval)
+
+class WatchSigner:
+    """
+    Tự động ký các file mới hoặc bị sửa trong một thư mục
+
+    Sự kiện từ bộ theo dõi được gom theo đường dẫn: mỗi file chỉ có một mục
+    chờ dù nhận bao nhiêu sự kiện. Một file được ký khi đã không có sự kiện
+    và kích thước/mtime không đổi trong settle giây, nên file đang ghi dở
+    không bị ký. Các file sẵn sàng được đưa vào pool luồng dùng chung một
+    khóa đã nạp; một file đang được ký không được đưa vào lần nữa cho tới
+    khi xong.
+
+    File có nội dung không đổi so với lần ký trước (cùng hash trong file
+    .info, cùng thuật toán hash và khóa) không được ký lại.
+
+    Tham số:
+        private_key_path: Đường dẫn file khóa riêng tư (PEM)
+        root_dir: Thư mục cần theo dõi
+        output_dir: Thư mục lưu chữ ký (None = lưu cạnh file gốc)
+        password: Mật khẩu khóa riêng tư (nếu có)
+        workers: Số luồng ký
+        max_pending: Số file tối đa đang ký cùng lúc trong pool
+        settle: Thời gian (giây) file phải không đổi trước khi ký
+        hash_algorithm: Thuật toán hash (một trong HASH_ALGORITHMS)
+        creator: Tên người tạo ghi vào file thông tin chữ ký
+        ignore: Các mẫu tên file (fnmatch) không ký
+        backend: Bộ theo dõi ("auto", "inotify" hoặc "poll")
+        poll_interval: Chu kỳ quét khi dùng bộ theo dõi quét định kỳ
+        on_result: Hàm gọi lại (file_path, trạng thái, signature_path, lỗi)
+                   với trạng thái "signed", "unchanged" hoặc "failed"
+    """
+
+    def __init__(self, private_key_path, root_dir, output_dir=None, password=None, workers=None,
+                 max_pending=None, settle=DEFAULT_SETTLE, hash_algorithm=DEFAULT_HASH_ALGORITHM,
+                 creator="", ignore=DEFAULT_IGNORE, backend="auto", poll_interval=DEFAULT_POLL_INTERVAL,
+                 on_result=None):
+        if hash_algorithm not in HASH_ALGORITHMS:
+            raise ValueError(f"Thuật toán hash không được hỗ trợ: {hash_algorithm}")
+        self.root_dir = root_dir
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.settle = settle
+        self.hash_algorithm = hash_algorithm
+        self.creator = creator
+        self.ignore = tuple(ignore)
+        self.on_result = on_result
+
+        self._private_key = get_private_key(private_key_path, password)
+        public_key = self._private_key.public_key()
+        self._key_fingerprint = public_key_fingerprint(public_key).hex()
+        self._signature_algorithm = key_algorithm(public_key)
+
+        exclude_dirs = [output_dir] if output_dir else []
+        self._output_prefix = os.path.join(os.path.abspath(output_dir), "") if output_dir else None
+        self.watcher = create_watcher(root_dir, exclude_dirs, backend, poll_interval)
+        self._exclude_dirs = exclude_dirs
+        # Đường dẫn -> (thời điểm sự kiện cuối, (kích thước, mtime)) của các file chờ ký
+        self._pending = {}
+        # Future -> đường dẫn của các file đang ký
+        self._in_flight = {}
+        # Đường dẫn -> hash của nội dung đã ký gần nhất (LRU, chỉ luồng chính ghi)
+        self._signed_digests = OrderedDict()
+        self._stop = threading.Event()
+        self.summary = {"events": 0, "signed": 0, "unchanged": 0, "failed": 0, "bytes": 0, "errors": []}
+
+    def _is_ignored(self, path):
+        name = os.path.basename(path)
+        if name.endswith(SIGNATURE_EXTENSIONS):
+            return True
+        if self._output_prefix and os.path.abspath(path).startswith(self._output_prefix):
+            return True
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.ignore)
+
+    def _touch(self, path, now):
+        """Ghi nhận một sự kiện trên file (gom các sự kiện của cùng file)"""
+        if self._is_ignored(path):
+            return
+        self.summary["events"] += 1
+        try:
+            st = os.stat(path)
+        except OSError:
+            # File đã bị xóa hoặc đổi tên
+            self._pending.pop(path, None)
+            self._signed_digests.pop(path, None)
+            return
+        self._pending[path] = (now, (st.st_size, st.st_mtime_ns))
+
+    def _is_unchanged(self, file_path, signature_path, digest):
+        """Nội dung file có giống lần ký trước không (theo bộ nhớ hoặc file .info)"""
+        if not os.path.exists(signature_path):
+            return False
+        if self._signed_digests.get(file_path) == digest:
+            return True
+        info_path = signature_path + ".info"
+        if not os.path.exists(info_path):
+            return False
+        try:
+            info = load_signature_info(info_path)
+        except (OSError, ValueError):
+            return False
+        return (info.get("digest") == digest.hex()
+                and info.get("hash_algorithm", DEFAULT_HASH_ALGORITHM) == self.hash_algorithm
+                and info.get("key_fingerprint") == self._key_fingerprint)
+
+    def _sign_one(self, file_path, state):
+        """
+        Ký một file trong luồng worker
+
+        Trả về:
+            tuple: (trạng thái, đường dẫn chữ ký, kích thước, hash); trạng thái
+                   "modified" nghĩa là file bị sửa trong lúc băm
+        """
+        digest = calculate_file_hash(file_path, hash_algorithm=self.hash_algorithm)
+        st = os.stat(file_path)
+        if (st.st_size, st.st_mtime_ns) != state:
+            return "modified", None, st.st_size, None
+        signature_path = signature_output_path(file_path, self.root_dir, self.output_dir)
+        if self._is_unchanged(file_path, signature_path, digest):
+            return "unchanged", signature_path, st.st_size, digest
+
+        signature = sign_digest(self._private_key, digest, self.hash_algorithm)
+        ensure_directory_exists(os.path.dirname(signature_path) or ".")
+        save_signature(signature, signature_path)
+        save_signature_info(file_path, signature_path, signature_path + ".info", self.creator, {
+            "digest": digest.hex(),
+            "hash_algorithm": self.hash_algorithm,
+            "key_fingerprint": self._key_fingerprint,
+            "signature_algorithm": self._signature_algorithm
+        })
+        return "signed", signature_path, st.st_size, digest
+
+    def _submit_ready(self, executor, now):
+        """
+        Đưa các file đã ổn định vào pool (tối đa max_pending file đang ký)
+
+        Trả về:
+            bool: True nếu pool đã đầy trong khi còn file chờ
+        """
+        busy = set(self._in_flight.values())
+        for path, (last_event, state) in list(self._pending.items()):
+            if len(self._in_flight) >= self.max_pending:
+                return True
+            if now - last_event < self.settle or path in busy:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self._pending[path]
+                continue
+            current = (st.st_size, st.st_mtime_ns)
+            if current != state:
+                # File vẫn đang được ghi (bộ theo dõi chưa báo kịp)
+                self._pending[path] = (now, current)
+                continue
+            del self._pending[path]
+            self._in_flight[executor.submit(self._sign_one, path, state)] = path
+        return False
+
+    def _remember_digest(self, file_path, digest):
+        """Ghi nhớ hash đã ký của file, bỏ mục dùng lâu nhất khi vượt MAX_SIGNED_DIGESTS"""
+        self._signed_digests[file_path] = digest
+        self._signed_digests.move_to_end(file_path)
+        if len(self._signed_digests) > MAX_SIGNED_DIGESTS:
+            self._signed_digests.popitem(last=False)
+
+    def _handle_done(self, done, now):
+        for future in done:
+            file_path = self._in_flight.pop(future)
+            try:
+                status, signature_path, size, digest = future.result()
+            except Exception as e:
+                self.summary["failed"] += 1
+                if len(self.summary["errors"]) < MAX_REPORTED_ERRORS:
+                    self.summary["errors"].append((file_path, str(e)))
+                if self.on_result:
+                    self.on_result(file_path, "failed", None, e)
+                continue
+            if status == "modified":
+                # Chờ file ổn định lại rồi ký lần nữa
+                self._touch(file_path, now)
+                continue
+            self._remember_digest(file_path, digest)
+            self.summary[status] += 1
+            if status == "signed":
+                self.summary["bytes"] += size
+            if self.on_result:
+                self.on_result(file_path, status, signature_path, None)
+
+    def run(self, scan_existing=False, duration=None):
+        """
+        Theo dõi và ký cho tới khi stop() được gọi (hoặc hết duration giây)
+
+        Tham số:
+            scan_existing: Ký cả các file đã có sẵn khi bắt đầu (file không
+                           đổi so với chữ ký hiện có được bỏ qua)
+            duration: Thời gian chạy tối đa (giây), None để chạy mãi
+
+        Trả về:
+            dict: Thống kê số sự kiện, số file đã ký, không đổi, lỗi
+        """
+        deadline = time.monotonic() + duration if duration is not None else None
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            if scan_existing:
+                now = time.monotonic()
+                for path in iter_files(self.root_dir, self._exclude_dirs):
+                    self._touch(path, now - self.settle)
+            saturated = False
+            while not self._stop.is_set() and (deadline is None or time.monotonic() < deadline):
+                timeout = max(_MIN_TICK, min(_TICK, self.settle))
+                if self._in_flight:
+                    # Khi pool đầy, chờ worker xong thay vì chờ sự kiện để không bỏ phí lượt
+                    done, _ = wait(self._in_flight, timeout=timeout if saturated else 0,
+                                   return_when=FIRST_COMPLETED)
+                    self._handle_done(done, time.monotonic())
+                    if saturated:
+                        timeout = 0
+                changed = self.watcher.read(timeout)
+                now = time.monotonic()
+                for path in changed:
+                    self._touch(path, now)
+                saturated = self._submit_ready(executor, now)
+            # Chờ các file đang ký xong; file còn chờ ổn định bị bỏ lại
+            while self._in_flight:
+                done, _ = wait(self._in_flight, return_when=FIRST_COMPLETED)
+                self._handle_done(done, time.monotonic())
+        self.summary["waiting"] = len(self._pending)
+        return self.summary
+
+    def stop(self):
+        """Dừng vòng lặp theo dõi (an toàn khi gọi từ luồng khác hoặc signal handler)"""
+        self._stop.set()
+
+    def close(self):
+        self.watcher.close()
+
+def print_summary(summary):
+    """In thống kê của quá trình tự động ký"""
+    print("\n=== KẾT QUẢ TỰ ĐỘNG KÝ ===")
+    print(f"Số sự kiện: {summary['events']}")
+    print(f"Số file đã ký: {summary['signed']}")
+    print(f"Số file không đổi (bỏ qua): {summary['unchanged']}")
+    print(f"Số file lỗi: {summary['failed']}")
+    print(f"Số file chưa ổn định khi dừng: {summary.get('waiting', 0)}")
+    print(f"Tổng dung lượng đã ký: {summary['bytes'] / (1024 * 1024):.2f} MB")
+    for file_path, error in summary["errors"]:
+        print(f"Lỗi: {file_path}: {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Theo dõi thư mục và tự động ký file mới hoặc bị sửa")
+    parser.add_argument("root_dir", help="Thư mục cần theo dõi")
+    parser.add_argument("--key", required=True, help="File khóa riêng tư (PEM)")
+    parser.add_argument("--password", default=None, help="Mật khẩu khóa riêng tư")
+    parser.add_argument("--output-dir", default=None,
+                        help="Thư mục lưu chữ ký, ví dụ signatures (mặc định: cạnh file gốc)")
+    parser.add_argument("--workers", type=int, default=None, help="Số luồng ký")
+    parser.add_argument("--max-pending", type=int, default=None, help="Số file đang ký tối đa")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE,
+                        help="Số giây file phải không đổi trước khi ký")
+    parser.add_argument("--backend", choices=("auto", "inotify", "poll"), default="auto", help="Cách theo dõi thư mục")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, help="Chu kỳ quét (giây)")
+    parser.add_argument("--hash", choices=HASH_ALGORITHMS, default=DEFAULT_HASH_ALGORITHM, help="Thuật toán hash")
+    parser.add_argument("--creator", default="", help="Tên người tạo chữ ký")
+    parser.add_argument("--ignore", action="append", default=None,
+                        help="Mẫu tên file không ký (lặp lại được; mặc định: " + " ".join(DEFAULT_IGNORE) + ")")
+    parser.add_argument("--scan-existing", action="store_true", help="Ký cả các file đã có khi bắt đầu")
+    parser.add_argument("--duration", type=float, default=None, help="Dừng sau số giây này")
+    parser.add_argument("--quiet", action="store_true", help="Không in từng file")
+    args = parser.parse_args()
+
+    def on_result(file_path, status, signature_path, error):
+        if status == "signed":
+            print(f"Đã ký: {file_path} -> {signature_path}")
+        elif status == "failed":
+            print(f"Lỗi: {file_path}: {error}", file=sys.stderr)
+
+    signer = WatchSigner(
+        args.key, args.root_dir,
+        output_dir=args.output_dir,
+        password=args.password,
+        workers=args.workers,
+        max_pending=args.max_pending,
+        settle=args.settle,
+        hash_algorithm=args.hash,
+        creator=args.creator,
+        ignore=args.ignore if args.ignore is not None else DEFAULT_IGNORE,
+        backend=args.backend,
+        poll_interval=args.poll_interval,
+        on_result=None if args.quiet else on_result
+    )
+    # Dừng êm: các file đang ký được ký xong trước khi thoát
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda signum, frame: signer.stop())
+    print(f"Đang theo dõi {args.root_dir} ({type(signer.watcher).__name__}), Ctrl+C để dừng")
+    try:
+        summary = signer.run(scan_existing=args.scan_existing, duration=args.duration)
+    finally:
+        signer.close()
+    print_summary(summary)
+
+if __name__ == "__main__":
+    main()